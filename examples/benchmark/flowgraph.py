@@ -0,0 +1,54 @@
+'''Benchmark to measure the time taken to order the steps of a wide flowgraph.
+
+$ ./examples/benchmark/flowgraph.py <stages> <width>
+Builds a flowgraph of <stages> steps with <width> parallel indices each,
+where every index takes all indices of the previous step as inputs (as
+place_np tasks feed placemin), and reports the time taken by list_steps()
+and check_manifest().
+'''
+
+import siliconcompiler
+
+import sys
+import time
+
+def build(stages, width):
+    chip = siliconcompiler.Chip(design='wide')
+    flow = 'wide'
+    chip.set('flow', flow)
+    # check_manifest() errors on this incomplete design are expected
+    chip.set('loglevel', 'CRITICAL')
+
+    chip.node(flow, 'import', 'nop')
+    prev = [('import', '0')]
+    for i in range(stages):
+        step = f'step{i}'
+        for index in range(width):
+            chip.node(flow, step, 'nop', index=index)
+            for in_step, in_index in prev:
+                chip.edge(flow, in_step, step, tail_index=in_index, head_index=index)
+        prev = [(step, str(index)) for index in range(width)]
+
+    return chip
+
+def main():
+    stages = int(sys.argv[1])
+    width = int(sys.argv[2])
+    chip = build(stages, width)
+
+    start = time.time()
+    steps = chip.list_steps()
+    list_time = time.time() - start
+
+    start = time.time()
+    for i in range(10):
+        chip.list_steps()
+        chip.check_manifest()
+    repeat_time = time.time() - start
+
+    print(f'list_steps of {len(steps)} steps x {width} indices: {list_time:.3f}s, '
+          f'10x list_steps+check_manifest: {repeat_time:.3f}s')
+    return
+
+if __name__ == '__main__':
+    main()
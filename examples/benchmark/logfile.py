@@ -0,0 +1,45 @@
+'''Benchmark to measure the time taken to check a large log file.
+
+$ ./examples/benchmark/logfile.py <N>
+Writes a log file of N lines sampled from an OpenROAD place log and reports
+the time taken by check_logfile() with the default openroad warning and
+error patterns.
+'''
+
+import siliconcompiler
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+def main():
+    N = int(sys.argv[1])
+
+    datadir = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'core', 'data')
+    with open(os.path.join(datadir, 'place.log')) as f:
+        lines = f.read().splitlines()
+
+    chip = siliconcompiler.Chip(design='gcd')
+    chip.set('flow', 'test')
+    chip.node('test', 'place', 'openroad')
+    chip.set('eda', 'openroad', 'regex', 'place', '0', 'warnings', 'WARNING')
+    chip.set('eda', 'openroad', 'regex', 'place', '0', 'errors', 'ERROR')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        random.seed(0)
+        with open('place.log', 'w') as f:
+            for _ in range(N):
+                print(random.choice(lines), file=f)
+
+        start = time.time()
+        chip.check_logfile(step='place', display=False)
+        elapsed = time.time() - start
+
+    print(f'check_logfile of {N} lines: {elapsed:.2f}s')
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+'''Benchmark to measure the memory footprint of the schema.
+
+$ ./examples/benchmark/memory.py schema
+Reports memory allocated by a single call to schema_cfg().
+
+$ ./examples/benchmark/memory.py asicflow <N>
+Reports memory allocated by a Chip object with the freepdk45_demo target
+loaded, using an asicflow with N parallel tasks per step.
+'''
+
+import siliconcompiler
+from siliconcompiler.schema import schema_cfg
+
+import sys
+import time
+import tracemalloc
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.time()
+    obj = func(*args)
+    elapsed = time.time() - start
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size, peak, elapsed
+
+def build_asicflow(N):
+    chip = siliconcompiler.Chip(design='gcd')
+    for step in ('syn', 'floorplan', 'physyn', 'place', 'cts', 'route'):
+        chip.set('flowarg', f'{step}_np', str(N))
+    chip.load_target('freepdk45_demo')
+    return chip
+
+def main():
+    if sys.argv[1] == 'schema':
+        cfg, size, peak, elapsed = measure(schema_cfg)
+        print(f'schema_cfg(): {size/1e6:.2f} MB ({peak/1e6:.2f} MB peak) in {elapsed:.3f}s')
+    elif sys.argv[1] == 'asicflow':
+        N = int(sys.argv[2])
+        chip, size, peak, elapsed = measure(build_asicflow, N)
+        numkeys = len(chip.getkeys())
+        print(f'asicflow N={N}: {numkeys} keypaths, {size/1e6:.2f} MB '
+              f'({peak/1e6:.2f} MB peak) in {elapsed:.3f}s')
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+'''Benchmark to measure the time taken to merge task manifests.
+
+$ ./examples/benchmark/merge.py <N>
+Writes N compact task manifests (as run() does) for the freepdk45_demo
+target, each with its own metrics, and reports the time taken to merge all
+of them into one Chip, both as full and as partial (metric/flowstatus/record
+only) merges.
+'''
+
+import siliconcompiler
+
+import os
+import sys
+import tempfile
+import time
+
+def write_manifests(N, workdir):
+    chip = siliconcompiler.Chip(design='gcd')
+    chip.load_target('freepdk45_demo')
+
+    manifests = []
+    for i in range(N):
+        index = str(i)
+        chip.set('flowstatus', 'place', index, 'status', 'success')
+        for metric in ('cellarea', 'peakpower', 'leakagepower', 'setupwns'):
+            chip.set('metric', 'place', index, metric, 'real', float(i))
+        manifest = os.path.join(workdir, f'gcd{i}.pkg.json')
+        chip.write_manifest(manifest, compact=True)
+        manifests.append(manifest)
+
+    return manifests
+
+def merge(manifests, partial):
+    chip = siliconcompiler.Chip(design='gcd')
+    chip.load_target('freepdk45_demo')
+
+    start = time.time()
+    for manifest in manifests:
+        chip._read_manifest(manifest, clobber=False, partial=partial)
+    return time.time() - start
+
+def main():
+    N = int(sys.argv[1])
+    with tempfile.TemporaryDirectory() as workdir:
+        manifests = write_manifests(N, workdir)
+        full = merge(manifests, partial=False)
+        partial = merge(manifests, partial=True)
+    print(f'merge of {N} manifests: full {full:.2f}s, partial {partial:.2f}s')
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+'''Benchmark to count tool module imports for an asicflow.
+
+$ ./examples/benchmark/modules.py <N>
+Looks up the functions that run() and each task call in the tool modules
+of an asicflow with N parallel tasks per step, and reports the number of
+lookups, the number of tool module files executed and the time taken.
+'''
+
+import siliconcompiler
+
+import importlib.machinery
+import os
+import sys
+import time
+
+TOOL_FUNCTIONS = ('setup', 'pre_process', 'parse_version', 'normalize_version',
+                  'runtime_options', 'post_process')
+
+def main():
+    N = int(sys.argv[1])
+
+    # count tool module files (tools/<tool>/<tool>.py) executed by the
+    # source loader
+    executed = []
+    exec_module = importlib.machinery.SourceFileLoader.exec_module
+    def counting_exec_module(loader, module):
+        tooldir, filename = os.path.split(loader.path)
+        if filename == os.path.basename(tooldir) + '.py':
+            executed.append(loader.path)
+        return exec_module(loader, module)
+    importlib.machinery.SourceFileLoader.exec_module = counting_exec_module
+
+    chip = siliconcompiler.Chip(design='gcd')
+    for step in ('syn', 'floorplan', 'physyn', 'place', 'cts', 'route'):
+        chip.set('flowarg', f'{step}_np', str(N))
+    chip.load_target('freepdk45_demo')
+    flow = chip.get('flow')
+
+    lookups = 0
+    del executed[:]
+    start = time.time()
+    for step in chip.getkeys('flowgraph', flow):
+        for index in chip.getkeys('flowgraph', flow, step):
+            tool = chip.get('flowgraph', flow, step, index, 'tool')
+            if tool in chip.builtin:
+                continue
+            chip.set('arg', 'step', step)
+            chip.set('arg', 'index', index)
+            for funcname in TOOL_FUNCTIONS:
+                chip.find_function(tool, funcname, 'tools')
+                lookups += 1
+    elapsed = time.time() - start
+
+    print(f'asicflow N={N}: {lookups} lookups, {len(executed)} tool module '
+          f'imports in {elapsed:.3f}s')
+    return
+
+if __name__ == '__main__':
+    main()
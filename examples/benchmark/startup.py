@@ -0,0 +1,31 @@
+'''Benchmark to measure the time taken to construct Chip objects.
+
+$ ./examples/benchmark/startup.py <N>
+Reports the time taken by the first Chip() in a process, and the average
+time of N further Chip() calls.
+
+Set SC_SCHEMA_CACHE=<dir> to also use the on-disk schema cache.
+'''
+
+import siliconcompiler
+
+import sys
+import time
+
+def main():
+    N = int(sys.argv[1])
+
+    start = time.time()
+    siliconcompiler.Chip()
+    first = time.time() - start
+
+    start = time.time()
+    for _ in range(N):
+        siliconcompiler.Chip()
+    average = (time.time() - start) / N
+
+    print(f'first Chip(): {first*1e3:.2f} ms, average Chip(): {average*1e3:.2f} ms')
+    return
+
+if __name__ == '__main__':
+    main()
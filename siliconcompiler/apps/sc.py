@@ -12,7 +12,6 @@ from multiprocessing import Process
 
 #Shorten siliconcompiler as sc
 import siliconcompiler
-import siliconcompiler.client
 
 ###########################
 def main():
@@ -1,15 +1,12 @@
 # Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
 
 import base64
-import glob
 import math
 import multiprocessing
 import importlib
 import json
 import os
 import requests
-import shutil
-import subprocess
 import sys
 import time
 import urllib.parse
@@ -36,6 +33,19 @@ def get_base_url(chip):
         remote_protocol = 'https://' if str(remote_port) == '443' else 'http://'
     return remote_protocol + remote_host
 
+###################################
+_session = None
+
+def _get_session():
+    '''Helper method to get the requests session shared by all API calls,
+    which keeps connections to the server open and reuses them.
+    '''
+
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
 ###################################
 def remote_preprocess(chip):
     '''Helper method to run a local import stage for remote jobs.
@@ -92,30 +102,56 @@ def remote_run(chip):
     # Ask the remote server to start processing the requested step.
     request_remote_run(chip)
 
-    # Remove the local 'import.tar.gz' archive.
-    local_archive = stepdir = os.path.join(chip.get('dir'),
-                                           chip.get('design'),
-                                           chip.get('jobname'),
-                                           'import.tar.gz')
-    if os.path.isfile(local_archive):
-        os.remove(local_archive)
-
-    # Check the job's progress periodically until it finishes.
-    is_busy = True
-    while is_busy:
-      chip.logger.info("Job is still running. (%d seconds)"%(
-                       int(time.monotonic() - step_start)))
-      time.sleep(30)
-      try:
-          is_busy = is_job_busy(chip)
-      except:
-          # Sometimes an exception is raised if the request library cannot
-          # reach the server due to a transient network issue.
-          # Retrying ensures that jobs don't break off when the connection drops.
-          is_busy = True
-          chip.logger.info("Unknown network error encountered: retrying.")
+    # Wait for progress reports until the job finishes. The server answers
+    # as soon as a task finishes, so results of finished tasks are fetched
+    # while the rest of the job runs.
+    remote_tasks = [f'{step}/{index}' for step in chip.get('steplist')
+                    for index in chip.getkeys('flowgraph', chip.get('flow'), step)]
+    progress = {'status': 'queued', 'tasks': {}, 'tag': None}
+    while progress['status'] != 'done':
+        try:
+            update = check_progress(chip, since=progress['tag'])
+        except Exception:
+            # Sometimes an exception is raised if the request library cannot
+            # reach the server due to a transient network issue.
+            # Retrying ensures that jobs don't break off when the connection drops.
+            chip.logger.info("Unknown network error encountered: retrying.")
+            time.sleep(5)
+            continue
+
+        for task in sorted(update['tasks']):
+            if task in remote_tasks and update['tasks'][task] != progress['tasks'].get(task):
+                _report_task(chip, task, update['tasks'][task])
+
+        if update['status'] != 'done':
+            if update['tag'] is None or update['tag'] == progress['tag']:
+                chip.logger.info("Job is still %s. (%d seconds)"%(
+                                 update['status'], int(time.monotonic() - step_start)))
+            if update['tag'] is None:
+                # Servers without progress reports are polled.
+                time.sleep(30)
+        progress = update
     chip.logger.info("Remote job run completed!")
 
+###################################
+def _report_task(chip, task, info):
+    '''Helper method to log the status and metrics of a finished remote task,
+    and to fetch its results.
+    '''
+
+    chip.logger.info(f"Remote task {task} finished with status '{info['status']}'.")
+    if info['metrics']:
+        chip.logger.info(f"Remote task {task} metrics: " +
+                         ', '.join(f'{metric}={value}' for metric, value in sorted(info['metrics'].items())))
+
+    step, index = task.split('/')
+    prefix = os.path.join(chip.get('design'), chip.get('jobname'), step, index)
+    try:
+        sync_results(chip, prefix)
+    except Exception as e:
+        # The results are fetched again once the job finishes.
+        chip.logger.warning(f"Could not fetch results of remote task {task}: {e}")
+
 ###################################
 def request_remote_run(chip):
     '''Helper method to make a web request to start a job stage.
@@ -143,36 +179,49 @@ def request_remote_run(chip):
     # If '-remote_user' and '-remote_key' are not both specified,
     # no authorizaion is configured; proceed without crypto.
     # If they were specified, these files are now encrypted.
-    subprocess.run(['tar',
-                    '-czf',
-                    'import.tar.gz',
-                    '--exclude',
-                    'import.tar.gz',
-                    '.'],
-                   stdout=subprocess.PIPE,
-                   stderr=subprocess.STDOUT,
-                   cwd=local_build_dir)
-    upload_file = os.path.abspath(os.path.join(local_build_dir, 'import.tar.gz'))
 
     # Make the actual request, streaming the bulk data as a multipart file.
+    # The archive is created while it is uploaded, so no copy of the build
+    # directory is written to disk.
     # Redirected POST requests are translated to GETs. This is actually
     # part of the HTTP spec, so we need to manually follow the trail.
     redirect_url = remote_run_url
     while redirect_url:
-        with open(upload_file, 'rb') as f:
-            resp = requests.post(redirect_url,
-                                 files={'import': f,
-                                        'params': json.dumps(post_params)},
-                                 allow_redirects=False)
-            if resp.status_code == 302:
-                redirect_url = resp.headers['Location']
-            elif resp.status_code >= 400:
-                chip.logger.error(resp.json()['message'])
-                chip.logger.error('Error starting remote job run; quitting.')
-                raise RuntimeError('Remote server returned unrecoverable error code.')
-            else:
-                chip.logger.info(resp.text)
-                return
+        boundary = uuid.uuid4().hex
+        archive = utils.archive_stream(local_build_dir,
+                                       compression=chip.get('remotecompress'),
+                                       exclude=['import.tar.gz'])
+        resp = _get_session().post(redirect_url,
+                                   data=_multipart_upload(boundary, post_params, archive),
+                                   headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+                                   allow_redirects=False)
+        if resp.status_code == 302:
+            redirect_url = resp.headers['Location']
+        elif resp.status_code >= 400:
+            chip.logger.error(resp.text)
+            chip.logger.error('Error starting remote job run; quitting.')
+            raise RuntimeError('Remote server returned unrecoverable error code.')
+        else:
+            chip.logger.info(resp.text)
+            return
+
+###################################
+def _multipart_upload(boundary, params, archive):
+    '''Generator for the body of a multipart 'remote_run' request: the JSON
+    parameters, followed by the 'import' archive streamed from the archive
+    generator. Parameters come first, so the server can extract the archive
+    as it is received.
+    '''
+
+    yield (f'--{boundary}\r\n'
+           'Content-Disposition: form-data; name="params"\r\n'
+           'Content-Type: application/json\r\n\r\n').encode()
+    yield json.dumps(params).encode()
+    yield (f'\r\n--{boundary}\r\n'
+           'Content-Disposition: form-data; name="import"; filename="import.tar.gz"\r\n'
+           'Content-Type: application/octet-stream\r\n\r\n').encode()
+    yield from archive
+    yield f'\r\n--{boundary}--\r\n'.encode()
 
 ###################################
 def is_job_busy(chip):
@@ -199,14 +248,62 @@ def is_job_busy(chip):
     # Make the request and print its response.
     redirect_url = remote_run_url
     while redirect_url:
-        resp = requests.post(redirect_url,
-                             data=json.dumps(post_params),
-                             allow_redirects=False)
+        resp = _get_session().post(redirect_url,
+                                   data=json.dumps(post_params),
+                                   allow_redirects=False)
         if resp.status_code == 302:
             redirect_url = resp.headers['Location']
         else:
             return (resp.text != "Job has no running steps.")
 
+###################################
+def check_progress(chip, since=None, wait=30):
+    '''Helper method to wait for the progress of a remote job.
+
+    The server holds the request until the status of the job or of one of
+    its tasks differs from the report tagged 'since', or for up to 'wait'
+    seconds. Returns the report, a dictionary with the job 'status'
+    ('queued', 'running' or 'done'), the 'status' and 'metrics' of its
+    finished 'tasks' keyed by '<step>/<index>', and the 'tag' to pass in
+    the next call. Servers without progress reports answer immediately,
+    with a 'tag' of None and no tasks.
+    '''
+
+    # Set the request URL.
+    remote_run_url = urllib.parse.urljoin(get_base_url(chip), '/check_progress/')
+
+    # Set common parameters.
+    post_params = {
+        'job_hash': chip.status['jobhash'],
+        'job_id': chip.get('jobname'),
+        'wait': wait,
+        'since': since,
+    }
+
+    # Set authentication parameters if necessary.
+    rcfg = chip.status['remote_cfg']
+    if ('username' in rcfg) and ('password' in rcfg):
+        post_params['username'] = rcfg['username']
+        post_params['key'] = rcfg['password']
+
+    # Make the request; a response is due within 'wait' seconds.
+    redirect_url = remote_run_url
+    while redirect_url:
+        resp = _get_session().post(redirect_url,
+                                   data=json.dumps(post_params),
+                                   allow_redirects=False,
+                                   timeout=wait + 60)
+        if resp.status_code == 302:
+            redirect_url = resp.headers['Location']
+        elif resp.status_code >= 400:
+            chip.logger.error(resp.text)
+            raise RuntimeError('Remote server returned unrecoverable error code.')
+        elif resp.headers.get('Content-Type', '').startswith('application/json'):
+            return resp.json()
+        else:
+            busy = (resp.text != "Job has no running steps.")
+            return {'status': 'running' if busy else 'done', 'tasks': {}, 'tag': None}
+
 ###################################
 def delete_job(chip):
     '''Helper method to delete a job from shared remote storage.
@@ -229,9 +326,9 @@ def delete_job(chip):
     # Make the request.
     redirect_url = remote_run_url
     while redirect_url:
-        resp = requests.post(redirect_url,
-                             data=json.dumps(post_params),
-                             allow_redirects=False)
+        resp = _get_session().post(redirect_url,
+                                   data=json.dumps(post_params),
+                                   allow_redirects=False)
         if resp.status_code == 302:
                 redirect_url = resp.headers['Location']
         else:
@@ -239,8 +336,12 @@ def delete_job(chip):
             return response
 
 ###################################
-def fetch_results_request(chip):
+def fetch_results_request(chip, retries=5):
     '''Helper method to fetch job results from a remote compute cluster.
+
+    The results archive is streamed to disk in chunks. If the download is
+    interrupted, or a partial archive is left over from a previous attempt,
+    the download is resumed with a Range request, up to 'retries' times.
     '''
 
     # Set the request URL.
@@ -258,54 +359,196 @@ def fetch_results_request(chip):
         post_params = {}
 
     # Make the web request, and stream the results archive in chunks.
+    zipfn = '%s.tar.gz'%job_hash
     redirect_url = remote_run_url
     can_redirect = False
+    attempts = 0
     while redirect_url:
-        with open('%s.tar.gz'%job_hash, 'wb') as zipf:
-            resp = requests.post(redirect_url,
-                                 data=json.dumps(post_params),
-                                 allow_redirects=can_redirect,
-                                 stream=True)
+        headers = {}
+        if os.path.isfile(zipfn) and os.path.getsize(zipfn) > 0:
+            headers['Range'] = 'bytes=%d-'%os.path.getsize(zipfn)
+        try:
+            resp = _get_session().post(redirect_url,
+                                       data=json.dumps(post_params),
+                                       headers=headers,
+                                       allow_redirects=can_redirect,
+                                       stream=True)
             if resp.status_code == 302:
                 redirect_url = resp.headers['Location']
             elif resp.status_code == 303:
                 redirect_url = resp.headers['Location']
                 can_redirect = True
+            elif resp.status_code == 416:
+                # The partial archive is already complete.
+                return
+            elif resp.status_code >= 400:
+                chip.logger.error(resp.text)
+                raise RuntimeError('Remote server returned unrecoverable error code.')
             else:
-                shutil.copyfileobj(resp.raw, zipf)
+                # 206 continues a partial archive, 200 replaces it.
+                mode = 'ab' if resp.status_code == 206 else 'wb'
+                with open(zipfn, mode) as zipf:
+                    for chunk in resp.iter_content(chunk_size=1 << 20):
+                        zipf.write(chunk)
                 return
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError) as e:
+            attempts += 1
+            if attempts > retries:
+                raise
+            chip.logger.info(f"Results download interrupted, resuming: {e}")
+
+###################################
+def fetch_results_manifest(chip, prefix=''):
+    '''Helper method to fetch the results manifest of a job: a dictionary
+    of {path: [size, hash]} for the result files under prefix, with paths
+    relative to the build directory. Symbolic links are listed as
+    [None, target]. Returns None if the server does not provide results
+    manifests.
+    '''
+
+    # Set the request URL.
+    job_hash = chip.status['jobhash']
+    remote_run_url = urllib.parse.urljoin(get_base_url(chip), '/get_results_manifest/' + job_hash)
+
+    # Set authentication parameters if necessary.
+    post_params = {'prefix': prefix}
+    rcfg = chip.status['remote_cfg']
+    if ('username' in rcfg) and ('password' in rcfg):
+        post_params['username'] = rcfg['username']
+        post_params['key'] = rcfg['password']
+
+    # Make the request.
+    redirect_url = remote_run_url
+    while redirect_url:
+        resp = _get_session().post(redirect_url,
+                                   data=json.dumps(post_params),
+                                   allow_redirects=False)
+        if resp.status_code == 302:
+            redirect_url = resp.headers['Location']
+        elif resp.status_code == 404:
+            return None
+        elif resp.status_code >= 400:
+            chip.logger.error(resp.text)
+            raise RuntimeError('Remote server returned unrecoverable error code.')
+        else:
+            return resp.json()['files']
+
+###################################
+def fetch_results_files(chip, files):
+    '''Helper method to download a list of result files of a job, given as
+    paths relative to the build directory. The archive sent by the server
+    is extracted into the build directory as it is received.
+    '''
+
+    # Set the request URL.
+    job_hash = chip.status['jobhash']
+    remote_run_url = urllib.parse.urljoin(get_base_url(chip), '/get_results_files/' + job_hash + '.tar.gz')
+
+    # Set authentication parameters if necessary.
+    post_params = {'files': files}
+    rcfg = chip.status['remote_cfg']
+    if ('username' in rcfg) and ('password' in rcfg):
+        post_params['username'] = rcfg['username']
+        post_params['key'] = rcfg['password']
+
+    # Make the request, and extract the streamed archive.
+    redirect_url = remote_run_url
+    while redirect_url:
+        resp = _get_session().post(redirect_url,
+                                   data=json.dumps(post_params),
+                                   allow_redirects=False,
+                                   stream=True)
+        if resp.status_code == 302:
+            redirect_url = resp.headers['Location']
+        elif resp.status_code >= 400:
+            chip.logger.error(resp.text)
+            raise RuntimeError('Remote server returned unrecoverable error code.')
+        else:
+            with resp:
+                resp.raw.decode_content = True
+                utils.extract_archive(resp.raw, chip.get('dir'))
+            return
+
+###################################
+def sync_results(chip, prefix=''):
+    '''Helper method to download the result files of a job under prefix
+    (for example, the directory of a finished step) which are missing or
+    out of date in the local build directory. Files which the client
+    already has, such as the outputs of the local 'import' step, are not
+    transferred again.
+
+    Returns the list of downloaded files, or None if the server does not
+    provide results manifests.
+    '''
+
+    manifest = fetch_results_manifest(chip, prefix)
+    if manifest is None:
+        return None
+
+    local_dir = chip.get('dir')
+    fetch = []
+    unchanged = []
+    for path, (size, digest) in manifest.items():
+        localpath = os.path.join(local_dir, path)
+        if size is None:
+            # Skip 'import' symlinks, which would dangle locally.
+            if os.path.basename(path).startswith('import'):
+                continue
+            if not (os.path.islink(localpath) and os.readlink(localpath) == digest):
+                fetch.append(path)
+        elif (os.path.isfile(localpath) and not os.path.islink(localpath) and
+              os.path.getsize(localpath) == size):
+            # Files of the same size are compared by their hashes.
+            unchanged.append(path)
+        else:
+            fetch.append(path)
+
+    if unchanged:
+        hashes = chip._hash_filelist([os.path.join(local_dir, path) for path in unchanged],
+                                     'sha256')
+        fetch.extend(path for path, digest in zip(unchanged, hashes)
+                     if digest != manifest[path][1])
+
+    fetch.sort()
+    if fetch:
+        fetch_results_files(chip, fetch)
+
+    size = sum(manifest[path][0] or 0 for path in fetch)
+    total = sum(entry[0] or 0 for entry in manifest.values())
+    chip.logger.info(f"Fetched {len(fetch)} of {len(manifest)} result files "
+                     f"({size} of {total} bytes).")
+    return fetch
 
 ###################################
 def fetch_results(chip):
     '''Helper method to fetch and open job results from a remote compute cluster.
+
+    Only the result files which are missing or out of date locally are
+    downloaded. Servers which do not provide results manifests send the
+    archive of the whole job instead.
     '''
 
+    if sync_results(chip) is not None:
+        # Call 'delete_job' to remove the run from the server.
+        delete_job(chip)
+        return
+
     # Fetch the remote archive after the export stage.
     fetch_results_request(chip)
 
     # Call 'delete_job' to remove the run from the server.
     delete_job(chip)
 
-    # Unzip the results.
-    top_design = chip.get('design')
+    # Unzip the results directly into the local build directory.
     job_hash = chip.status['jobhash']
-    job_nameid = f"{chip.get('jobname')}"
     local_dir = chip.get('dir')
 
-    # Authenticated jobs get a zip file full of other zip files.
-    # So we need to extract and delete those.
-    subprocess.run(['tar', '-xzf', f'{job_hash}.tar.gz'])
+    # Skip 'import' symlinks, which would dangle locally.
+    def skip(member):
+        return member.issym() and os.path.basename(member.name).startswith('import')
+
+    with open(f'{job_hash}.tar.gz', 'rb') as f:
+        utils.extract_archive(f, local_dir, skip=skip)
     # Remove the results archive after it is extracted.
     os.remove(f'{job_hash}.tar.gz')
-
-    # Remove dangling 'import' symlinks if necessary.
-    for import_link in glob.iglob(job_hash + '/' + top_design + '/**/import*',
-                                  recursive=True):
-        if os.path.islink(import_link):
-            os.remove(import_link)
-    # Copy the results into the local build directory, and remove the
-    # unzipped directory (including encrypted archives).
-    utils.copytree(job_hash,
-                   local_dir,
-                   dirs_exist_ok = True)
-    shutil.rmtree(job_hash)
@@ -1,13 +1,13 @@
 # Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
 
 import argparse
-import base64
 import time
 import datetime
 import multiprocessing
+import multiprocessing.connection
 import tarfile
 import traceback
-import asyncio
+import subprocess
 from subprocess import run, PIPE
 import os
 import glob
@@ -18,34 +18,51 @@ import re
 import json
 import logging
 import hashlib
+import bisect
 import shutil
 import copy
 import importlib
 import textwrap
 import math
-import pandas
-import yaml
-import graphviz
-import time
 import uuid
 import shlex
 import platform
 import getpass
-import distro
-import netifaces
-import webbrowser
-import packaging.version
-import packaging.specifiers
-from jinja2 import Environment, FileSystemLoader
 from pathlib import Path
 from timeit import default_timer as timer
-from siliconcompiler.client import *
 from siliconcompiler.schema import *
 from siliconcompiler.scheduler import _deferstep
 from siliconcompiler import leflib
 from siliconcompiler import utils
 from siliconcompiler import _metadata
-import psutil
+
+# Heavy or rarely needed modules (pandas, yaml, graphviz, jinja2, psutil,
+# webbrowser, distro, netifaces, packaging and the remote client) are
+# imported where they are used to keep 'import siliconcompiler' fast.
+
+# Modules imported by find_function(), keyed by (moduletype, modulename,
+# path), along with the modification time of the module file.
+_module_cache = {}
+
+# Compiled grep expressions (see Chip._compile_grep()), keyed by argument string.
+_grep_cache = {}
+
+# Combined scan_file() patterns (see Chip._compile_scan()).
+_scan_cache = {}
+
+# File hash caches (see Chip._hash_filelist()), keyed by cache file path.
+_hash_cache = {}
+
+# Top level schema sections that run() updates. Partial manifest merges only
+# read these sections.
+PARTIAL_SECTIONS = ('metric', 'flowstatus', 'record')
+
+# Magic first line of sectioned manifests (*.sjson)
+SJSON_MAGIC = b'SCSJSON 1\n'
+
+# Number of times run() lets smaller tasks overtake a ready task which does
+# not fit in the free CPU slots or memory, before holding them for it.
+BACKFILL_LIMIT = 3
 
 class TaskStatus():
     # Could use Python 'enum' class here, but that doesn't work nicely with
@@ -75,7 +92,7 @@ class Chip:
         self.scroot = os.path.dirname(os.path.abspath(__file__))
         self.cwd = os.getcwd()
         self.error = 0
-        self.cfg = schema_cfg()
+        self.cfg = schema_default()
         # The 'status' dictionary can be used to store ephemeral config values.
         # Its contents will not be saved, and can be set by parent scripts
         # such as a web server or supervisor process. Currently supported keys:
@@ -113,6 +130,17 @@ class Chip:
             'checklists': []
         }
 
+    ###########################################################################
+    @property
+    def cfg(self):
+        return self._cfg
+
+    @cfg.setter
+    def cfg(self, cfg):
+        # Replacing the schema dictionary invalidates the keypath index.
+        self._cfg = cfg
+        self._invalidate_keyindex()
+
     ###########################################################################
     def _init_logger(self, step=None, index=None, in_run=False):
 
@@ -275,7 +303,7 @@ class Chip:
                                         help=helpstr,
                                         default=argparse.SUPPRESS)
                 #list type arguments
-                elif re.match(r'\[', typestr):
+                elif ParamType.parse(typestr).is_list:
                     #all the rest
                     parser.add_argument(*switchstrs,
                                         metavar='',
@@ -422,7 +450,7 @@ class Chip:
 
                         #Check that keypath is valid
                         if self.valid(*args[:-1], quiet=True):
-                            if re.match(r'\[', self.get(*args[:-1], field='type')):
+                            if ParamType.parse(self.get(*args[:-1], field='type')).is_list:
                                 self.add(*args)
                             else:
                                 self.set(*args, clobber=True)
@@ -495,9 +523,7 @@ class Chip:
             else:
                 self.logger.info(f"Loading function '{funcname}' from module '{modulename}'")
             try:
-                spec = importlib.util.spec_from_file_location(modulename, fullpath)
-                imported = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(imported)
+                imported = self._load_module(moduletype, modulename, fullpath)
 
                 if hasattr(imported, funcname):
                     function = getattr(imported, funcname)
@@ -509,6 +535,28 @@ class Chip:
                 self.logger.error(f"Module setup failed for '{modulename}'")
                 self.error = 1
 
+    ##########################################################################
+    def _load_module(self, moduletype, modulename, fullpath):
+        '''
+        Imports a module file found by find_function().
+
+        Modules are cached per process and only re-executed if the module
+        file was modified since it was last imported.
+        '''
+
+        key = (moduletype, modulename, fullpath)
+        mtime = os.stat(fullpath).st_mtime_ns
+        entry = _module_cache.get(key)
+        if entry is None or entry[0] != mtime:
+            spec = importlib.util.spec_from_file_location(modulename, fullpath)
+            imported = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(imported)
+            # replaces the entry of a modified module
+            entry = (mtime, imported)
+            _module_cache[key] = entry
+
+        return entry[1]
+
     ##########################################################################
     def load_target(self, name):
         """
@@ -681,9 +729,8 @@ class Chip:
         helpstr = helpstr.replace("\n", "")
         helpstr = ' '.join(helpstr.split())
 
-        for idx, item in enumerate(example):
-            example[idx] = ' '.join(item.split())
-            example[idx] = example[idx].replace(", ", ",")
+        # example list is shared with the schema template, don't modify it
+        example = [' '.join(item.split()).replace(", ", ",") for item in example]
 
         #Wrap text
         para = textwrap.TextWrapper(width=60)
@@ -795,7 +842,7 @@ class Chip:
 
         keypathstr = ','.join(keypath)
 
-        self.logger.debug(f"Reading from [{keypathstr}]. Field = '{field}'")
+        self.logger.debug("Reading from [%s]. Field = '%s'", keypathstr, field)
         return self._search(cfg, keypathstr, *keypath, field=field, mode='get')
 
     ###########################################################################
@@ -838,7 +885,10 @@ class Chip:
                 keys.remove('default')
         else:
             self.logger.debug('Getting all schema parameter keys.')
-            keys = list(self._allkeys(cfg))
+            if cfg is self._cfg:
+                keys = [list(keypath) for keypath in self._keypaths()]
+            else:
+                keys = list(self._allkeys(cfg))
 
         return keys
 
@@ -909,14 +959,16 @@ class Chip:
                 self.logger.error(f"Key [{key}] is not a string [{args}]")
 
         keypathstr = ','.join(args[:-1])
-        all_args = list(args)
 
         # Special case to ensure loglevel is updated ASAP
         if len(args) == 2 and args[0] == 'loglevel' and field == 'value':
             self.logger.setLevel(args[1])
 
-        self.logger.debug(f"Setting [{keypathstr}] to {args[-1]}")
-        return self._search(cfg, keypathstr, *all_args, field=field, mode='set', clobber=clobber)
+        if args[0] == 'flowgraph' and cfg is self._cfg:
+            self._flowgraph_dags = {}
+
+        self.logger.debug("Setting [%s] to %s", keypathstr, args[-1])
+        return self._search(cfg, keypathstr, *args, field=field, mode='set', clobber=clobber)
 
     ###########################################################################
     def add(self, *args, cfg=None, field='value'):
@@ -952,10 +1004,53 @@ class Chip:
                 self.logger.error(f"Key [{key}] is not a string [{args}]")
 
         keypathstr = ','.join(args[:-1])
-        all_args = list(args)
 
-        self.logger.debug(f'Appending value {args[-1]} to [{keypathstr}]')
-        return self._search(cfg, keypathstr, *all_args, field=field, mode='add')
+        if args[0] == 'flowgraph' and cfg is self._cfg:
+            self._flowgraph_dags = {}
+
+        self.logger.debug('Appending value %s to [%s]', args[-1], keypathstr)
+        return self._search(cfg, keypathstr, *args, field=field, mode='add')
+
+    ###########################################################################
+    def remove(self, *keypath):
+        '''
+        Removes a schema parameter and all of its subparameters.
+
+        Only keys created from a 'default' dictionary (such as a flowgraph,
+        a library or a step) can be removed. Removing keys through this
+        function, rather than by editing chip.cfg directly, keeps the
+        keypath index used by getkeys() consistent. Removing a
+        non-existent or built-in keypath produces a logger error message
+        and raises the Chip object error flag.
+
+        Args:
+            keypath (list str): Variable length ordered schema key list
+
+        Examples:
+            >>> chip.remove('flowgraph', 'asicflow')
+            Removes the 'asicflow' flowgraph.
+        '''
+
+        keypathstr = ','.join(keypath)
+        cfg = self.cfg
+        for key in keypath[:-1]:
+            if key not in cfg:
+                cfg = None
+                break
+            cfg = cfg[key]
+
+        if not keypath or cfg is None or keypath[-1] not in cfg:
+            self.logger.error(f"Remove keypath [{keypathstr}] does not exist.")
+            self.error = 1
+            return
+        if keypath[-1] == 'default' or 'default' not in cfg:
+            self.logger.error(f"Keypath [{keypathstr}] is part of the schema and can't be removed.")
+            self.error = 1
+            return
+
+        self.logger.debug('Removing [%s]', keypathstr)
+        del cfg[keypath[-1]]
+        self._invalidate_keyindex()
 
 
     ###########################################################################
@@ -976,257 +1071,315 @@ class Chip:
                 self._allkeys(cfg[k], keys=newkeys, keylist=keylist)
         return keylist
 
+    ###########################################################################
+    def _indexleaves(self, cfg, prefix, index):
+        '''
+        Adds all leaf cells found below cfg to index, keyed by their keypath
+        tuple (prefixed with prefix).
+        '''
+
+        for k, v in cfg.items():
+            keypath = prefix + (k,)
+            if 'defvalue' in v:
+                index[keypath] = v
+            else:
+                self._indexleaves(v, keypath, index)
+
+    ###########################################################################
+    def _invalidate_keyindex(self):
+        '''
+        Drops the keypath index of self.cfg, along with the cached flowgraph
+        task graphs. Must be called whenever keys are added to or removed
+        from self.cfg without going through set()/add()/remove().
+        '''
+
+        self._keyindex = None
+        self._keyindex_views = {}
+        self._flowgraph_dags = {}
+
+    ###########################################################################
+    def _keypaths(self, typematch=None, scope=None):
+        '''
+        Returns a cached list of all keypath tuples in self.cfg.
+
+        The index is built on first use and kept up to date as set()/add()
+        instantiate 'default' branches, so repeated enumeration does not walk
+        the schema. Results can be filtered by a substring of the parameter
+        type (eg. 'file', or ('file', 'dir') to match either) and/or by the
+        parameter scope. The returned list is shared and must not be
+        modified by the caller.
+        '''
+
+        if self._keyindex is None:
+            self._keyindex = {}
+            self._indexleaves(self._cfg, (), self._keyindex)
+
+        view = (typematch, scope)
+        if view not in self._keyindex_views:
+            keypaths = []
+            for keypath, leaf in self._keyindex.items():
+                if typematch is not None:
+                    if isinstance(typematch, str):
+                        typematch = (typematch,)
+                    if not any(t in leaf['type'] for t in typematch):
+                        continue
+                if scope is not None and leaf.get('scope') != scope:
+                    continue
+                keypaths.append(keypath)
+            self._keyindex_views[view] = keypaths
+
+        return self._keyindex_views[view]
+
     ###########################################################################
     def _search(self, cfg, keypath, *args, field='value', mode='get', clobber=True):
         '''
-        Internal recursive function that searches the Chip schema for a
-        match to the combination of *args and fields supplied. The function is
-        used to set and get data within the dictionary.
+        Internal function that searches the Chip schema for a match to the
+        combination of *args and fields supplied. The function is used to set
+        and get data within the dictionary.
+
+        The keypath is walked one level at a time, instantiating 'default'
+        branches as needed, so an access costs one dict lookup per key.
+        Type handling is delegated to the cached ParamType of the leaf.
 
         Args:
             cfg(dict): The cfg schema to search
             keypath (str): Concatenated keypath used for error logging.
             args (str): Keypath/value variable list used for access
             field(str): Leaf cell field to access.
-            mode(str): Action (set/get/add/getkeys/getkeys)
+            mode(str): Action (set/get/add/getkeys/getcfg)
             clobber(bool): Specifies to clobber (for set action)
 
         '''
 
-        all_args = list(args)
-        param = all_args[0]
-        val = all_args[-1]
-        empty = [None, 'null', [], 'false']
+        #set/add leaf cell
+        if mode in ('set', 'add') and len(args) > 1:
+            leaf = self._findleaf(cfg, keypath, args[:-1], create=True)
+            if leaf is None:
+                return None
+            return self._setleaf(leaf, keypath, args[-1], field, mode, clobber)
 
-        #set/add leaf cell (all_args=(param,val))
-        if (mode in ('set', 'add')) & (len(all_args) == 2):
-            # clean error if key not found
-            if (not param in cfg) & (not 'default' in cfg):
-                self.logger.error(f"Set/Add keypath [{keypath}] does not exist.")
-                self.error = 1
+        #get leaf cell
+        leaf = self._findleaf(cfg, keypath, args)
+        if leaf is None:
+            return None
+
+        if mode == 'getcfg':
+            return leaf
+        elif mode == 'getkeys':
+            return leaf.keys()
+        elif field == 'value':
+            #Select default if no value has been set
+            if 'value' in leaf:
+                selval = leaf['value']
             else:
-                # making an 'instance' of default if not found
-                if (not param in cfg) & ('default' in cfg):
-                    cfg[param] = copy.deepcopy(cfg['default'])
-                list_type =bool(re.match(r'\[', cfg[param]['type']))
-                # checking for illegal fields
-                if not field in cfg[param] and (field != 'value'):
-                    self.logger.error(f"Field '{field}' for keypath [{keypath}]' is not a valid field.")
-                    self.error = 1
-                # check legality of value
-                if field == 'value':
-                    (type_ok,type_error) = self._typecheck(cfg[param], param, val)
-                    if not type_ok:
-                        self.logger.error("%s", type_error)
-                        self.error = 1
-                # converting python True/False to lower case string
-                if (field == 'value') and (cfg[param]['type'] == 'bool'):
-                    if val == True:
-                        val = "true"
-                    elif val == False:
-                        val = "false"
-                # checking if value has been set
-                # TODO: fix clobber!!
-                selval = cfg[param]['value']
-                # updating values
-                if cfg[param]['lock'] == "true":
-                    self.logger.debug("Ignoring {mode}{} to [{keypath}]. Lock bit is set.")
-                elif (mode == 'set'):
-                    if (field != 'value') or (selval in empty) or clobber:
-                        if field in ('copy', 'lock'):
-                            # boolean fields
-                            if val is True:
-                                cfg[param][field] = "true"
-                            elif val is False:
-                                cfg[param][field] = "false"
-                            else:
-                                self.logger.error(f'{field} must be set to boolean.')
-                                self.error = 1
-                        elif field in ('hashalgo', 'scope', 'require', 'type', 'unit',
-                                       'shorthelp', 'switch', 'help'):
-                            # awlays string scalars
-                            cfg[param][field] = val
-                        elif field in ('example'):
-                            # list from default schema (already a list)
-                            cfg[param][field] = val
-                        elif field in ('signature', 'filehash', 'date', 'author'):
-                            # convert to list if appropriate
-                            if isinstance(val, list) | (not list_type):
-                                cfg[param][field] = val
-                            else:
-                                cfg[param][field] = [val]
-                        elif (not list_type) & (val is None):
-                            # special case for None
-                            cfg[param][field] = None
-                        elif (not list_type) & (not isinstance(val, list)):
-                            # convert to string for scalar value
-                            cfg[param][field] = str(val)
-                        elif list_type & (not isinstance(val, list)):
-                            # convert to string for list value
-                            cfg[param][field] = [str(val)]
-                        elif list_type & isinstance(val, list):
-                            # converting tuples to strings
-                            if re.search(r'\(', cfg[param]['type']):
-                                cfg[param][field] = list(map(str,val))
-                            else:
-                                cfg[param][field] = val
-                        else:
-                            self.logger.error(f"Assigning list to scalar for [{keypath}]")
-                            self.error = 1
+                selval = leaf['defvalue']
+            return ParamType.parse(leaf['type']).convert(selval)
+        elif field not in leaf:
+            self.error = 1
+            self.logger.error(f"Field '{field}' not found for keypath [{keypath}]")
+            return None
+        else:
+            #all non-value fields are strings (or lists of strings)
+            fieldval = leaf[field]
+            if fieldval == 'true':
+                return True
+            elif fieldval == 'false':
+                return False
+            else:
+                return fieldval
+
+    ###########################################################################
+    def _findleaf(self, cfg, keypath, keys, create=False):
+        '''
+        Internal helper that walks cfg along keys and returns the node found,
+        or None if the keypath does not exist. Missing branches that
+        have a 'default' sibling are instantiated on the way down. Missing
+        leaf cells are only instantiated if create is True.
+        '''
+
+        # new keys instantiated below self.cfg are added to the keypath index
+        indexed = cfg is self._cfg
+
+        last = len(keys) - 1
+        for depth, key in enumerate(keys):
+            if key not in cfg:
+                if 'default' not in cfg or (depth == last and not create):
+                    if depth == last and create:
+                        self.logger.error(f"Set/Add keypath [{keypath}] does not exist.")
                     else:
-                        self.logger.debug(f"Ignoring set() to [{keypath}], value already set. Use clobber=true to override.")
-                elif (mode == 'add'):
-                    if field in ('filehash', 'date', 'author', 'signature'):
-                        cfg[param][field].append(str(val))
-                    elif field in ('copy', 'lock'):
-                        self.logger.error(f"Illegal use of add() for scalar field {field}.")
-                        self.error = 1
-                    elif list_type & (not isinstance(val, list)):
-                        cfg[param][field].append(str(val))
-                    elif list_type & isinstance(val, list):
-                        cfg[param][field].extend(val)
+                        self.logger.error(f"Get keypath [{keypath}] does not exist.")
+                    self.error = 1
+                    return None
+                # making an 'instance' of default if not found
+                cfg[key] = schema_instance(cfg['default'])
+                self._index_add(indexed, keys[:depth+1], cfg[key])
+            cfg = cfg[key]
+
+        return cfg
+
+    ###########################################################################
+    def _index_add(self, indexed, keys, subcfg):
+        '''
+        Internal helper for _search() that records a newly instantiated
+        'default' branch in the keypath index.
+        '''
+
+        if self._keyindex is None:
+            return
+        if not indexed:
+            # The branch may live anywhere below self.cfg (eg. in 'history'),
+            # so fall back to rebuilding the index on next use.
+            self._invalidate_keyindex()
+            return
+
+        prefix = tuple(keys)
+        if 'defvalue' in subcfg:
+            self._keyindex[prefix] = subcfg
+        else:
+            self._indexleaves(subcfg, prefix, self._keyindex)
+        self._keyindex_views = {}
+
+    ###########################################################################
+    def _setleaf(self, leaf, keypath, val, field, mode, clobber):
+        '''
+        Internal helper for _search() that sets or adds a field of a single
+        parameter leaf cell.
+        '''
+
+        empty = [None, 'null', [], 'false']
+
+        ptype = ParamType.parse(leaf['type'])
+        list_type = ptype.is_list
+
+        # checking for illegal fields
+        if (field != 'value') and (field not in leaf):
+            self.logger.error(f"Field '{field}' for keypath [{keypath}]' is not a valid field.")
+            self.error = 1
+            return None
+        # check legality of value
+        if field == 'value':
+            (type_ok, type_error) = self._typecheck(leaf, keypath, val)
+            if not type_ok:
+                self.logger.error("%s", type_error)
+                self.error = 1
+            # converting python True/False to lower case string
+            if ptype.is_bool:
+                if val == True:
+                    val = "true"
+                elif val == False:
+                    val = "false"
+
+        # updating values
+        if leaf['lock'] == "true":
+            self.logger.debug(f"Ignoring {mode}() to [{keypath}]. Lock bit is set.")
+        elif mode == 'set':
+            # TODO: fix clobber!!
+            if (field != 'value') or (leaf['value'] in empty) or clobber:
+                if field in ('copy', 'lock'):
+                    # boolean fields
+                    if val is True:
+                        leaf[field] = "true"
+                    elif val is False:
+                        leaf[field] = "false"
                     else:
-                        self.logger.error(f"Illegal use of add() for scalar parameter [{keypath}].")
+                        self.logger.error(f'{field} must be set to boolean.')
                         self.error = 1
-                return cfg[param][field]
-        #get leaf cell (all_args=param)
-        elif len(all_args) == 1:
-            if not param in cfg:
-                self.error = 1
-                self.logger.error(f"Get keypath [{keypath}] does not exist.")
-            elif mode == 'getcfg':
-                return cfg[param]
-            elif mode == 'getkeys':
-                return cfg[param].keys()
-            else:
-                if not (field in cfg[param]) and (field!='value'):
-                    self.error = 1
-                    self.logger.error(f"Field '{field}' not found for keypath [{keypath}]")
-                elif field == 'value':
-                    #Select default if no value has been set
-                    if field not in cfg[param]:
-                        selval = cfg[param]['defvalue']
+                elif field in ('hashalgo', 'scope', 'require', 'type', 'unit',
+                               'shorthelp', 'switch', 'help', 'example'):
+                    # always string scalars (example is already a list)
+                    leaf[field] = val
+                elif field in ('signature', 'filehash', 'date', 'author'):
+                    # convert to list if appropriate
+                    if isinstance(val, list) or (not list_type):
+                        leaf[field] = val
                     else:
-                        selval =  cfg[param]['value']
-                    #check for list
-                    if bool(re.match(r'\[', cfg[param]['type'])):
-                        sctype = re.sub(r'[\[\]]', '', cfg[param]['type'])
-                        return_list = []
-                        if selval is None:
-                            return None
-                        for item in selval:
-                            if sctype == 'int':
-                                return_list.append(int(item))
-                            elif sctype == 'float':
-                                return_list.append(float(item))
-                            elif sctype.startswith('(str,'):
-                                if isinstance(item,tuple):
-                                    return_list.append(item)
-                                else:
-                                    tuplestr = re.sub(r'[\(\)\'\s]','',item)
-                                    return_list.append(tuple(tuplestr.split(',')))
-                            elif sctype.startswith('(float,'):
-                                if isinstance(item,tuple):
-                                    return_list.append(item)
-                                else:
-                                    tuplestr = re.sub(r'[\(\)\s]','',item)
-                                    return_list.append(tuple(map(float, tuplestr.split(','))))
-                            else:
-                                return_list.append(item)
-                        return return_list
+                        leaf[field] = [val]
+                elif (not list_type) and (val is None):
+                    # special case for None
+                    leaf[field] = None
+                elif (not list_type) and (not isinstance(val, list)):
+                    # convert to string for scalar value
+                    leaf[field] = str(val)
+                elif list_type and (not isinstance(val, list)):
+                    # convert to string for list value
+                    leaf[field] = [str(val)]
+                elif list_type and isinstance(val, list):
+                    # converting tuples to strings
+                    if ptype.is_tuple:
+                        leaf[field] = list(map(str, val))
                     else:
-                        if selval is None:
-                            # Unset scalar of any type
-                            scalar = None
-                        elif cfg[param]['type'] == "int":
-                            #print(selval, type(selval))
-                            scalar = int(float(selval))
-                        elif cfg[param]['type'] == "float":
-                            scalar = float(selval)
-                        elif cfg[param]['type'] == "bool":
-                            scalar = (selval == 'true')
-                        elif re.match(r'\(', cfg[param]['type']):
-                            tuplestr = re.sub(r'[\(\)\s]','',selval)
-                            scalar = tuple(map(float, tuplestr.split(',')))
-                        else:
-                            scalar = selval
-                        return scalar
-                #all non-value fields are strings (or lists of strings)
+                        leaf[field] = val
                 else:
-                    if cfg[param][field] == 'true':
-                        return True
-                    elif cfg[param][field] == 'false':
-                        return False
-                    else:
-                        return cfg[param][field]
-        #if not leaf cell descend tree
-        else:
-            ##copying in default tree for dynamic trees
-            if not param in cfg and 'default' in cfg:
-                cfg[param] = copy.deepcopy(cfg['default'])
-            elif not param in cfg:
+                    self.logger.error(f"Assigning list to scalar for [{keypath}]")
+                    self.error = 1
+            else:
+                self.logger.debug(f"Ignoring set() to [{keypath}], value already set. Use clobber=true to override.")
+        elif mode == 'add':
+            if field in SHARED_FIELDS and isinstance(leaf[field], list):
+                # shared with the 'default' template, copy before appending
+                leaf[field] = leaf[field].copy()
+            if field in ('filehash', 'date', 'author', 'signature'):
+                leaf[field].append(str(val))
+            elif field in ('copy', 'lock'):
+                self.logger.error(f"Illegal use of add() for scalar field {field}.")
                 self.error = 1
-                self.logger.error(f"Get keypath [{keypath}] does not exist.")
-                return None
-            all_args.pop(0)
-            return self._search(cfg[param], keypath, *all_args, field=field, mode=mode, clobber=clobber)
+            elif list_type and (not isinstance(val, list)):
+                leaf[field].append(str(val))
+            elif list_type and isinstance(val, list):
+                leaf[field].extend(val)
+            else:
+                self.logger.error(f"Illegal use of add() for scalar parameter [{keypath}].")
+                self.error = 1
+        return leaf[field]
 
     ###########################################################################
-    def _prune(self, cfg, top=True, keeplists=False):
+    def _prune(self, cfg, keeplists=False):
         '''
-        Internal recursive function that creates a local copy of the Chip
-        schema (cfg) with only essential non-empty parameters retained.
+        Internal function that creates a local copy of the Chip schema (cfg)
+        with only essential non-empty parameters retained.
 
+        The copy is built in a single walk over cfg: 'default' templates and
+        empty leaf cells are skipped without being copied, help and example
+        fields are dropped, and branches left empty are never created.
         '''
 
-        # create a local copy of dict
-        if top:
-            localcfg = copy.deepcopy(cfg)
-        else:
-            localcfg = cfg
-
-        #10 should be enough for anyone...
-        maxdepth = 10
-        i = 0
-
         #Prune when the default & value are set to the following
         if keeplists:
             empty = ("null", None)
         else:
             empty = ("null", None, [])
 
-        # When at top of tree loop maxdepth times to make sure all stale
-        # branches have been removed, not elegant, but stupid-simple
-        # "good enough"
-        while i < maxdepth:
-            #Loop through all keys starting at the top
-            for k in list(localcfg.keys()):
-                #removing all default/template keys
-                # reached a default subgraph, delete it
-                if k == 'default':
-                    del localcfg[k]
-                # reached leaf-cell
-                elif 'help' in localcfg[k].keys():
-                    del localcfg[k]['help']
-                elif 'example' in localcfg[k].keys():
-                    del localcfg[k]['example']
-                elif 'defvalue' in localcfg[k].keys():
-                    if localcfg[k]['defvalue'] in empty:
-                        if 'value' in localcfg[k].keys():
-                            if localcfg[k]['value'] in empty:
-                                del localcfg[k]
-                        else:
-                            del localcfg[k]
-                #removing stale branches
-                elif not localcfg[k]:
-                    localcfg.pop(k)
-                #keep traversing tree
-                else:
-                    self._prune(cfg=localcfg[k], top=False, keeplists=keeplists)
-            if top:
-                i += 1
+        return self._prunetree(cfg, empty)
+
+    ###########################################################################
+    def _prunetree(self, cfg, empty):
+        '''
+        Internal recursive helper for _prune().
+        '''
+
+        localcfg = {}
+        for k, v in cfg.items():
+            #removing all default/template keys
+            if k == 'default':
+                continue
+            # reached leaf-cell
+            if 'defvalue' in v:
+                if v['defvalue'] in empty and v.get('value') in empty:
+                    continue
+                leaf = {}
+                for field, fieldval in v.items():
+                    if field in ('help', 'example'):
+                        continue
+                    # lists hold strings, a shallow copy is independent
+                    if isinstance(fieldval, list):
+                        fieldval = fieldval.copy()
+                    leaf[field] = fieldval
+                localcfg[k] = leaf
+            #keep traversing tree, removing stale branches
             else:
-                break
+                subcfg = self._prunetree(v, empty)
+                if subcfg:
+                    localcfg[k] = subcfg
 
         return localcfg
 
@@ -1338,7 +1491,7 @@ class Chip:
             self.error = 1
             return None
 
-        is_list = bool(re.match(r'\[', paramtype))
+        is_list = ParamType.parse(paramtype).is_list
 
         paths = self.get(*keypath, cfg=cfg, job=job)
         # Convert to list if we have scalar
@@ -1423,6 +1576,9 @@ class Chip:
         '''
         Internal function that goes through provided dictionary and resolves all
         relative paths where required.
+
+        cfg must be a copy of (part of) self.cfg: paths are resolved against
+        self.cfg and the results are stored in cfg.
         '''
 
         for keypath in self.getkeys(cfg=cfg):
@@ -1431,31 +1587,128 @@ class Chip:
             if value:
                 #only do something if type is file or dir
                 if 'file' in paramtype or 'dir' in paramtype:
-                    abspaths = self.find_files(*keypath, cfg=cfg, missing_ok=True)
+                    abspaths = self.find_files(*keypath, missing_ok=True)
                     self.set(*keypath, abspaths, cfg=cfg)
 
     ###########################################################################
-    def _print_csv(self, cfg, fout=None):
-        allkeys = self.getkeys(cfg=cfg)
-        for key in allkeys:
-            keypath = f'"{",".join(key)}"'
-            value = self.get(*key, cfg=cfg)
-            if isinstance(value,list):
-                for item in value:
-                    fout.write(f"{keypath},{item}")
-            else:
-                fout.write(f"{keypath},{value}")
+    def _print_sectioned(self, sections, fout=None):
+        '''
+        Writes manifest sections (see _manifest_sections()) as a sectioned
+        manifest to the binary file fout.
+
+        The file starts with SJSON_MAGIC, followed by one line holding a json
+        table of {section: [offset, length]}, followed by the compact json
+        encoding of each top level section. Offsets are relative to the end
+        of the table line.
+        '''
+
+        blobs = []
+        table = {}
+        offset = 0
+        for cfg in sections:
+            for section, subcfg in cfg.items():
+                blob = json.dumps(subcfg, separators=(',', ':'), sort_keys=True).encode('utf-8')
+                table[section] = [offset, len(blob)]
+                offset += len(blob)
+                blobs.append(blob)
+
+        fout.write(SJSON_MAGIC)
+        fout.write(json.dumps(table, separators=(',', ':')).encode('utf-8') + b'\n')
+        for blob in blobs:
+            fout.write(blob)
+
+    ###########################################################################
+    def _read_sectioned(self, fin, sections=None):
+        '''
+        Reads a sectioned manifest from the binary file fin.
+
+        If sections is given, only those top level sections are decoded and
+        the data of all other sections is skipped over.
+        '''
+
+        if fin.readline() != SJSON_MAGIC:
+            self.logger.error('Sectioned manifest has an invalid header')
+            self.error = 1
+            return {}
+
+        table = json.loads(fin.readline())
+        start = fin.tell()
+
+        if sections is None:
+            sections = table.keys()
+
+        localcfg = {}
+        # read in file order so gzip streams only ever seek forward
+        for section in sorted((s for s in sections if s in table), key=lambda s: table[s][0]):
+            offset, length = table[section]
+            fin.seek(start + offset)
+            localcfg[section] = json.loads(fin.read(length))
+
+        return localcfg
+
+    ###########################################################################
+    def _print_json(self, sections, fout=None, compact=False):
+        '''
+        Writes manifest sections (see _manifest_sections()) to fout as a
+        single json object, encoding one section at a time. The output is
+        identical to json.dumps() of the whole manifest with sorted keys.
+
+        Compact json holds each top level section on a line of its own, so
+        partial reads (see utils.read_json_sections()) only decode the sections
+        they need.
+        '''
+
+        if compact:
+            separator = '{\n'
+            for cfg in sections:
+                for section, subcfg in cfg.items():
+                    fout.write(f'{separator}{json.dumps(section)}:')
+                    fout.write(json.dumps(subcfg, separators=(',', ':'), sort_keys=True))
+                    separator = ',\n'
+            fout.write('\n}\n' if separator == ',\n' else '{}')
+        else:
+            separator = '{\n    '
+            for cfg in sections:
+                for section, subcfg in cfg.items():
+                    # nest section one level deeper
+                    blob = json.dumps(subcfg, indent=4, sort_keys=True).replace('\n', '\n    ')
+                    fout.write(f'{separator}{json.dumps(section)}: {blob}')
+                    separator = ',\n    '
+            fout.write('\n}' if separator != '{\n    ' else '{}')
 
     ###########################################################################
-    def _print_tcl(self, cfg, fout=None, prefix=""):
+    def _print_csv(self, sections, fout=None):
+        for cfg in sections:
+            allkeys = self.getkeys(cfg=cfg)
+            for key in allkeys:
+                keypath = f'"{",".join(key)}"'
+                value = self.get(*key, cfg=cfg)
+                if isinstance(value,list):
+                    for item in value:
+                        fout.write(f"{keypath},{item}")
+                else:
+                    fout.write(f"{keypath},{value}")
+
+    ###########################################################################
+    def _print_tcl(self, sections, fout=None, prefix=""):
         '''
-        Prints out schema as TCL dictionary
+        Prints out manifest sections (see _manifest_sections()) as TCL
+        dictionary
         '''
 
         fout.write("#############################################")
         fout.write("#!!!! AUTO-GENERATED FILE. DO NOT EDIT!!!!!!")
         fout.write("#############################################\n")
 
+        for cfg in sections:
+            self._print_tcl_keys(cfg, fout, prefix)
+
+    ###########################################################################
+    def _print_tcl_keys(self, cfg, fout, prefix):
+        '''
+        Internal helper for _print_tcl() that prints all keypaths of cfg.
+        '''
+
         allkeys = self.getkeys(cfg=cfg)
 
         for key in allkeys:
@@ -1465,7 +1718,7 @@ class Chip:
             # convert None to empty list
             if value is None:
                 alist = []
-            elif bool(re.match(r'\[', typestr)):
+            elif ParamType.parse(typestr).is_list:
                 alist = value
             elif typestr == "bool" and value:
                 alist = ["true"]
@@ -1524,39 +1777,81 @@ class Chip:
         """
         if job is not None:
             # fill ith default schema before populating
-            self.cfg['history'][job] = schema_cfg()
+            self.cfg['history'][job] = schema_default()
+            self._invalidate_keyindex()
             dst = self.cfg['history'][job]
         else:
             dst = self.cfg
 
-        for keylist in self.getkeys(cfg=cfg):
-            if partial and keylist[0] not in ('metric', 'flowstatus', 'record'):
+        # history is merged separately by _read_manifest()
+        if partial:
+            src = {k: v for k, v in cfg.items() if k in PARTIAL_SECTIONS}
+        else:
+            src = {k: v for k, v in cfg.items() if k != 'history'}
+
+        if job is None and 'flowgraph' in src:
+            self._flowgraph_dags = {}
+
+        self._merge_tree(src, dst, dst, [], clobber, clear, check)
+
+    ###########################################################################
+    def _merge_tree(self, src, root, dst, keys, clobber, clear, check):
+        '''
+        Internal helper for _merge_manifest() that merges the src subtree into
+        the matching dst subtree of root in a single walk. dst is None if the
+        subtree does not exist in root yet.
+
+        Leaf cells are merged with the same semantics as set()/add() for
+        values and set() for other fields, without a keypath search per
+        access. 'default' keypaths are skipped.
+        '''
+
+        for key, subsrc in src.items():
+            if key == 'default':
+                continue
+
+            keylist = keys + [key]
+            subdst = dst.get(key) if dst is not None else None
+
+            if 'defvalue' not in subsrc:
+                self._merge_tree(subsrc, root, subdst, keylist, clobber, clear, check)
                 continue
-            if keylist[0] == 'history':
+
+            #only read in valid keypaths
+            if check and not self.valid(*keylist, quiet=False, default_valid=True):
                 continue
-            #only read in valid keypaths without 'default'
-            key_valid = True
-            if check:
-                key_valid = self.valid(*keylist, quiet=False, default_valid=True)
-            if key_valid and 'default' not in keylist:
-                # update value, handling scalars vs. lists
-                typestr = self.get(*keylist, cfg=cfg, field='type')
-                val = self.get(*keylist, cfg=cfg)
-                arg = keylist.copy()
-                arg.append(val)
-                if bool(re.match(r'\[', typestr)) & bool(not clear):
-                    self.add(*arg, cfg=dst)
-                else:
-                    self.set(*arg, cfg=dst, clobber=clobber)
 
-                # update other fields that a user might modify
-                for field in self.getdict(*keylist, cfg=cfg).keys():
-                    if field in ('value', 'switch', 'type', 'require', 'defvalue',
-                                 'shorthelp', 'example', 'help'):
-                        # skip these fields (value handled above, others are static)
-                        continue
-                    v = self.get(*keylist, cfg=cfg, field=field)
-                    self.set(*keylist, v, cfg=dst, field=field)
+            keypath = ','.join(keylist)
+            if subdst is None:
+                subdst = self._findleaf(root, keypath, keylist, create=True)
+                if subdst is None:
+                    continue
+
+            # update value, handling scalars vs. lists
+            ptype = ParamType.parse(subsrc['type'])
+            if 'value' in subsrc:
+                val = ptype.convert(subsrc['value'])
+            else:
+                val = ptype.convert(subsrc['defvalue'])
+            if ptype.is_list and not clear:
+                self._setleaf(subdst, keypath, val, 'value', 'add', True)
+            else:
+                if keylist == ['loglevel']:
+                    # Special case to ensure loglevel is updated ASAP
+                    self.logger.setLevel(val)
+                self._setleaf(subdst, keypath, val, 'value', 'set', clobber)
+
+            # update other fields that a user might modify
+            for field, v in subsrc.items():
+                if field in ('value', 'switch', 'type', 'require', 'defvalue',
+                             'shorthelp', 'example', 'help'):
+                    # skip these fields (value handled above, others are static)
+                    continue
+                if v == 'true':
+                    v = True
+                elif v == 'false':
+                    v = False
+                self._setleaf(subdst, keypath, v, field, 'set', True)
 
     ###########################################################################
     def _keypath_empty(self, key):
@@ -1577,36 +1872,36 @@ class Chip:
         allowed_paths = [os.path.join(self.cwd, self.get('dir'))]
         allowed_paths.extend(os.environ['SC_VALID_PATHS'].split(os.pathsep))
 
-        for keypath in self.getkeys():
+        #only do something if type is file or dir
+        for keypath in self._keypaths(typematch=('file', 'dir')):
             if 'default' in keypath:
                 continue
 
-            paramtype = self.get(*keypath, field='type')
-            #only do something if type is file or dir
-            if ('history' not in keypath) and ('file' in paramtype or 'dir' in paramtype):
+            if 'history' in keypath:
+                continue
 
-                if self.get(*keypath) is None:
-                    # skip unset values (some directories are None by default)
-                    continue
+            if self.get(*keypath) is None:
+                # skip unset values (some directories are None by default)
+                continue
 
-                abspaths = self.find_files(*keypath, missing_ok=True)
-                if not isinstance(abspaths, list):
-                    abspaths = [abspaths]
+            abspaths = self.find_files(*keypath, missing_ok=True)
+            if not isinstance(abspaths, list):
+                abspaths = [abspaths]
 
-                for abspath in abspaths:
-                    ok = False
+            for abspath in abspaths:
+                ok = False
 
-                    if abspath is not None:
-                        for allowed_path in allowed_paths:
-                            if os.path.commonpath([abspath, allowed_path]) == allowed_path:
-                                ok = True
-                                continue
+                if abspath is not None:
+                    for allowed_path in allowed_paths:
+                        if os.path.commonpath([abspath, allowed_path]) == allowed_path:
+                            ok = True
+                            continue
 
-                    if not ok:
-                        self.logger.error(f'Keypath {keypath} contains path(s) '
-                            'that do not exist or resolve to files outside of '
-                            'allowed directories.')
-                        return False
+                if not ok:
+                    self.logger.error(f'Keypath {list(keypath)} contains path(s) '
+                        'that do not exist or resolve to files outside of '
+                        'allowed directories.')
+                    return False
 
         return True
 
@@ -1616,24 +1911,22 @@ class Chip:
         Verifies that paths to all files in manifest are valid.
         '''
 
-        allkeys = self.getkeys()
-        for keypath in allkeys:
+        for keypath in self._keypaths(typematch=('file', 'dir')):
             allpaths = []
             paramtype = self.get(*keypath, field='type')
-            if 'file' in paramtype or 'dir' in paramtype:
-                if 'dir' not in keypath and self.get(*keypath):
-                    allpaths = list(self.get(*keypath))
-                for path in allpaths:
-                    #check for env var
-                    m = re.match(r'\$(\w+)(.*)', path)
-                    if m:
-                        prefix_path = os.environ[m.group(1)]
-                        path = prefix_path + m.group(2)
-                    file_error = 'file' in paramtype and not os.path.isfile(path)
-                    dir_error = 'dir' in paramtype and not os.path.isdir(path)
-                    if file_error or dir_error:
-                        self.logger.error(f"Paramater {keypath} path {path} is invalid")
-                        self.error = 1
+            if 'dir' not in keypath and self.get(*keypath):
+                allpaths = list(self.get(*keypath))
+            for path in allpaths:
+                #check for env var
+                m = re.match(r'\$(\w+)(.*)', path)
+                if m:
+                    prefix_path = os.environ[m.group(1)]
+                    path = prefix_path + m.group(2)
+                file_error = 'file' in paramtype and not os.path.isfile(path)
+                dir_error = 'dir' in paramtype and not os.path.isdir(path)
+                if file_error or dir_error:
+                    self.logger.error(f"Paramater {list(keypath)} path {path} is invalid")
+                    self.error = 1
 
     ###########################################################################
     def _check_manifest_dynamic(self, step, index):
@@ -1725,6 +2018,18 @@ class Chip:
             self.error = 1
             self.logger.error("Flowgraph doesn't contain import step.")
 
+        if flow in self.getkeys('flowgraph'):
+            cycle = self._flowgraph_dag(flow)['cycle']
+            if cycle:
+                self.error = 1
+                tasks = ', '.join(step + index for step, index in cycle)
+                self.logger.error(f"Flowgraph {flow} contains a cycle, involving tasks {tasks}.")
+
+        stagemode = self.get('stagemode')
+        if stagemode not in ('hardlink', 'reflink', 'symlink', 'copy'):
+            self.error = 1
+            self.logger.error(f"Invalid stagemode {stagemode}. Must be hardlink, reflink, symlink or copy.")
+
         indexlist = {}
         for step in steplist:
             if self.get('indexlist'):
@@ -1908,7 +2213,8 @@ class Chip:
         Reads a manifest from disk and merges it with the current compilation manifest.
 
         The file format read is determined by the filename suffix. Currently
-        json (*.json) and yaml(*.yaml) formats are supported.
+        json (*.json), yaml(*.yaml) and sectioned json (*.sjson) formats are
+        supported.
 
         Args:
             filename (filepath): Path to a manifest file to be loaded.
@@ -1940,15 +2246,26 @@ class Chip:
 
         #Read arguments from file based on file type
 
+        # sectioned manifests are read in binary mode for seeking, others in
+        # text mode (also when compressed) so json sections can be read by line
+        sectioned = re.search(r'(\.sjson)(\.gz)*$', filepath)
+        mode = 'rb' if sectioned else 'rt'
         if filepath.endswith('.gz'):
-            fin = gzip.open(filepath, 'r')
+            fin = gzip.open(filepath, mode)
         else:
-            fin = open(filepath, 'r')
+            fin = open(filepath, mode)
 
         try:
-            if re.search(r'(\.json|\.sup)(\.gz)*$', filepath):
-                localcfg = json.load(fin)
+            if sectioned:
+                sections = PARTIAL_SECTIONS if partial else None
+                localcfg = self._read_sectioned(fin, sections=sections)
+            elif re.search(r'(\.json|\.sup)(\.gz)*$', filepath):
+                if partial:
+                    localcfg = utils.read_json_sections(fin, PARTIAL_SECTIONS)
+                else:
+                    localcfg = json.load(fin)
             elif re.search(r'(\.yaml|\.yml)(\.gz)*$', filepath):
+                import yaml
                 localcfg = yaml.load(fin, Loader=yaml.SafeLoader)
             else:
                 self.logger.error('File format not recognized %s', filepath)
@@ -1969,13 +2286,19 @@ class Chip:
                                     partial=False)
 
     ###########################################################################
-    def write_manifest(self, filename, prune=True, abspath=False, job=None):
+    def write_manifest(self, filename, prune=True, abspath=False, job=None, compact=False):
         '''
         Writes the compilation manifest to a file.
 
         The write file format is determined by the filename suffix. Currently
-        json (*.json), yaml (*.yaml), tcl (*.tcl), and (*.csv) formats are
-        supported.
+        json (*.json), yaml (*.yaml), tcl (*.tcl), (*.csv) and sectioned json
+        (*.sjson) formats are supported. Sectioned json stores each top level
+        schema section as a separate compact json object behind an offset
+        table, so that read_manifest() can load sections independently.
+        A '.gz' suffix compresses the output.
+
+        The manifest is written one top level section at a time, so only one
+        section is copied and held in memory at once.
 
         Args:
             filename (filepath): Output filepath
@@ -1983,6 +2306,9 @@ class Chip:
                  the Chip object schema are written to the output file.
             abspath (bool): If set to True, then all schema filepaths
                  are resolved to absolute filepaths.
+            compact (bool): If True, json is written without indentation,
+                 with one top level section per line. Faster to write and
+                 read, intended for manifests that are only read by programs.
 
         Examples:
             >>> chip.write_manifest('mydump.json')
@@ -1995,43 +2321,81 @@ class Chip:
         if not os.path.exists(os.path.dirname(filepath)):
             os.makedirs(os.path.dirname(filepath))
 
-        if prune:
-            self.logger.debug('Pruning dictionary before writing file %s', filepath)
-            # Keep empty lists to simplify TCL coding
-            if filepath.endswith('.tcl'):
-                keeplists = True
-            else:
-                keeplists = False
-            cfgcopy = self._prune(self.cfg, keeplists=keeplists)
+        # Keep empty lists to simplify TCL coding
+        if filepath.endswith('.tcl'):
+            keeplists = True
         else:
-            cfgcopy = copy.deepcopy(self.cfg)
+            keeplists = False
 
-        # resolve absolute paths
-        if abspath:
-            self._abspath(cfgcopy)
+        # json and yaml list sections in sorted order
+        sort_keys = not re.search(r'(\.tcl|\.csv)(\.gz)*$', filepath)
+        sections = self._manifest_sections(prune=prune,
+                                           keeplists=keeplists,
+                                           abspath=abspath,
+                                           sort_keys=sort_keys)
 
         # format specific dumping
+        # sectioned manifests are written in binary mode
+        sectioned = re.search(r'(\.sjson)(\.gz)*$', filepath)
         if filepath.endswith('.gz'):
-            fout = gzip.open(filepath, 'wt', encoding='UTF-8')
+            if sectioned:
+                fout = gzip.open(filepath, 'wb')
+            else:
+                fout = gzip.open(filepath, 'wt', encoding='UTF-8')
         else:
-            fout = open(filepath, 'w')
+            fout = open(filepath, 'wb' if sectioned else 'w')
 
         # format specific printing
         try:
-            if re.search(r'(\.json|\.sup)(\.gz)*$', filepath):
-                fout.write(json.dumps(cfgcopy, indent=4, sort_keys=True))
+            if sectioned:
+                self._print_sectioned(sections, fout=fout)
+            elif re.search(r'(\.json|\.sup)(\.gz)*$', filepath):
+                self._print_json(sections, fout=fout, compact=compact)
             elif re.search(r'(\.yaml|\.yml)(\.gz)*$', filepath):
-                fout.write(yaml.dump(cfgcopy, Dumper=YamlIndentDumper, default_flow_style=False))
+                import yaml
+                dumper = _yaml_indent_dumper()
+                for cfg in sections:
+                    fout.write(yaml.dump(cfg, Dumper=dumper, default_flow_style=False))
             elif re.search(r'(\.tcl)(\.gz)*$', filepath):
-                self._print_tcl(cfgcopy, prefix="dict set sc_cfg", fout=fout)
+                self._print_tcl(sections, prefix="dict set sc_cfg", fout=fout)
             elif re.search(r'(\.csv)(\.gz)*$', filepath):
-                self._print_csv(cfgcopy, fout=fout)
+                self._print_csv(sections, fout=fout)
             else:
                 self.logger.error('File format not recognized %s', filepath)
                 self.error = 1
         finally:
             fout.close()
 
+    ###########################################################################
+    def _manifest_sections(self, prune=True, keeplists=False, abspath=False, sort_keys=False):
+        '''
+        Generator that yields the manifest one top level section at a time,
+        as single entry {section: cfg} dictionaries.
+
+        Sections are pruned and/or resolved to absolute paths individually,
+        so the whole manifest is never copied at once. Sections that are
+        pruned away entirely are skipped.
+        '''
+
+        sections = self.cfg.keys()
+        if sort_keys:
+            sections = sorted(sections)
+
+        for section in sections:
+            cfg = {section: self.cfg[section]}
+            if prune:
+                cfg = self._prune(cfg, keeplists=keeplists)
+                if not cfg:
+                    continue
+            elif abspath:
+                cfg = copy.deepcopy(cfg)
+
+            # resolve absolute paths
+            if abspath:
+                self._abspath(cfg)
+
+            yield cfg
+
     ###########################################################################
     def check_checklist(self, standard, items=None, check_ok=False):
         '''
@@ -2371,6 +2735,7 @@ class Chip:
         else:
             rankdir = 'TB'
 
+        import graphviz
         dot = graphviz.Digraph(format=fileformat)
         dot.graph_attr['rankdir'] = rankdir
         dot.attr(bgcolor='transparent')
@@ -2410,20 +2775,17 @@ class Chip:
         paths = []
 
         copyall = self.get('copyall')
-        allkeys = self.getkeys()
-        for key in allkeys:
-            leaftype = self.get(*key, field='type')
-            if re.search('file', leaftype):
-                copy = self.get(*key, field='copy')
-                value = self.get(*key)
-                if copyall or copy:
-                    for item in value:
-                        paths.append(item)
+        for key in self._keypaths(typematch='file'):
+            copy = self.get(*key, field='copy')
+            value = self.get(*key)
+            if copyall or copy:
+                for item in value:
+                    paths.append(item)
 
         return paths
 
     ########################################################################
-    def _collect(self, step, index):
+    def _collect(self, step, index, stats=None):
         '''
         Collects files found in the configuration dictionary and places
         them in inputs/. The function only copies in files that have the 'copy'
@@ -2451,7 +2813,7 @@ class Chip:
             abspath = self._find_sc_file(path)
             if abspath:
                 self.logger.info(f"Copying {abspath} to '{indir}' directory")
-                shutil.copy(abspath, os.path.join(indir, filename))
+                utils.copyfile(abspath, os.path.join(indir, filename), link='reflink', stats=stats)
             else:
                 self._haltstep(step, index)
 
@@ -2472,7 +2834,8 @@ class Chip:
                 outputs = []
             design = self.get('design')
             ignore = outputs + [f'{design}.pkg.json']
-            utils.copytree(indir, outdir, dirs_exist_ok=True, link=True, ignore=ignore)
+            utils.copytree(indir, outdir, dirs_exist_ok=True, link=self.get('stagemode'),
+                           ignore=ignore, stats=stats)
         elif tool not in ('join', 'nop'):
             self.error = 1
             self.logger.error(f'Invalid import step builtin {tool}. Must be tool or join.')
@@ -2531,7 +2894,7 @@ class Chip:
                             tar.add(os.path.abspath(logfile), arcname=logfile)
 
     ###########################################################################
-    def hash_files(self, *keypath, algo='sha256', update=True):
+    def hash_files(self, *keypath, algo=None, update=True):
         '''Generates hash values for a list of parameter files.
 
         Generates a a hash value for each file found in the keypath.
@@ -2545,9 +2908,14 @@ class Chip:
         Supported algorithms include SHA1, SHA224, SHA256, SHA384, SHA512,
         and MD5.
 
+        Hash values are cached in the build directory, keyed by the file
+        path, inode, size and modification time, so unchanged files are
+        only hashed once. Files that need hashing are hashed in parallel.
+
         Args:
             *keypath(str): Keypath to parameter.
-            algo (str): Algorithm to use for file hash calculation
+            algo (str): Algorithm to use for file hash calculation. Defaults
+                to the 'hashalgo' field of the parameter.
             update (bool): If True, the hash values are recorded in the
                 chip object manifest.
 
@@ -2565,31 +2933,108 @@ class Chip:
             self.logger.error(f"Illegal attempt to hash non-file parameter [{keypathstr}].")
             self.error = 1
         else:
+            if algo is None:
+                algo = self.get(*keypath, field='hashalgo')
+            algo = algo.lower()
+            if algo not in ('sha1', 'sha224', 'sha256', 'sha384', 'sha512', 'md5'):
+                self.logger.error(f"Unsupported hash algorithm {algo} for [{keypathstr}].")
+                self.error = 1
+                return None
+
             filelist = self.find_files(*keypath)
             #cycle through all paths
-            hashlist = []
             if filelist:
                 self.logger.info(f'Computing hash value for [{keypathstr}]')
+            files = []
             for filename in filelist:
-                if os.path.isfile(filename):
-                    #TODO: Implement algo selection
-                    hashobj = hashlib.sha256()
-                    with open(filename, "rb") as f:
-                        for byte_block in iter(lambda: f.read(4096), b""):
-                            hashobj.update(byte_block)
-                    hash_value = hashobj.hexdigest()
-                    hashlist.append(hash_value)
+                if filename is not None and os.path.isfile(filename):
+                    files.append(filename)
                 else:
                     self.error = 1
                     self.logger.info(f"Internal hashing error, file not found")
+            hashlist = self._hash_filelist(files, algo)
             # compare previous hash to new hash
             oldhash = self.get(*keypath,field='filehash')
             for i,item in enumerate(oldhash):
-                if item != hashlist[i]:
+                if i < len(hashlist) and item != hashlist[i]:
                     self.logger.error(f"Hash mismatch for [{keypath}]")
                     self.error = 1
-            self.set(*keypath, hashlist, field='filehash', clobber=True)
+            if update:
+                self.set(*keypath, hashlist, field='filehash', clobber=True)
+            return hashlist
+
+    ###########################################################################
+    def _hash_filelist(self, filelist, algo):
+        '''
+        Returns the list of hash values of a list of existing files, using
+        the hash cache in the build directory for files that did not change.
+        '''
+
+        cachefile = os.path.join(self.cwd, self.get('dir'), 'hashcache.json')
+        if cachefile not in _hash_cache:
+            _hash_cache[cachefile] = self._read_hash_cache(cachefile)
+        cache = _hash_cache[cachefile]
+
+        # entries are [inode, size, mtime_ns, hash value]
+        hashes = {}
+        new_entries = {}
+        for filename in filelist:
+            stat = os.stat(filename)
+            key = f'{algo}:{os.path.abspath(filename)}'
+            signature = [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+            entry = cache.get(key)
+            if entry and entry[:3] == signature:
+                hashes[filename] = entry[3]
+            elif filename not in hashes:
+                hashes[filename] = None
+                new_entries[key] = signature
+
+        todo = [filename for filename in hashes if hashes[filename] is None]
+        if len(todo) > 1:
+            import concurrent.futures
+            workers = min(len(todo), os.cpu_count() or 1)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                digests = list(pool.map(lambda filename: utils.hash_file(filename, algo), todo))
+        else:
+            digests = [utils.hash_file(filename, algo) for filename in todo]
+
+        for filename, digest in zip(todo, digests):
+            hashes[filename] = digest
+            new_entries[f'{algo}:{os.path.abspath(filename)}'].append(digest)
+
+        if new_entries:
+            cache.update(new_entries)
+            self._write_hash_cache(cachefile, new_entries)
+
+        return [hashes[filename] for filename in filelist]
+
+    ###########################################################################
+    def _read_hash_cache(self, cachefile):
+        '''Reads the hash cache written by _write_hash_cache().'''
 
+        try:
+            with open(cachefile, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    ###########################################################################
+    def _write_hash_cache(self, cachefile, entries):
+        '''
+        Adds entries to the hash cache file. The file is replaced atomically
+        since tasks running in parallel update it.
+        '''
+
+        cache = self._read_hash_cache(cachefile)
+        cache.update(entries)
+        try:
+            os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+            tmpfile = f'{cachefile}.{os.getpid()}'
+            with open(tmpfile, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmpfile, cachefile)
+        except OSError as e:
+            self.logger.warning(f'Could not write hash cache {cachefile}: {e}')
 
     ###########################################################################
     def audit_manifest(self):
@@ -2758,6 +3203,8 @@ class Chip:
         our muscle memory. Partially implemented, not all features supported.
         The function returns None if no match is found.
 
+        Supported switches are -v, -i, -E, -e, -x, -o and -w.
+
         Args:
             arg (string): Command line arguments for grep command
             line (string): Line to process
@@ -2771,42 +3218,12 @@ class Chip:
         if line is None:
             return None
 
-        # Partial list of supported grep options
-        options = {
-            '-v' : False, # Invert the sense of matching
-            '-i' : False, # Ignore case distinctions in patterns and data
-            '-E' : False, # Interpret PATTERNS as extended regular expressions.
-            '-e' : False, # Safe interpretation of pattern starting with "-"
-            '-x' : False, # Select only matches that exactly match the whole line.
-            '-o' : False, # Print only the match parts of a matching line
-            '-w' : False} # Select only lines containing matches that form whole words.
-
-        # Split into repeating switches and everything else
-        match = re.match(r'\s*((?:\-\w\s)*)(.*)', args)
-
-        pattern = match.group(2)
-
-        # Split space separated switch string into list
-        switches = match.group(1).strip().split(' ')
-
-        # Find special -e switch update the pattern
-        for i in range(len(switches)):
-            if switches[i] == "-e":
-                if i != (len(switches)):
-                    pattern = ' '.join(switches[i+1:]) + " " + pattern
-                    switches = switches[0:i+1]
-                    break
-                options["-e"] = True
-            elif switches[i] in options.keys():
-                options[switches[i]] = True
-            elif switches[i] !='':
-                print("ERROR",switches[i])
-
-        #REGEX
-        #TODO: add all the other optinos
-        match = re.search(rf"({pattern})", line)
-        if bool(match) == bool(options["-v"]):
+        compiled = self._compile_grep(args)
+        result = _grep_line(compiled, line.rstrip('\r\n'))
+        if result is None:
             return None
+        elif compiled[3]:
+            return result
         else:
             return line
 
@@ -2850,31 +3267,304 @@ class Chip:
 
         # Creating local dictionary (for speed)
         # self.get is slow
-        checks = {}
-        regex_list = []
+        patterns = {}
         if self.valid('eda', tool, 'regex', step, index, 'default'):
-            regex_list = self.getkeys('eda', tool, 'regex', step, index)
-        for suffix in regex_list:
-            checks[suffix] = {}
-            checks[suffix]['report'] = open(f"{step}.{suffix}", "w")
-            checks[suffix]['args'] = self.get('eda', tool, 'regex', step, index, suffix)
+            for suffix in self.getkeys('eda', tool, 'regex', step, index):
+                patterns[suffix] = self.get('eda', tool, 'regex', step, index, suffix)
+
+        reports = {}
+        for suffix in patterns:
+            reports[suffix] = open(f"{step}.{suffix}", "w")
+
+        try:
+            for suffix, string in self.search_logfile(logfile, patterns):
+                #always print to file
+                print(string.strip(), file=reports[suffix])
+                #selectively print to display
+                if display:
+                    self.logger.info(string.strip())
+        finally:
+            for report in reports.values():
+                report.close()
+
+    ###########################################################################
+    def search_logfile(self, logfile, patterns):
+        '''
+        Searches a log file for lines matching chains of grep expressions.
+
+        All grep expressions are compiled once, and the log file is read in
+        large blocks. A line matches a named chain if it passes through each
+        grep expression of the chain in order, like a shell pipeline of grep
+        commands (see grep()). Lines with no match for the first expression
+        of a chain are skipped by searching the whole block at once.
+
+        Intended for checking log files in tool post_process() functions as
+        well as by check_logfile().
+
+        Args:
+            logfile (filepath): Log file to search.
+            patterns (dict): Lists of grep argument strings keyed by name.
+
+        Returns:
+            Generator of (name, line) tuples in log file order, where line is
+            the output of the last grep expression of the chain.
+
+        Examples:
+            >>> for name, line in chip.search_logfile('place.log', {'errors': ['-i error']}):
+            Iterates over lines of place.log containing 'error'.
+        '''
+
+        chains = []
+        for name, args in patterns.items():
+            chain = [self._compile_grep(arg) for arg in args]
+            if chain:
+                chains.append((name, chain))
 
-        # Looping through patterns for each line
         with open(logfile) as f:
-          for line in f:
-              for suffix in checks:
-                  string = line
-                  for item in checks[suffix]['args']:
-                      if string is None:
-                          break
-                      else:
-                          string = self.grep(item, string)
-                  if string is not None:
-                      #always print to file
-                      print(string.strip(), file=checks[suffix]['report'])
-                      #selectively print to display
-                      if display:
-                          self.logger.info(string.strip())
+            for block in _read_blocks(f):
+                lines = None
+                found = []
+                for order, (name, chain) in enumerate(chains):
+                    regex, invert, exact, only = chain[0]
+                    if invert or _is_string_anchored(regex):
+                        # every line has to be checked, \A and \Z only
+                        # match at the ends of a block, not of each line
+                        if lines is None:
+                            lines = block.split('\n')
+                        for lineno, line in enumerate(lines):
+                            result = _grep_chain(chain, line)
+                            if result is not None:
+                                found.append((lineno, order, name, result))
+                        continue
+
+                    # jump from one candidate line to the next
+                    pos = 0
+                    lineno = 0
+                    linestart = 0
+                    while pos <= len(block):
+                        match = regex.search(block, pos)
+                        if match is None:
+                            break
+                        start = match.start()
+                        lineno += block.count('\n', linestart, start)
+                        linestart = block.rfind('\n', 0, start) + 1
+                        lineend = block.find('\n', start)
+                        if lineend < 0:
+                            lineend = len(block)
+                        result = _grep_chain(chain, block[linestart:lineend])
+                        if result is not None:
+                            found.append((lineno, order, name, result))
+                        pos = lineend + 1
+
+                found.sort(key=lambda item: item[:2])
+                for lineno, order, name, result in found:
+                    yield name, result
+
+    ###########################################################################
+    def _compile_grep(self, args):
+        '''
+        Parses a grep argument string (see grep()) into a tuple of
+        (compiled regex, invert, exact, only matching). Results are cached.
+        '''
+
+        if args in _grep_cache:
+            return _grep_cache[args]
+
+        # Partial list of supported grep options
+        options = {
+            '-v' : False, # Invert the sense of matching
+            '-i' : False, # Ignore case distinctions in patterns and data
+            '-E' : False, # Interpret PATTERNS as extended regular expressions.
+            '-e' : False, # Safe interpretation of pattern starting with "-"
+            '-x' : False, # Select only matches that exactly match the whole line.
+            '-o' : False, # Print only the match parts of a matching line
+            '-w' : False} # Select only lines containing matches that form whole words.
+
+        # Split into repeating switches and everything else
+        match = re.match(r'\s*((?:\-\w\s)*)(.*)', args)
+
+        pattern = match.group(2)
+
+        # Split space separated switch string into list
+        switches = match.group(1).strip().split(' ')
+
+        # Find special -e switch update the pattern
+        for i in range(len(switches)):
+            if switches[i] == "-e":
+                if i != (len(switches)):
+                    pattern = ' '.join(switches[i+1:]) + " " + pattern
+                    switches = switches[0:i+1]
+                    break
+                options["-e"] = True
+            elif switches[i] in options.keys():
+                options[switches[i]] = True
+            elif switches[i] !='':
+                self.logger.error(f"Unsupported grep switch {switches[i]} in '{args}'")
+
+        if options['-w']:
+            pattern = rf"\b(?:{pattern})\b"
+
+        # Multiline mode so ^ and $ also match at line boundaries when
+        # searching a block of lines.
+        flags = re.MULTILINE
+        if options['-i']:
+            flags |= re.IGNORECASE
+
+        compiled = (re.compile(pattern, flags), options['-v'], options['-x'], options['-o'])
+        _grep_cache[args] = compiled
+        return compiled
+
+    ###########################################################################
+    def scan_file(self, filename, patterns, stop=None, once=False):
+        '''
+        Searches a text file for lines matching a set of regex patterns.
+
+        All patterns are combined into a single regex, so each line is
+        matched once no matter how many patterns there are, and lines that
+        match none of the patterns are skipped by searching large blocks of
+        the file at once. Each line is matched against the patterns in order
+        and only the first matching pattern is reported, like a chain of
+        if/elif re.search() calls.
+
+        Args:
+            filename (filepath): File to search.
+            patterns (dict): Regex patterns keyed by name. Patterns must not
+                use named groups or numbered backreferences (such as \\1),
+                since all patterns share one regex.
+            stop (str): Regex pattern. The search ends at the first line
+                matching it.
+            once (bool): If True, only the first match of each pattern is
+                reported and the search ends once all patterns have matched.
+
+        Returns:
+            Generator of (name, groups) tuples in file order, where groups
+            is the tuple of groups captured by the named pattern.
+
+        Examples:
+            >>> for name, groups in chip.scan_file('place.log', {'wns': r'^wns (.*)'}):
+            Iterates over the wns values reported in place.log.
+        '''
+
+        if not patterns:
+            return
+
+        regex, names = self._compile_scan(patterns, stop)
+
+        found = set()
+        with open(filename) as f:
+            for block in _read_blocks(f):
+                pos = 0
+                while pos <= len(block):
+                    # Search the whole block for the next matching line. A
+                    # match running past the end of its line is checked again
+                    # against the line on its own.
+                    match = regex.search(block, pos)
+                    if match is None:
+                        break
+                    start = match.start()
+                    end = block.find('\n', start)
+                    if end < 0:
+                        end = len(block)
+                    pos = end + 1
+
+                    if match.end() > end:
+                        match = regex.match(block[start:end])
+                        if match is None:
+                            continue
+                    name, first, last = names[match.lastgroup]
+                    if name is None:
+                        return
+                    if once:
+                        if name in found:
+                            continue
+                        found.add(name)
+                    yield name, match.groups()[first:last]
+                    if once and len(found) == len(patterns):
+                        return
+
+    ###########################################################################
+    def _compile_scan(self, patterns, stop=None):
+        '''
+        Combines the patterns of scan_file() into one regex. Returns the regex
+        and a dictionary mapping the group name of each pattern to a tuple
+        of (pattern name, first group, last group). The stop pattern has
+        the name None. Results are cached.
+        '''
+
+        key = (tuple(patterns.items()), stop)
+        if key in _scan_cache:
+            return _scan_cache[key]
+
+        items = list(patterns.items())
+        if stop is not None:
+            items.insert(0, (None, stop))
+
+        alternatives = []
+        names = {}
+        group = 0
+        for i, (name, pattern) in enumerate(items):
+            anchored, branches, backrefs = _pattern_structure(pattern)
+            if backrefs:
+                # group numbers shift in the combined regex
+                message = f"scan_file() pattern '{pattern}' uses numbered backreferences"
+                self.logger.error(message)
+                raise SiliconCompilerError(message)
+            # Each alternative scans the whole line before the next one is
+            # tried, so that patterns take precedence in order. Patterns
+            # anchored at the start of the line only need to be tried there.
+            if anchored and not branches:
+                alternatives.append(rf'(?P<_{i}>(?:{pattern}))')
+            else:
+                alternatives.append(rf'.*?(?P<_{i}>(?:{pattern}))')
+            ngroups = re.compile(pattern).groups
+            names[f'_{i}'] = (name, group + 1, group + 1 + ngroups)
+            group += ngroups + 1
+
+        regex = re.compile('^(?:' + '|'.join(alternatives) + ')', re.MULTILINE)
+        _scan_cache[key] = (regex, names)
+        return _scan_cache[key]
+
+    ###########################################################################
+    def extract_metrics(self, filename, metrics, stop=None, once=False):
+        '''
+        Sets metrics for the current step and index from a text file.
+
+        Metrics are declared as a dictionary of regex patterns keyed by
+        metric name. The metric is set to the first group captured by the
+        pattern, or if the pattern is given as a (pattern, function) tuple,
+        to the value returned by the function called with all groups
+        captured. Later matches override earlier ones. Patterns are searched
+        with scan_file().
+
+        Args:
+            filename (filepath): File to search.
+            metrics (dict): Patterns keyed by metric name.
+            stop (str): Regex pattern. The search ends at the first line
+                matching it.
+            once (bool): If True, each metric is set from its first match
+                and the search ends once all metrics are set.
+
+        Examples:
+            >>> chip.extract_metrics('outputs/top.def', {'cells': '^COMPONENTS ([0-9]+)'}, once=True)
+            Sets the cells metric from the DEF COMPONENTS header.
+        '''
+
+        step = self.get('arg', 'step')
+        index = self.get('arg', 'index')
+
+        patterns = {}
+        functions = {}
+        for metric, pattern in metrics.items():
+            if isinstance(pattern, tuple):
+                pattern, functions[metric] = pattern
+            patterns[metric] = pattern
+
+        for metric, groups in self.scan_file(filename, patterns, stop=stop, once=once):
+            if metric in functions:
+                value = functions[metric](*groups)
+            else:
+                value = groups[0]
+            self.set('metric', step, index, metric, 'real', value, clobber=True)
 
     ###########################################################################
     def summary(self, steplist=None, show_all_indices=False):
@@ -2979,25 +3669,42 @@ class Chip:
                         if metric not in metric_list:
                             metric_list.append(metric)
 
+        # resource usage of the tools, shown whenever it was recorded
+        usage_list = []
+        for metric in ('exetime', 'usertime', 'systime', 'memory', 'threads',
+                       'ioread', 'iowrite', 'ctxswitch'):
+            if metric in metric_list:
+                continue
+            for step in steplist:
+                for index in indices_to_show[step]:
+                    if (metric in self.getkeys('metric', step, index) and
+                        'real' in self.getkeys('metric', step, index, metric) and
+                        self.get('metric', step, index, metric, 'real') is not None):
+                        if metric not in usage_list:
+                            usage_list.append(metric)
+
         # print out all metrics
         metrics = []
-        for metric in metric_list:
+        for metric in metric_list + usage_list:
             metrics.append(" " + metric)
             row = []
             for step in steplist:
                 for index in indices_to_show[step]:
                     value = None
-                    if 'real' in self.getkeys('metric', step, index, metric):
+                    if (metric in self.getkeys('metric', step, index) and
+                        'real' in self.getkeys('metric', step, index, metric)):
                         value = self.get('metric', step, index, metric, 'real')
 
                     if value is None:
-                        value = 'ERR'
+                        # builtin tasks don't record resource usage
+                        value = '---' if metric in usage_list else 'ERR'
                     else:
                         value = str(value)
 
                     row.append(" " + value.center(colwidth))
             data.append(row)
 
+        import pandas
         pandas.set_option('display.max_rows', 500)
         pandas.set_option('display.max_columns', 500)
         pandas.set_option('display.width', 100)
@@ -3032,6 +3739,7 @@ class Chip:
                           ['-rd', 'screenshot=1', '-rd', 'scr_w=1024', '-rd', 'scr_h=1024', '-z'])
 
             # Generate results page by passing the Chip manifest into the Jinja2 template.
+            from jinja2 import Environment, FileSystemLoader
             env = Environment(loader=FileSystemLoader(templ_dir))
             results_page = os.path.join(web_dir, 'report.html')
             with open(results_page, 'w') as wf:
@@ -3045,6 +3753,7 @@ class Chip:
 
             # Try to open the results page in a browser, only if '-nodisplay' is not set.
             if not self.get('nodisplay'):
+                import webbrowser
                 try:
                     webbrowser.get(results_page)
                 except webbrowser.Error:
@@ -3077,41 +3786,78 @@ class Chip:
         if flow is None:
             flow = self.get('flow')
 
-        #Get length of paths from step to root
+        dag = self._flowgraph_dag(flow)
+
+        # Steps are ordered by their longest distance from a root task.
+        # Steps that are part of a cycle go last.
         depth = {}
-        for step in self.getkeys('flowgraph', flow):
-            depth[step] = 0
-            for path in self._allpaths(self.cfg, flow, step, str(0)):
-                if len(list(path)) > depth[step]:
-                    depth[step] = len(path)
+        for (step, index), task_depth in dag['depth'].items():
+            depth[step] = max(depth.get(step, 0), task_depth)
+        cyclic = []
+        for step, index in dag['cycle']:
+            if step not in depth and step not in cyclic:
+                cyclic.append(step)
 
-        #Sort steps based on path lenghts
-        sorted_dict = dict(sorted(depth.items(), key=lambda depth: depth[1]))
-        return list(sorted_dict.keys())
+        steps = [step for step in self.getkeys('flowgraph', flow) if step in depth]
+        return sorted(steps, key=lambda step: depth[step]) + cyclic
 
     ###########################################################################
-    def _allpaths(self, cfg, flow, step, index, path=None):
-        '''Recursive helper for finding all paths from provided step, index to
-        root node(s) with no inputs.
-
-        Returns a list of lists.
+    def _flowgraph_dag(self, flow):
         '''
+        Returns the task graph of a flowgraph, cached until the flowgraph is
+        modified.
 
-        if path is None:
-            path = []
+        The graph is a dictionary with the following entries:
 
-        inputs = self.get('flowgraph', flow, step, index, 'input', cfg=cfg)
+        * 'inputs': maps each (step, index) task to its input tasks.
+        * 'outputs': maps each task to the tasks that take it as input.
+        * 'order': list of tasks in topological order.
+        * 'depth': maps each task to the length of the longest path from it
+          to a task without inputs.
+        * 'cycle': list of tasks that are part of, or depend on, a cycle.
+          These are missing from 'order' and 'depth'.
 
-        if not self.get('flowgraph', flow, step, index, 'input', cfg=cfg):
-            return [path]
-        else:
-            allpaths = []
-            for in_step, in_index in inputs:
-                newpath = path.copy()
-                newpath.append(in_step + in_index)
-                allpaths.extend(self._allpaths(cfg, flow, in_step, in_index, path=newpath))
+        The graph is shared and must not be modified by the caller.
+        '''
 
-        return allpaths
+        if flow in self._flowgraph_dags:
+            return self._flowgraph_dags[flow]
+
+        inputs = {}
+        for step in self.getkeys('flowgraph', flow):
+            for index in self.getkeys('flowgraph', flow, step):
+                inputs[(step, index)] = [tuple(task) for task in
+                                         self.get('flowgraph', flow, step, index, 'input')]
+
+        # Kahn's algorithm, computing depths along the way. Inputs that are
+        # not part of the flowgraph count as tasks without inputs.
+        outputs = {task: [] for task in inputs}
+        pending = {}
+        for task, task_inputs in inputs.items():
+            pending[task] = 0
+            for in_task in task_inputs:
+                if in_task in outputs:
+                    outputs[in_task].append(task)
+                    pending[task] += 1
+
+        order = [task for task in inputs if pending[task] == 0]
+        depth = {}
+        for task in order:
+            depth[task] = max((depth.get(in_task, 0) + 1 for in_task in inputs[task]), default=0)
+            for out_task in outputs[task]:
+                pending[out_task] -= 1
+                if pending[out_task] == 0:
+                    order.append(out_task)
+
+        dag = {
+            'inputs': inputs,
+            'outputs': outputs,
+            'order': order,
+            'depth': depth,
+            'cycle': [task for task in inputs if task not in depth]
+        }
+        self._flowgraph_dags[flow] = dag
+        return dag
 
     ###########################################################################
     def clock(self, *, name, pin, period, jitter=0):
@@ -3244,6 +3990,7 @@ class Chip:
                 self._copyparam(self.cfg['flowgraph'][subflow][step],
                                 self.cfg['flowgraph'][flow][newstep],
                                 key)
+            self._invalidate_keyindex()
             # update step names
             for index in self.getkeys('flowgraph', flow, newstep):
                 all_inputs = self.get('flowgraph', flow, newstep, index,'input')
@@ -3520,6 +4267,7 @@ class Chip:
         T11. Run pre_process() function
         T12. Set environment variables
         T13. Check EXE version
+        T13a. Restore results from task cache (skips T16-T19 on a hit)
         T14. Save manifest as TCL/YAML
         T15. Start CPU timer
         T16. Run EXE
@@ -3531,6 +4279,7 @@ class Chip:
         T22. Make a task record
         T23. Save manifest to disk
         T24. Halt if any errors found
+        T24a. Store results in task cache
         T25. Clean up
         T26. chdir
 
@@ -3649,8 +4398,11 @@ class Chip:
         ##################
         # 8. Copy (link) output data from previous steps
 
+        stagemode = self.get('stagemode')
+        stage_stats = {'copied': 0, 'linked': 0}
+
         if step == 'import':
-            self._collect(step, index)
+            self._collect(step, index, stats=stage_stats)
 
         if not self.get('flowgraph', flow, step, index,'input'):
             all_inputs = []
@@ -3666,14 +4418,15 @@ class Chip:
             # Skip copying pkg.json files here, since we write the current chip
             # configuration into inputs/{design}.pkg.json earlier in _runstep.
             utils.copytree(f"../../../{in_job}/{in_step}/{in_index}/outputs", 'inputs/', dirs_exist_ok=True,
-                ignore=[f'{design}.pkg.json'], link=True)
+                ignore=[f'{design}.pkg.json'], link=stagemode, stats=stage_stats)
 
         ##################
         # 9. Copy Reference Scripts
         if tool not in self.builtin:
             if self.get('eda', tool, 'copy'):
                 for refdir in self.find_files('eda', tool, 'refdir', step, index):
-                    utils.copytree(refdir, ".", dirs_exist_ok=True)
+                    # scripts may be edited by the tool, so never share them
+                    utils.copytree(refdir, ".", dirs_exist_ok=True, link='reflink', stats=stage_stats)
 
         ##################
         # 10. Check manifest
@@ -3731,6 +4484,14 @@ class Chip:
             if vercheck and not self._check_version(version, tool):
                 self._haltstep(step, index)
 
+        ##################
+        # 13a. Look up task result cache
+        cache_key = None
+        cache_hit = False
+        if self.get('taskcache') and (tool not in self.builtin) and (not self.get('skipall')):
+            cache_key = self._task_cache_key(step, index, version)
+            cache_hit = self._restore_task_cache(step, index, cache_key)
+
         ##################
         # 14. Write manifest (tool interface) (Don't move this!)
         suffix = self.get('eda', tool, 'format')
@@ -3748,10 +4509,13 @@ class Chip:
 
         # TODO: Currently no memory usage tracking in breakpoints, builtins, or unexpected errors.
         max_mem_bytes = 0
+        usage = {}
+        # set if the tool or post_process() failed, but 'continue' is set
+        task_failed = False
 
         if tool in self.builtin:
-            utils.copytree(f"inputs", 'outputs', dirs_exist_ok=True, link=True)
-        elif not self.get('skipall'):
+            utils.copytree(f"inputs", 'outputs', dirs_exist_ok=True, link=stagemode, stats=stage_stats)
+        elif not self.get('skipall') and not cache_hit:
             cmdlist = self._makecmd(tool, step, index)
             cmdstr = ' '.join(cmdlist)
             self.logger.info("Running in %s", workdir)
@@ -3775,65 +4539,52 @@ class Chip:
                     import pty # Note: this import throws exception on Windows
                     retcode = pty.spawn(cmdlist, read)
             else:
-                with open(logfile, 'w') as log_writer, open(logfile, 'r') as log_reader:
-                    # Use separate reader/writer file objects as hack to display
-                    # live output in non-blocking way, so we can monitor the
-                    # timeout. Based on https://stackoverflow.com/a/18422264.
-                    cmd_start_time = time.time()
-                    proc = subprocess.Popen(cmdlist,
-                                            stdout=log_writer,
-                                            stderr=subprocess.STDOUT)
-                    while proc.poll() is None:
-                        # Gather subprocess memory usage.
-                        try:
-                            pproc = psutil.Process(proc.pid)
-                            max_mem_bytes = max(max_mem_bytes, pproc.memory_full_info().uss)
-                        except psutil.Error:
-                            # Process may have already terminated or been killed.
-                            # Retain existing memory usage statistics in this case.
-                            pass
-
-                        # Loop until process terminates
-                        if not quiet:
-                            sys.stdout.write(log_reader.read())
-                        if timeout is not None and time.time() - cmd_start_time > timeout:
-                            self.logger.error(f'Step timed out after {timeout} seconds')
-                            proc.terminate()
-                            self._haltstep(step, index)
-                        time.sleep(0.1)
-
-                    # Read the remaining
-                    if not quiet:
-                        sys.stdout.write(log_reader.read())
-                    retcode = proc.returncode
+                retcode, usage = self._run_executable(cmdlist, logfile, step, index,
+                                                      timeout=timeout, quiet=quiet)
+                max_mem_bytes = usage['memory']
+                self.logger.info(f"Tool CPU time {usage['cputime']:.2f}s, "
+                                 f"peak memory {max_mem_bytes} bytes, "
+                                 f"peak threads {usage['threads']}")
 
             if retcode != 0:
                 self.logger.warning('Command failed with code %d. See log file %s', retcode, os.path.abspath(logfile))
+                task_failed = True
                 if not self.get('eda', tool, 'continue'):
                     self._haltstep(step, index)
 
+        if stage_stats['copied'] or stage_stats['linked']:
+            self.logger.info(f"Staged task files ({stagemode}): "
+                             f"{stage_stats['copied']} bytes copied, "
+                             f"{stage_stats['linked']} bytes linked")
+
         ##################
         # 17. Capture cpu runtime and memory footprint.
-        cpu_end = time.time()
-        cputime = round((cpu_end - cpu_start),2)
-        self.set('metric', step, index, 'exetime', 'real', cputime)
-        self.set('metric', step, index, 'memory', 'real', max_mem_bytes)
+        # (results restored from the task cache keep the cached values)
+        if not cache_hit:
+            cpu_end = time.time()
+            cputime = round((cpu_end - cpu_start),2)
+            self.set('metric', step, index, 'exetime', 'real', cputime)
+            self.set('metric', step, index, 'memory', 'real', max_mem_bytes)
+            for metric in ('usertime', 'systime', 'ioread', 'iowrite', 'ctxswitch', 'threads'):
+                if metric in usage:
+                    self.set('metric', step, index, metric, 'real', usage[metric])
 
         ##################
         # 18. Post process (could fail)
         post_error = 0
-        if (tool not in self.builtin) and (not self.get('skipall')) :
+        if (tool not in self.builtin) and (not self.get('skipall')) and (not cache_hit):
             func = self.find_function(tool, 'post_process', 'tools')
             if func:
                 post_error = func(self)
                 if post_error:
                     self.logger.error('Post-processing check failed')
+                    task_failed = True
                     if not self.get('eda', tool, 'continue'):
                         self._haltstep(step, index)
 
         ##################
         # 19. Check log file (must be after post-process)
-        if (tool not in self.builtin) and (not self.get('skipall')) :
+        if (tool not in self.builtin) and (not self.get('skipall')) and (not cache_hit):
             self.check_logfile(step=step, index=index, display=not quiet)
 
         ##################
@@ -3866,7 +4617,8 @@ class Chip:
         self.set('arg', 'step', None, clobber=True)
         self.set('arg', 'index', None, clobber=True)
 
-        self.write_manifest(os.path.join("outputs", f"{design}.pkg.json"))
+        # compact, so dependent tasks and run() decode only the sections they merge
+        self.write_manifest(os.path.join("outputs", f"{design}.pkg.json"), compact=True)
 
         ##################
         # 24. Stop if there are errors
@@ -3874,6 +4626,12 @@ class Chip:
             if not self.get('eda', tool, 'continue'):
                 self._haltstep(step, index)
 
+        ##################
+        # 24a. Store results of tasks without errors in task result cache
+        if (cache_key and not cache_hit and not task_failed and
+            not self.get('metric', step, index, 'errors', 'real')):
+            self._store_task_cache(step, index, cache_key)
+
         ##################
         # 25. Clean up non-essential files
         if self.get('clean'):
@@ -3904,11 +4662,12 @@ class Chip:
         check_manifest() function and files in the manifest are hashed based
         on the 'hashmode' schema setting.
 
-        Once launched, each process waits for preceding steps to complete,
-        as defined by the flowgraph 'inputs' parameter. Once a all inputs
-        are ready, previous steps are checked for errors before the
-        process entered a local working directory and starts to run
-        a tool or to execute a built in Chip function.
+        Each task is launched as soon as the preceding steps defined by the
+        flowgraph 'inputs' parameter have completed, subject to the 'maxtasks'
+        and 'maxcpus' limits. Once a task is launched, previous steps are
+        checked for errors before the process enters a local working
+        directory and starts to run a tool or to execute a built in Chip
+        function.
 
         Fatal errors within a step/index process cause all subsequent
         processes to exit before start, returning control to the the main
@@ -3944,6 +4703,14 @@ class Chip:
         # Re-init logger to include run info after setting up flowgraph.
         self._init_logger(in_run=True)
 
+        # Memory used by each task in the previous run of this job, used to
+        # pack tasks onto the local machine. This needs to be collected before
+        # stale results are cleared below.
+        prev_memory = {}
+        for step in self.getkeys('flowgraph', flow):
+            for index in self.getkeys('flowgraph', flow, step):
+                prev_memory[step + index] = self._previous_memory(step, index)
+
         # Run steps if set, otherwise run whole graph
         if self.get('arg', 'step'):
             steplist = [self.get('arg', 'step')]
@@ -4018,13 +4785,14 @@ class Chip:
             # in-progress build directory to the remote server.
             # Data is encrypted if user / key were specified.
             # run remote process
-            remote_preprocess(self)
+            from siliconcompiler import client
+            client.remote_preprocess(self)
 
             # Run the job on the remote server, and wait for it to finish.
-            remote_run(self)
+            client.remote_run(self)
 
             # Fetch results (and delete the job's data from the server).
-            fetch_results(self)
+            client.fetch_results(self)
 
             # Read back configuration from final manifest.
             cfg = os.path.join(self._getworkdir(),f"{self.get('design')}.pkg.json")
@@ -4109,13 +4877,24 @@ class Chip:
                 self.logger.error(f"Check failed. See previous errors.")
                 raise SiliconCompilerError(f"Manifest checks failed.")
 
-            # For each task to run, prepare a process and store its dependencies
+            # For each task to run, record the order in which it was
+            # requested, its local CPU slots, and the tasks it waits on.
+            # Processes are created when a task is launched.
             jobname = self.get('jobname')
-            tasks_to_run = {}
-            processes = {}
+            dag = self._flowgraph_dag(flow)
+            tasks = {}
+            order = {}
+            slots = {}
+            memory = {}
+            deps = {}
+            dependents = {}
             for step in steplist:
                 for index in indexlist[step]:
-                    inputs = [step+index for step, index in self.get('flowgraph', flow, step, index, 'input')]
+                    task = step + index
+                    tasks[task] = (step, index)
+                    order[task] = len(order)
+                    slots[task] = self._task_slots(step, index)
+                    memory[task] = self._task_memory(step, index, prev_memory[task])
 
                     if (jobname in self.getkeys('jobinput') and
                         step in self.getkeys('jobinput', jobname) and
@@ -4123,13 +4902,29 @@ class Chip:
                         self.get('jobinput', jobname, step, index) != jobname):
                         # If we specify a different job as input to this task,
                         # we assume we are good to run it.
-                        tasks_to_run[step+index] = []
+                        inputs = []
                     else:
-                        tasks_to_run[step+index] = inputs
-
-                    processes[step+index] = multiprocessing.Process(target=self._runtask,
-                                                                    args=(step, index, status))
-
+                        inputs = [in_step + in_index for in_step, in_index in
+                                  dag['inputs'][(step, index)]]
+
+                    # Only wait on tasks that have not completed yet.
+                    deps[task] = set(in_task for in_task in inputs
+                                     if status[in_task] == TaskStatus.PENDING)
+                    for in_task in deps[task]:
+                        dependents.setdefault(in_task, []).append(task)
+
+            # Ready tasks are launched in flowgraph order.
+            ready = [order[task] for task in tasks if not deps[task]]
+            tasklist = list(tasks)
+
+            maxtasks = self.get('maxtasks')
+            maxcpus = self.get('maxcpus')
+            if maxcpus is None:
+                maxcpus = os.cpu_count()
+            maxmemory = self.get('maxmemory')
+            if maxmemory is None:
+                import psutil
+                maxmemory = psutil.virtual_memory().total
 
             # We have to deinit the chip's logger before spawning the processes
             # since the logger object is not serializable. _runtask_safe will
@@ -4137,46 +4932,53 @@ class Chip:
             # the primary chip's logger after the processes complete.
             self._deinit_logger()
 
-            running_tasks = []
-            while len(tasks_to_run) > 0 or len(running_tasks) > 0:
-                # Check for new tasks that can be launched.
-                for task, deps in list(tasks_to_run.items()):
-                    # TODO: breakpoint logic:
-                    # if task is bkpt, then don't launch while len(running_tasks) > 0
-
-                    # Clear any tasks that have finished from dependency list.
-                    for in_task in deps.copy():
-                        if status[in_task] != TaskStatus.PENDING:
-                            deps.remove(in_task)
-
-                    # If there are no dependencies left, launch this task and
-                    # remove from tasks_to_run.
-                    if len(deps) == 0:
-                        processes[task].start()
-                        running_tasks.append(task)
-                        del tasks_to_run[task]
+            # Event-driven scheduler: pack ready tasks onto the free CPU slots
+            # and memory, then block until at least one running task exits and
+            # release the tasks waiting on it.
+            running = {}
+            used_slots = 0
+            used_memory = 0
+            skipped = {}
+            remaining = len(tasks)
+            while remaining > 0:
+                free = (maxcpus - used_slots,
+                        maxmemory - used_memory,
+                        maxtasks - len(running) if maxtasks else None)
+                launch = self._pack_tasks([tasklist[i] for i in ready], slots, memory,
+                                          free, bool(running), skipped)
+                for task in launch:
+                    ready.remove(order[task])
+                    step, index = tasks[task]
+                    proc = multiprocessing.Process(target=self._runtask,
+                                                   args=(step, index, status))
+                    proc.start()
+                    running[proc.sentinel] = (task, proc)
+                    used_slots += slots[task]
+                    used_memory += memory[task]
 
                 # Check for situation where we have stuff left to run but don't
-                # have any tasks running. This shouldn't happen, but we will get
-                # stuck in an infinite loop if it does, so we want to break out
-                # with an explicit error.
-                if len(tasks_to_run) > 0 and len(running_tasks) == 0:
+                # have any tasks running. This shouldn't happen, but we will
+                # never be woken up if it does, so we want to break out with an
+                # explicit error.
+                if not running:
                     raise SiliconCompilerError('Tasks left to run, but no '
                         'running tasks. Steplist may be invalid.')
 
-                # Check for completed tasks.
-                # TODO: consider staying in this section of loop until a task
-                # actually completes.
-                for task in running_tasks.copy():
-                    if not processes[task].is_alive():
-                        running_tasks.remove(task)
-                        if processes[task].exitcode > 0:
-                            status[task] = TaskStatus.ERROR
-                        else:
-                            status[task] = TaskStatus.SUCCESS
+                for sentinel in multiprocessing.connection.wait(list(running)):
+                    task, proc = running.pop(sentinel)
+                    proc.join()
+                    used_slots -= slots[task]
+                    used_memory -= memory[task]
+                    remaining -= 1
+                    if proc.exitcode > 0:
+                        status[task] = TaskStatus.ERROR
+                    else:
+                        status[task] = TaskStatus.SUCCESS
 
-                # TODO: exponential back-off with max?
-                time.sleep(0.1)
+                    for out_task in dependents.get(task, []):
+                        deps[out_task].discard(task)
+                        if not deps[out_task]:
+                            bisect.insort(ready, order[out_task])
 
             self._init_logger()
 
@@ -4249,17 +5051,17 @@ class Chip:
         # initialize new dict
         jobname = self.get('jobname')
         self.cfg['history'][jobname] = {}
+        self._invalidate_keyindex()
 
         # copy in all empty values of scope job
-        allkeys = self.getkeys()
-        for key in allkeys:
+        for key in self._keypaths(scope='job'):
             # ignore history in case of cumulative history
             if key[0] != 'history':
-                scope = self.get(*key, field='scope')
-                if not self._keypath_empty(key) and (scope == 'job'):
+                if not self._keypath_empty(key):
                     self._copyparam(self.cfg,
                                     self.cfg['history'][jobname],
-                                    key)
+                                    list(key))
+        self._invalidate_keyindex()
 
     ###########################################################################
     def _copyparam(self, cfgsrc, cfgdst, keypath):
@@ -4463,7 +5265,8 @@ class Chip:
         ok = True
         valuetype = type(value)
         errormsg = ""
-        if (not re.match(r'\[',cfg['type'])) & (valuetype==list):
+        ptype = ParamType.parse(cfg['type'])
+        if (not ptype.is_list) and (valuetype == list):
             errormsg = "Value must be scalar."
             ok = False
             # Iterate over list
@@ -4474,13 +5277,12 @@ class Chip:
             else:
                 valuelist = [value]
                 # Make type python compatible
-            cfgtype = re.sub(r'[\[\]]', '', cfg['type'])
+            cfgtype = ptype.base
             for item in valuelist:
                 valuetype =  type(item)
                 if ((cfgtype != valuetype.__name__) and (item is not None)):
-                    tupletype = re.match(r'\([\w\,]+\)',cfgtype)
                     #TODO: check tuples!
-                    if tupletype:
+                    if ptype.is_tuple:
                         pass
                     elif cfgtype == 'bool':
                         if not item in ['true', 'false']:
@@ -4506,6 +5308,9 @@ class Chip:
                         errormsg = "Type mismach."
                         ok = False
 
+        if ok:
+            return (ok, errormsg)
+
         # Logger message
         if type(value) == list:
             printvalue = ','.join(map(str, value))
@@ -4626,6 +5431,7 @@ class Chip:
         self.set('record', step, index, 'region', self._get_cloud_region())
 
         try:
+            import netifaces
             gateways = netifaces.gateways()
             ipaddr, interface = gateways['default'][netifaces.AF_INET]
             macaddr = netifaces.ifaddresses(interface)[netifaces.AF_LINK][0]['addr']
@@ -4642,6 +5448,7 @@ class Chip:
         self.set('record', step, index, 'platform', lower_sys_name)
 
         if system == 'Linux':
+            import distro
             distro_name = distro.id()
             self.set('record', step, index, 'distro', distro_name)
 
@@ -4709,6 +5516,410 @@ class Chip:
 
         return os.path.join(*dirlist)
 
+    #######################################
+    def _pack_tasks(self, ready, slots, memory, free, running, skipped):
+        '''
+        Returns the ready tasks that run() launches next.
+
+        Ready tasks are considered in flowgraph order, and tasks that don't
+        fit in the free (CPU slots, memory, task count) are skipped so that
+        smaller ones can use the free resources. A task needing more than
+        the whole machine runs on its own rather than never being launched.
+
+        skipped counts how often each task was overtaken by a smaller task.
+        Once a task was overtaken BACKFILL_LIMIT times, it is considered
+        first and no other task is launched until it fits, so a stream of
+        small tasks can't starve it.
+        '''
+
+        free_slots, free_memory, free_tasks = free
+        starved = [task for task in ready if skipped.get(task, 0) >= BACKFILL_LIMIT]
+        candidates = starved + [task for task in ready if task not in starved]
+
+        launch = []
+        passed = []
+        overtaken = set()
+        for task in candidates:
+            if free_tasks is not None and len(launch) >= free_tasks:
+                break
+            if (running or launch) and (slots[task] > free_slots or
+                                        memory[task] > free_memory):
+                if task in starved:
+                    break
+                passed.append(task)
+                continue
+            launch.append(task)
+            overtaken.update(passed)
+            free_slots -= slots[task]
+            free_memory -= memory[task]
+
+        for task in overtaken:
+            skipped[task] = skipped.get(task, 0) + 1
+        return launch
+
+    #######################################
+    def _task_slots(self, step, index):
+        '''Returns the number of local CPU slots occupied by a task in run().
+        '''
+
+        flow = self.get('flow')
+
+        tool = self.get('flowgraph', flow, step, index, 'tool')
+
+        # Tasks deferred to a job scheduler run on a compute node.
+        if self.get('jobscheduler') and \
+           self.get('flowgraph', flow, step, index, 'input'):
+            return 0
+
+        threads = None
+        if (tool not in self.builtin and
+            tool in self.getkeys('eda') and
+            step in self.getkeys('eda', tool, 'threads') and
+            index in self.getkeys('eda', tool, 'threads', step)):
+            threads = self.get('eda', tool, 'threads', step, index)
+
+        return max(1, threads or 1)
+
+    #######################################
+    def _task_memory(self, step, index, previous=None):
+        '''Returns the estimated peak memory (in bytes) of a task in run():
+        the tool's 'memory' parameter if it is set, otherwise previous, the
+        memory used by the task in the previous run of the job.
+        '''
+
+        flow = self.get('flow')
+        tool = self.get('flowgraph', flow, step, index, 'tool')
+
+        if self.get('jobscheduler') and \
+           self.get('flowgraph', flow, step, index, 'input'):
+            return 0
+
+        if (tool not in self.builtin and
+            tool in self.getkeys('eda') and
+            step in self.getkeys('eda', tool, 'memory') and
+            index in self.getkeys('eda', tool, 'memory', step) and
+            self.get('eda', tool, 'memory', step, index) is not None):
+            return self.get('eda', tool, 'memory', step, index)
+
+        return previous or 0
+
+    #######################################
+    def _previous_memory(self, step, index):
+        '''Returns the peak memory recorded for a task by the previous run of
+        the job, or None if it is not known.
+        '''
+
+        if (step in self.getkeys('metric') and
+            index in self.getkeys('metric', step) and
+            'memory' in self.getkeys('metric', step, index) and
+            'real' in self.getkeys('metric', step, index, 'memory')):
+            memory = self.get('metric', step, index, 'memory', 'real')
+            if memory is not None:
+                return memory
+
+        # Only the metric section of the task's manifest is decoded.
+        workdir = self._getworkdir(step=step, index=index)
+        manifest = os.path.join(workdir, 'outputs', f"{self.get('design')}.pkg.json")
+        if not os.path.isfile(manifest):
+            return None
+        with open(manifest, 'r') as fin:
+            metrics = utils.read_json_sections(fin, ['metric']).get('metric', {})
+        try:
+            memory = metrics[step][index]['memory']['real']['value']
+        except KeyError:
+            return None
+        # manifests store values as strings
+        return None if memory is None else float(memory)
+
+    #######################################
+    def _run_executable(self, cmdlist, logfile, step, index, timeout=None, quiet=False):
+        '''
+        Runs cmdlist, forwarding its output to logfile (and to stdout unless
+        quiet) as it is produced, and monitors the process tree of the tool.
+
+        Every 'pollinterval' seconds, the resident memory and CPU time of the
+        tool and all of its descendants are sampled. Returns the exit code
+        of the command and a dictionary with the peak resident memory of the
+        tree ('memory', B), its CPU time ('cputime', user+sys seconds) and
+        its peak number of threads ('threads').
+
+        Where the resource module is available, the usage of the tool and
+        its waited-for descendants is also taken from
+        getrusage(RUSAGE_CHILDREN), which adds exact 'usertime' and 'systime'
+        (s), 'ioread' and 'iowrite' (bytes of block I/O) and 'ctxswitch'
+        entries.
+        '''
+
+        import psutil
+        import selectors
+        import codecs
+        try:
+            import resource
+        except ImportError:
+            # Windows
+            resource = None
+
+        interval = self.get('pollinterval')
+        if interval is None:
+            interval = 0.5
+        usage = {'memory': 0, 'cputime': 0.0, 'threads': 0}
+        # Last CPU time seen for each process of the tree, so processes that
+        # exit between samples keep their share.
+        cputimes = {}
+        procs = {}
+
+        def sample(root):
+            try:
+                tree = [root] + root.children(recursive=True)
+            except psutil.Error:
+                return
+            rss = 0
+            threads = 0
+            for p in tree:
+                # Reuse Process objects, which remember their identity
+                p = procs.setdefault(p.pid, p)
+                try:
+                    with p.oneshot():
+                        # memory_info() only reads /proc/<pid>/statm, unlike
+                        # memory_full_info() which parses smaps
+                        rss += p.memory_info().rss
+                        threads += p.num_threads()
+                        times = p.cpu_times()
+                    cputimes[p.pid] = times.user + times.system
+                except psutil.Error:
+                    pass
+            usage['memory'] = max(usage['memory'], rss)
+            usage['threads'] = max(usage['threads'], threads)
+            usage['cputime'] = sum(cputimes.values())
+
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        def forward(data):
+            log_writer.write(data)
+            if not quiet:
+                sys.stdout.write(decoder.decode(data))
+
+        # Tasks run in their own process, but take the difference in case
+        # other children were reaped earlier.
+        if resource:
+            rusage_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        with open(logfile, 'wb') as log_writer:
+            start = time.time()
+            proc = subprocess.Popen(cmdlist,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT)
+            fd = proc.stdout.fileno()
+            try:
+                root = psutil.Process(proc.pid)
+            except psutil.Error:
+                root = None
+
+            if sys.platform == 'win32':
+                # select() only supports sockets on Windows
+                import threading
+                selector = None
+                reader = threading.Thread(
+                    target=lambda: [forward(data) for data in iter(lambda: os.read(fd, 1<<16), b'')])
+                reader.start()
+            else:
+                selector = selectors.DefaultSelector()
+                selector.register(fd, selectors.EVENT_READ)
+
+            next_sample = start
+            while True:
+                now = time.time()
+                if now >= next_sample:
+                    # also without a process to sample, so waits don't spin
+                    if root:
+                        sample(root)
+                    next_sample = now + interval
+                if timeout is not None and now - start > timeout:
+                    self.logger.error(f'Step timed out after {timeout} seconds')
+                    for p in procs.values():
+                        if p.pid != proc.pid:
+                            try:
+                                p.terminate()
+                            except psutil.Error:
+                                pass
+                    proc.terminate()
+                    self._haltstep(step, index)
+
+                wait = max(0, next_sample - now)
+                if timeout is not None:
+                    wait = min(wait, max(0, start + timeout - now))
+                if selector and selector.get_map():
+                    # Block until the tool writes output or the next sample
+                    # is due.
+                    if selector.select(timeout=wait):
+                        data = os.read(fd, 1<<16)
+                        if data:
+                            forward(data)
+                        else:
+                            selector.unregister(fd)
+                        continue
+                    if proc.poll() is not None:
+                        # Drain output the tool wrote before exiting, without
+                        # waiting on descendants that still hold the pipe.
+                        while selector.select(timeout=0):
+                            data = os.read(fd, 1<<16)
+                            if not data:
+                                break
+                            forward(data)
+                        break
+                else:
+                    try:
+                        proc.wait(timeout=wait)
+                        break
+                    except subprocess.TimeoutExpired:
+                        pass
+
+            if selector:
+                selector.close()
+            else:
+                reader.join()
+            proc.stdout.close()
+
+            if not quiet:
+                sys.stdout.write(decoder.decode(b'', final=True))
+
+        retcode = proc.wait()
+
+        if resource:
+            rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            usage['usertime'] = round(rusage.ru_utime - rusage_start.ru_utime, 3)
+            usage['systime'] = round(rusage.ru_stime - rusage_start.ru_stime, 3)
+            usage['cputime'] = usage['usertime'] + usage['systime']
+            # Block counts are in units of 512 bytes
+            usage['ioread'] = (rusage.ru_inblock - rusage_start.ru_inblock) * 512
+            usage['iowrite'] = (rusage.ru_oublock - rusage_start.ru_oublock) * 512
+            usage['ctxswitch'] = ((rusage.ru_nvcsw - rusage_start.ru_nvcsw) +
+                                  (rusage.ru_nivcsw - rusage_start.ru_nivcsw))
+            # ru_maxrss is not used for 'memory': it is the peak of the
+            # largest single child, and may include the memory of this
+            # process copied before the tool was executed.
+
+        return retcode, usage
+
+    #######################################
+    def _task_cache_key(self, step, index, version):
+        '''
+        Returns the task result cache key of a task, computed from the tool
+        version, the task's 'eda' settings, the values of the parameters
+        it requires and the hashes of its input files. Files referenced by
+        these parameters are included by content.
+        '''
+
+        flow = self.get('flow')
+        tool = self.get('flowgraph', flow, step, index, 'tool')
+
+        def value(keypath):
+            leaftype = self.get(*keypath, field='type')
+            if self.get(*keypath) and ('file' in leaftype or 'dir' in leaftype):
+                files = []
+                for path in self.find_files(*keypath, missing_ok=True):
+                    if path is None:
+                        files.append(None)
+                    elif os.path.isdir(path):
+                        files.append(self._hash_tree(path))
+                    else:
+                        files.append(self._hash_filelist([path], 'sha256')[0])
+                return files
+            return self.get(*keypath)
+
+        eda = {}
+        for keypath in self._keypaths():
+            if keypath[:2] != ('eda', tool) or 'default' in keypath:
+                continue
+            param = keypath[2:]
+            if param[0] == 'memory':
+                # estimate only, seeded from previous runs
+                continue
+            if len(param) < 3 or param[1:3] == (step, index):
+                eda[','.join(param)] = value(keypath)
+
+        require = {}
+        if ('require' in self.getkeys('eda', tool) and
+            step in self.getkeys('eda', tool, 'require') and
+            index in self.getkeys('eda', tool, 'require', step)):
+            for item in self.get('eda', tool, 'require', step, index):
+                require[item] = value(item.split(','))
+
+        key = {
+            'scversion': _metadata.version,
+            'design': self.get('design'),
+            'step': step,
+            'index': index,
+            'tool': tool,
+            'version': version,
+            'eda': eda,
+            'require': require,
+            'inputs': self._hash_tree('inputs')
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    #######################################
+    def _hash_tree(self, path):
+        '''Returns a dictionary of the sha256 hashes of all files in a
+        directory, keyed by relative path.
+        '''
+
+        files = []
+        for root, dirs, filenames in os.walk(path):
+            for filename in filenames:
+                files.append(os.path.join(root, filename))
+        hashes = self._hash_filelist(files, 'sha256')
+        return {os.path.relpath(f, path): h for f, h in zip(files, hashes)}
+
+    #######################################
+    def _task_cache_dir(self, key):
+        return os.path.join(self.cwd, self.get('dir'), 'taskcache', key)
+
+    #######################################
+    def _restore_task_cache(self, step, index, key):
+        '''
+        Restores the results of a task from the task result cache into the
+        current working directory. Returns True on a cache hit.
+        '''
+
+        cachedir = self._task_cache_dir(key)
+        if not os.path.isfile(os.path.join(cachedir, 'metrics.json')):
+            return False
+
+        self.logger.info(f'Restoring task results from cache {cachedir}')
+        _copy_task_files(cachedir, '.', 'metrics.json')
+        with open(os.path.join(cachedir, 'metrics.json'), 'r') as f:
+            metrics = json.load(f)
+        for metric, value in metrics.items():
+            self.set('metric', step, index, metric, 'real', value, clobber=True)
+        return True
+
+    #######################################
+    def _store_task_cache(self, step, index, key):
+        '''
+        Stores the results of a successful task in the current working
+        directory (everything but its inputs) in the task result cache.
+        '''
+
+        cachedir = self._task_cache_dir(key)
+        if os.path.isdir(cachedir):
+            return
+
+        # Entries are written to a temporary directory and renamed, so a
+        # partially written entry is never restored.
+        tmpdir = f'{cachedir}.{os.getpid()}'
+        try:
+            os.makedirs(tmpdir)
+            _copy_task_files('.', tmpdir, 'inputs')
+            metrics = {}
+            for metric in self.getkeys('metric', 'default', 'default'):
+                metrics[metric] = self.get('metric', step, index, metric, 'real')
+            with open(os.path.join(tmpdir, 'metrics.json'), 'w') as f:
+                json.dump(metrics, f)
+            os.rename(tmpdir, cachedir)
+        except OSError as e:
+            self.logger.warning(f'Could not store task results in cache: {e}')
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
     #######################################
     def _resolve_env_vars(self, filepath):
         resolved_path = os.path.expandvars(filepath)
@@ -4742,6 +5953,9 @@ class Chip:
         return f'{filename}_{pathhash}{ext}'
 
     def _check_version(self, reported_version, tool):
+        import packaging.version
+        import packaging.specifiers
+
         # Based on regex for deprecated "legacy specifier" from PyPA packaging
         # library. Use this to parse PEP-440ish specifiers with arbitrary
         # versions.
@@ -4809,13 +6023,137 @@ class Chip:
         return False
 
 
+###############################################################################
+# Log file search helpers
+###############################################################################
+
+def _read_blocks(f, size=1<<20):
+    '''
+    Reads a text file in blocks of about size characters. Each block holds
+    complete lines, joined by newlines without a trailing newline.
+    '''
+
+    rest = ''
+    while True:
+        data = f.read(size)
+        if not data:
+            if rest:
+                yield rest
+            return
+        data = rest + data
+        end = data.rfind('\n')
+        if end < 0:
+            rest = data
+            continue
+        yield data[:end]
+        rest = data[end+1:]
+
+def _pattern_structure(pattern):
+    '''
+    Returns a tuple of (anchored, branches, backrefs) for a regex pattern:
+    whether it starts with '^', whether it has a top level alternation
+    ('|' outside of any group), and whether it uses numbered
+    backreferences.
+    '''
+
+    branches = False
+    backrefs = False
+    depth = 0
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '\\':
+            if i + 1 < n and pattern[i+1] in '123456789':
+                backrefs = True
+            i += 2
+            continue
+        if c == '[':
+            # skip the character class, where a leading ']' is literal
+            i += 1
+            if i < n and pattern[i] == '^':
+                i += 1
+            if i < n and pattern[i] == ']':
+                i += 1
+            while i < n and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            branches = True
+        i += 1
+
+    return pattern.startswith('^'), branches, backrefs
+
+def _grep_line(compiled, line):
+    '''Applies a compiled grep expression (see Chip._compile_grep()) to a
+    line without a trailing newline. Returns None if there is no match.'''
+
+    regex, invert, exact, only = compiled
+    if exact:
+        match = regex.fullmatch(line)
+    else:
+        match = regex.search(line)
+
+    if invert:
+        return None if match else line
+    elif match is None:
+        return None
+    elif only:
+        return match.group(0)
+    return line
+
+def _is_string_anchored(regex):
+    '''Returns True if a compiled regex uses the \\A or \\Z anchors.'''
+
+    return '\\A' in regex.pattern or '\\Z' in regex.pattern
+
+def _copy_task_files(src, dst, skip):
+    '''Copies the contents of the task directory src into dst for the task
+    result cache, except for the top level entry named skip.'''
+
+    with os.scandir(src) as entries:
+        for entry in entries:
+            if entry.name == skip:
+                continue
+            dstfile = os.path.join(dst, entry.name)
+            if entry.is_dir():
+                utils.copytree(entry.path, dstfile, dirs_exist_ok=True, link='reflink')
+            else:
+                utils.copyfile(entry.path, dstfile, link='reflink')
+
+def _grep_chain(chain, line):
+    '''Pipes a line through a list of compiled grep expressions.'''
+
+    for compiled in chain:
+        line = _grep_line(compiled, line)
+        if line is None:
+            return None
+    return line
+
 ###############################################################################
 # Package Customization classes
 ###############################################################################
 
-class YamlIndentDumper(yaml.Dumper):
-    def increase_indent(self, flow=False, indentless=False):
-        return super(YamlIndentDumper, self).increase_indent(flow, False)
+def _yaml_indent_dumper():
+    '''
+    Returns a yaml Dumper class that indents lists. Defined on first use so
+    that importing siliconcompiler does not import yaml.
+    '''
+    import yaml
+
+    class YamlIndentDumper(yaml.Dumper):
+        def increase_indent(self, flow=False, indentless=False):
+            return super(YamlIndentDumper, self).increase_indent(flow, False)
+
+        # static fields are shared between schema entries, write them out
+        # in full rather than as yaml anchors/aliases
+        def ignore_aliases(self, data):
+            return True
+
+    return YamlIndentDumper
 
 class SiliconCompilerError(Exception):
     ''' Minimal Exception wrapper used to raise sc runtime errors.
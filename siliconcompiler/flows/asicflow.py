@@ -101,7 +101,7 @@ def setup(chip, flowname='asicflow'):
 
     # Clear olf flowgraph if it exists
     if flowname in chip.getkeys('flowgraph'):
-        del chip.cfg['flowgraph'][flowname]
+        chip.remove('flowgraph', flowname)
 
     #Remove built in steps where appropriate
     flowpipe = []
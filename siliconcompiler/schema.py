@@ -1,12 +1,90 @@
 # Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
 
 from siliconcompiler import utils
+from siliconcompiler import _metadata
 
 import re
 import os
 import sys
 import copy as pycopy
 import json
+import pickle
+
+#############################################################################
+# PARAM TYPES
+#############################################################################
+
+class ParamType:
+    '''Pre-parsed form of a schema 'type' string.
+
+    Parsing the type string of a parameter (list-ness, tuple element types,
+    file/dir classification) is done once per distinct type string and the
+    resulting object is shared by every parameter of that type. Use
+    ParamType.parse() rather than the constructor to get the cached object.
+    '''
+
+    _cache = {}
+
+    def __init__(self, sctype):
+        self.sctype = sctype
+        self.is_list = sctype.startswith('[')
+        self.base = sctype.replace('[', '').replace(']', '')
+        self.is_tuple = self.base.startswith('(')
+        if self.is_tuple:
+            self.elements = tuple(self.base.strip('()').split(','))
+        else:
+            self.elements = ()
+        self.is_file = 'file' in self.base
+        self.is_dir = 'dir' in self.base
+        self.is_bool = self.base == 'bool'
+
+    @classmethod
+    def parse(cls, sctype):
+        '''Returns the shared ParamType object for a type string.'''
+        try:
+            return cls._cache[sctype]
+        except KeyError:
+            ptype = cls(sctype)
+            cls._cache[sctype] = ptype
+            return ptype
+
+    def _convert_item(self, item):
+        '''Converts a single list element from manifest to Python form.'''
+        base = self.base
+        if base == 'int':
+            return int(item)
+        elif base == 'float':
+            return float(item)
+        elif self.is_tuple:
+            if isinstance(item, tuple):
+                return item
+            if self.elements[0] == 'str':
+                tuplestr = re.sub(r'[\(\)\'\s]', '', item)
+                return tuple(tuplestr.split(','))
+            elif self.elements[0] == 'float':
+                tuplestr = re.sub(r'[\(\)\s]', '', item)
+                return tuple(map(float, tuplestr.split(',')))
+        return item
+
+    def convert(self, selval):
+        '''Converts a stored 'value' field to the Python value returned by
+        Chip.get().'''
+        if selval is None:
+            return None
+        if self.is_list:
+            return [self._convert_item(item) for item in selval]
+
+        base = self.base
+        if base == 'int':
+            return int(float(selval))
+        elif base == 'float':
+            return float(selval)
+        elif base == 'bool':
+            return selval == 'true'
+        elif self.is_tuple:
+            tuplestr = re.sub(r'[\(\)\s]', '', selval)
+            return tuple(map(float, tuplestr.split(',')))
+        return selval
 
 #############################################################################
 # PARAM DEFINITION
@@ -92,6 +170,97 @@ def scparam(cfg,
             cfg['date'] = []
             cfg['author'] = []
 
+#############################################################################
+# TEMPLATE INSTANTIATION
+#############################################################################
+
+# Static leaf fields that are never modified in place. Instances created
+# from a 'default' template share these with the template instead of
+# holding their own copies.
+SHARED_FIELDS = ('type', 'switch', 'shorthelp', 'example', 'help')
+
+def schema_instance(cfg):
+    '''
+    Returns a new instance of a 'default' template subtree.
+
+    Dictionaries and mutable list fields (value, defvalue, signature, ...)
+    are copied per instance, while the static fields in SHARED_FIELDS point
+    to the template's objects. Code that changes a shared list field must
+    therefore replace it rather than modify it in place.
+    '''
+
+    if 'defvalue' in cfg:
+        leaf = {}
+        for field, val in cfg.items():
+            if isinstance(val, list) and field not in SHARED_FIELDS:
+                # list entries are always strings (or None)
+                leaf[field] = val.copy()
+            else:
+                leaf[field] = val
+        return leaf
+
+    return {key: schema_instance(subcfg) for key, subcfg in cfg.items()}
+
+#############################################################################
+# CACHED DEFAULT SCHEMA
+#############################################################################
+
+# Prebuilt default schema, shared by all Chip objects in this process. Never
+# modified; callers get instances made with schema_instance().
+_default_cfg = None
+
+def schema_default():
+    '''
+    Returns a fresh copy of the default Chip configuration schema.
+
+    The schema is built with schema_cfg() once per process and cheap
+    instances of it are handed out afterwards. If the SC_SCHEMA_CACHE
+    environment variable points to a directory, the prebuilt schema is also
+    pickled there so new processes can skip building it. The pickle file
+    name includes the SC version and the modification time of this file,
+    so an edited schema is never read from a stale cache.
+    '''
+
+    global _default_cfg
+
+    if _default_cfg is None:
+        cachedir = os.environ.get('SC_SCHEMA_CACHE')
+        if cachedir:
+            _default_cfg = _schema_cache_load(cachedir)
+        else:
+            _default_cfg = schema_cfg()
+
+    return schema_instance(_default_cfg)
+
+def _schema_cache_load(cachedir):
+    '''
+    Loads the default schema from the on-disk cache, building and storing
+    it on a cache miss.
+    '''
+
+    stamp = int(os.path.getmtime(__file__))
+    cachefile = os.path.join(cachedir, f'schema-{_metadata.version}-{stamp}.pkl')
+
+    try:
+        with open(cachefile, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    cfg = schema_cfg()
+    try:
+        os.makedirs(cachedir, exist_ok=True)
+        # write to a unique temporary file first so concurrent processes
+        # never read a partially written cache
+        tmpfile = f'{cachefile}.{os.getpid()}'
+        with open(tmpfile, 'wb') as f:
+            pickle.dump(cfg, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpfile, cachefile)
+    except OSError:
+        # the cache is optional, fall back to the in-memory schema
+        pass
+
+    return cfg
 
 #############################################################################
 # CHIP CONFIGURATION
@@ -1571,6 +1740,20 @@ def schema_eda(cfg, tool='default', step='default', index='default'):
             the threads based on the maximum thread count supported by the
             hardware.""")
 
+    scparam(cfg, ['eda', tool, 'memory', step, index],
+            sctype='float',
+            unit='B',
+            scope='job',
+            shorthelp="Tool memory estimate",
+            switch="-eda_memory 'tool step index <float>'",
+            example=["cli: -eda_memory 'openroad place 0 4e9'",
+                     "api: chip.set('eda','openroad','memory','place','0',4e9)"],
+            schelp="""
+            Estimated peak memory of the tool on a per step and index basis,
+            used by run() to decide how many tasks can execute at the same time
+            on the local machine. If not specified, run() uses the 'memory'
+            metric recorded for the task by the previous run of the job.""")
+
     return cfg
 
 ###########################################################################
@@ -1855,6 +2038,92 @@ def schema_metric(cfg, step='default', index='default',group='default'):
             Metric tracking total peak program memory footprint on a per
             step and index basis.""")
 
+    item = 'usertime'
+    scparam(cfg, ['metric', step, index, item, group],
+            sctype='float',
+            unit='s',
+            scope='job',
+            shorthelp=f"Metric: {item}",
+            switch=f"-metric_{item} 'step index group <float>'",
+            example=[
+                f"cli: -metric_{item} 'dfm 0 real 10.0'",
+                f"api: chip.set('metric','dfm','0','{item}','real', 10.0)"],
+            schelp=f"""
+            Metric tracking the CPU time spent in user mode by the eda
+            executable and its child processes on a per step and index
+            basis.""")
+
+    item = 'systime'
+    scparam(cfg, ['metric', step, index, item, group],
+            sctype='float',
+            unit='s',
+            scope='job',
+            shorthelp=f"Metric: {item}",
+            switch=f"-metric_{item} 'step index group <float>'",
+            example=[
+                f"cli: -metric_{item} 'dfm 0 real 10.0'",
+                f"api: chip.set('metric','dfm','0','{item}','real', 10.0)"],
+            schelp=f"""
+            Metric tracking the CPU time spent in the kernel on behalf of the
+            eda executable and its child processes on a per step and index
+            basis.""")
+
+    item = 'ioread'
+    scparam(cfg, ['metric', step, index, item, group],
+            sctype='int',
+            unit='B',
+            scope='job',
+            shorthelp=f"Metric: {item}",
+            switch=f"-metric_{item} 'step index group <int>'",
+            example=[
+                f"cli: -metric_{item} 'dfm 0 real 10000000000'",
+                f"api: chip.set('metric','dfm','0','{item}','real', 10000000000)"],
+            schelp=f"""
+            Metric tracking the number of bytes the eda executable and its
+            child processes read from storage on a per step and index basis.
+            Reads served from the file system cache are not counted.""")
+
+    item = 'iowrite'
+    scparam(cfg, ['metric', step, index, item, group],
+            sctype='int',
+            unit='B',
+            scope='job',
+            shorthelp=f"Metric: {item}",
+            switch=f"-metric_{item} 'step index group <int>'",
+            example=[
+                f"cli: -metric_{item} 'dfm 0 real 10000000000'",
+                f"api: chip.set('metric','dfm','0','{item}','real', 10000000000)"],
+            schelp=f"""
+            Metric tracking the number of bytes the eda executable and its
+            child processes wrote to storage on a per step and index basis.""")
+
+    item = 'ctxswitch'
+    scparam(cfg, ['metric', step, index, item, group],
+            sctype='int',
+            scope='job',
+            shorthelp=f"Metric: {item}",
+            switch=f"-metric_{item} 'step index group <int>'",
+            example=[
+                f"cli: -metric_{item} 'dfm 0 real 1000'",
+                f"api: chip.set('metric','dfm','0','{item}','real', 1000)"],
+            schelp=f"""
+            Metric tracking the number of voluntary and involuntary context
+            switches of the eda executable and its child processes on a per
+            step and index basis.""")
+
+    item = 'threads'
+    scparam(cfg, ['metric', step, index, item, group],
+            sctype='int',
+            scope='job',
+            shorthelp=f"Metric: {item}",
+            switch=f"-metric_{item} 'step index group <int>'",
+            example=[
+                f"cli: -metric_{item} 'dfm 0 real 8'",
+                f"api: chip.set('metric','dfm','0','{item}','real', 8)"],
+            schelp=f"""
+            Metric tracking the peak number of threads of the eda executable
+            and its child processes on a per step and index basis.""")
+
     item = 'exetime'
     scparam(cfg, ['metric', step, index, item, group],
             sctype='float',
@@ -1866,10 +2135,10 @@ def schema_metric(cfg, step='default', index='default',group='default'):
                 f"cli: -metric_{item} 'dfm 0 goal 10.0'",
                 f"api: chip.set('metric','dfm','0','{item}','real, 10.0)"],
             schelp=f"""
-            Metric tracking time spent by the eda executable 'exe' on a
-            per step and index basis. It does not include the siliconcompiler
-            runtime overhead or time waitig for I/O operations and
-            inter-processor communication to complete.""")
+            Metric tracking the wall-clock time spent by the eda executable
+            'exe' on a per step and index basis. It does not include the
+            siliconcompiler runtime overhead. The CPU time of the executable
+            is tracked by the 'usertime' and 'systime' metrics.""")
 
     item = 'tasktime'
     scparam(cfg, ['metric', step, index, item, group],
@@ -2094,6 +2363,21 @@ def schema_options(cfg):
             secret_key=<secret key used for authentication>
             server=<ipaddr or url>""")
 
+    scparam(cfg, ['remotecompress'],
+            sctype='str',
+            scope='job',
+            defvalue='gz',
+            shorthelp="Remote upload compression",
+            switch="-remotecompress <str>",
+            example=["cli: -remotecompress zstd:3",
+                    "api: chip.set('remotecompress','zstd:3')"],
+            schelp="""
+            Compression of the archive of the build directory which is
+            streamed to the server for remote processing, as
+            '<format>[:<level>]'. Valid formats are 'gz', 'zstd' and 'none'.
+            The 'zstd' format requires the zstandard package on both the
+            client and the server.""")
+
     scparam(cfg, ['jobscheduler'],
             sctype='str',
             scope='job',
@@ -2110,6 +2394,65 @@ def schema_options(cfg):
             must be located in shared storage which can be accessed by all hosts
             in the cluster.""")
 
+    scparam(cfg, ['maxtasks'],
+            sctype='int',
+            scope='job',
+            shorthelp="Maximum concurrent tasks",
+            switch="-maxtasks <int>",
+            example=["cli: -maxtasks 8",
+                    "api: chip.set('maxtasks', 8)"],
+            schelp="""
+            Maximum number of flowgraph tasks that run() executes at the same
+            time. Tasks whose inputs have completed are queued in flowgraph
+            order and launched as running tasks finish. If the parameter is
+            undefined, the number of concurrent tasks is only limited by
+            the 'maxcpus' parameter.""")
+
+    scparam(cfg, ['maxcpus'],
+            sctype='int',
+            scope='job',
+            shorthelp="Maximum CPU slots",
+            switch="-maxcpus <int>",
+            example=["cli: -maxcpus 16",
+                    "api: chip.set('maxcpus', 16)"],
+            schelp="""
+            Total number of CPU slots shared by all tasks executing on the
+            local machine during run(). Each locally executed task occupies
+            as many slots as its tool 'threads' setting, and built in
+            functions occupy one slot. Tasks deferred to a job scheduler do
+            not occupy local slots. If the parameter is undefined, the number
+            of CPUs reported by the operating system is used.""")
+
+    scparam(cfg, ['maxmemory'],
+            sctype='float',
+            unit='B',
+            scope='job',
+            shorthelp="Maximum task memory",
+            switch="-maxmemory <float>",
+            example=["cli: -maxmemory 64e9",
+                    "api: chip.set('maxmemory', 64e9)"],
+            schelp="""
+            Total memory shared by all tasks executing on the local machine
+            during run(). Tasks are only launched while the sum of their tool
+            'memory' estimates fits within this budget. If the parameter is
+            undefined, the physical memory of the local machine is used.""")
+
+    scparam(cfg, ['pollinterval'],
+            sctype='float',
+            unit='s',
+            scope='job',
+            shorthelp="Task monitor interval",
+            switch="-pollinterval <float>",
+            example=["cli: -pollinterval 2.0",
+                    "api: chip.set('pollinterval', 2.0)"],
+            schelp="""
+            Interval at which run() samples the resident memory and CPU time
+            of the process tree of each executing tool. The peak memory of
+            the tree is recorded in the task's 'memory' metric. If the
+            parameter is undefined, an interval of 0.5 seconds is used. Tool
+            output is forwarded to the log file as it is produced,
+            independently of this interval.""")
+
     # Compilation
     scparam(cfg, ['mode'],
             sctype='str',
@@ -2435,6 +2778,42 @@ def schema_options(cfg):
             compilation. The hash values are stored in the hashvalue
             field of the individual parameters.""")
 
+    scparam(cfg, ['stagemode'],
+            sctype='str',
+            scope='job',
+            defvalue='hardlink',
+            shorthelp="Task file staging mode",
+            switch="-stagemode <str>",
+            example=["cli: -stagemode reflink",
+                    "api: chip.set('stagemode', 'reflink')"],
+            schelp="""
+            Selects how run() stages the outputs of previous tasks into the
+            'inputs' directory of a task, and the inputs of builtin tasks into
+            their 'outputs' directory. Valid modes are 'hardlink' (hard links,
+            falling back to copy-on-write clones across file systems),
+            'reflink' (copy-on-write clones on file systems that support
+            them, such as btrfs and xfs), 'symlink' (symbolic links) and
+            'copy'. Modes fall back to copying files when linking is not
+            possible. With 'hardlink' and 'symlink', tools must not modify
+            their input files in place.""")
+
+    scparam(cfg, ['taskcache'],
+            sctype='bool',
+            scope='job',
+            shorthelp="Enable task result cache",
+            switch="-taskcache <bool>",
+            example=["cli: -taskcache",
+                    "api: chip.set('taskcache', True)"],
+            schelp="""
+            Enables the task result cache. Before running a tool, run()
+            computes a key for the task from the tool version, the task's
+            'eda' settings, the values of the parameters it requires and the
+            contents of its input files. If results for the key are found in
+            the 'taskcache' directory of the build directory, the task's
+            outputs, reports, logs and metrics are restored from the cache
+            instead of executing the tool. Results of successful tasks are
+            added to the cache.""")
+
     scparam(cfg, ['nodisplay'],
             sctype='bool',
             scope='job',
@@ -4,13 +4,15 @@ import argparse
 from aiohttp import web
 import asyncio
 import base64
+import concurrent.futures
 import glob
+import hashlib
 import json
 import logging as log
 import os
 import re
-import subprocess
 import shutil
+import threading
 import uuid
 
 from cryptography.hazmat.backends import default_backend
@@ -18,6 +20,7 @@ from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import hashes, serialization
 from siliconcompiler import Chip
+from siliconcompiler import utils
 from siliconcompiler.crypto import decrypt_job, gen_cipher_key
 
 class Server:
@@ -28,6 +31,12 @@ class Server:
     schedule work on available compute nodes. It can also be configured to
     launch new compute nodes in the cloud, for on-demand jobs.
 
+    Submitted jobs are queued and executed by 'maxjobs' workers, each job
+    in a separate process. Blocking work (job execution, archiving and
+    encryption) runs outside of the event loop, so the server keeps answering requests while jobs run.
+    Clients follow the progress of their jobs with long polling requests,
+    which are answered as soon as the job or one of its tasks finishes.
+
     """
 
     ####################
@@ -50,9 +59,31 @@ class Server:
         # Ensure that NFS mounting path is absolute.
         self.cfg['nfsmount']['value'] = [os.path.abspath(self.cfg['nfsmount']['value'][-1])]
 
-        # Set up a dictionary to track running jobs.
+        # Set up a dictionary to track queued and running jobs.
         self.sc_jobs = {}
 
+        # Jobs wait in a queue for one of 'maxjobs' workers. Chip.run() calls
+        # are executed in a dedicated process pool of the same size, so they
+        # never starve the default executor used for file operations, and
+        # the 'env' settings Chip.run() writes to os.environ stay private to
+        # each job.
+        self.maxjobs = int(self.cfg['maxjobs']['value'][-1])
+        self.job_queue = None
+        self.job_executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.maxjobs)
+
+        # Hashes of result files, keyed by path, with the size and
+        # modification time they were computed for.
+        self.results_hashes = {}
+
+        # Progress of tasks read from their manifests, keyed by manifest
+        # path, with the modification time it was read for.
+        self.progress_cache = {}
+        self.progress_event = None
+
+        # Both caches are filled in executor threads, so they are only
+        # accessed while holding this lock.
+        self.cache_lock = threading.Lock()
+
         # If authentication is enabled, try connecting to the SQLite3 database.
         # (An empty one will be created if it does not exist.)
 
@@ -85,16 +116,72 @@ class Server:
             web.post('/check_progress/', self.handle_check_progress),
             web.post('/delete_job/', self.handle_delete_job),
             web.post('/get_results/{job_hash}.tar.gz', self.handle_get_results),
+            web.post('/get_results_manifest/{job_hash}', self.handle_get_results_manifest),
+            web.post('/get_results_files/{job_hash}.tar.gz', self.handle_get_results_files),
         ])
         # TODO: Put zip files in a different directory.
         # For security reasons, this is not a good public-facing solution.
         # There's no access control on which files can be downloaded.
         # But this is an example server which only implements a minimal API.
         self.app.router.add_static('/get_results/', self.cfg['nfsmount']['value'][0])
+        self.app.on_startup.append(self._start_workers)
+
+    ####################
+    def run(self):
+        '''
+        Starts the server, and processes requests until it is interrupted.
+        '''
 
-        # Start the async server.
         web.run_app(self.app, port = int(self.cfg['port']['value'][-1]))
 
+    ####################
+    async def _start_workers(self, app):
+        '''
+        Starts the workers which execute queued jobs, once the event loop of
+        the server is running.
+        '''
+
+        self.job_queue = asyncio.Queue()
+        self.progress_event = asyncio.Event()
+        self.job_workers = [asyncio.ensure_future(self._job_worker())
+                            for i in range(self.maxjobs)]
+
+    ####################
+    async def _job_worker(self):
+        '''
+        Executes queued jobs one at a time.
+        '''
+
+        while True:
+            job, args = await self.job_queue.get()
+            try:
+                await job(*args)
+            except Exception:
+                self.logger.exception('Job failed.')
+            finally:
+                self.job_queue.task_done()
+
+    ####################
+    def _notify_progress(self):
+        '''
+        Wakes up the progress requests which are waiting for a change of
+        the status of a job.
+        '''
+
+        self.progress_event.set()
+        self.progress_event = asyncio.Event()
+
+    ####################
+    async def _run_blocking(self, func, *args, executor=None):
+        '''
+        Runs a blocking function in a thread pool (the default one unless
+        executor is given), and waits for its result without blocking the
+        event loop.
+        '''
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, func, *args)
+
     ####################
     async def handle_remote_run(self, request):
         '''
@@ -106,6 +193,12 @@ class Server:
         tmp_file = self.cfg['nfsmount']['value'][-1] + '/' + uuid.uuid4().hex
 
         # Set up a multipart reader to read in the large file, and param data.
+        # Clients send 'params' first, so the 'import' archive of jobs without
+        # authentication can be extracted into the job directory as it is
+        # received.
+        job_params = None
+        job_dir = None
+        use_auth = False
         reader = await request.multipart()
         while True:
             # Get the next part; if it doesn't exist, we're done.
@@ -113,12 +206,17 @@ class Server:
             if part is None:
                 break
 
-            # Save the initial 'import' step archive. Note: production server
-            # implementations may want to encrypt data before storing it on disk.
             if part.name == 'import':
+                if job_dir is not None and not use_auth:
+                    if not await self._extract_upload(part, job_dir):
+                        return web.Response(text="Error: invalid import archive.", status=400)
+                    continue
+
+                # Save the initial 'import' step archive. Note: production server
+                # implementations may want to encrypt data before storing it on disk.
                 with open(tmp_file, 'wb') as f:
                     while True:
-                        chunk = await part.read_chunk()
+                        chunk = await part.read_chunk(1 << 18)
                         if not chunk:
                             break
                         f.write(chunk)
@@ -130,80 +228,46 @@ class Server:
                 job_params = params['params']
                 cfg = params['chip_cfg']
 
-        # Get the job hash value, and verify it is a 32-char hex string.
-        if not 'job_hash' in job_params:
-            return web.Response(text="Error: no job hash provided.")
-        job_hash = job_params['job_hash']
-        if not re.match("^[0-9A-Za-z]{32}$", job_hash):
-            return web.Response(text="Error: invalid job hash.")
-        # Check for authentication parameters.
-        use_auth = False
-        if ('username' in job_params) or ('key' in job_params):
-            if self.cfg['auth']['value'][-1]:
-                if ('username' in job_params) and ('key' in job_params):
+                # Get the job hash value, and verify it is a 32-char hex string.
+                if not 'job_hash' in job_params:
+                    return web.Response(text="Error: no job hash provided.")
+                job_hash = job_params['job_hash']
+                if not re.match("^[0-9A-Za-z]{32}$", job_hash):
+                    return web.Response(text="Error: invalid job hash.")
+                # Check for authentication parameters.
+                error = self._check_auth(job_params)
+                if error:
+                    return error
+                if 'username' in job_params:
+                    use_auth = True
                     username = job_params['username']
-                    key = job_params['key']
-                    if not username in self.user_keys.keys():
-                        return web.Response(text="Error: invalid username provided.", status=404)
-                    # Authenticate the user.
-                    if self.auth_password(username, key):
-                        use_auth = True
-                    else:
-                        return web.Response(text="Authentication error.", status=403)
-                else:
-                    return web.Response(text="Error: some authentication parameters are missing.", status=400)
-            else:
-                return web.Response(text="Error: authentication parameters were passed in, but this server does not support that feature.", status=500)
 
-        # Create a dummy Chip object to make schema traversal easier.
-        chip = Chip()
-        chip.cfg = cfg
+                # Create a dummy Chip object to make schema traversal easier.
+                chip = Chip()
+                chip.cfg = cfg
+
+                # Fetch some common values.
+                design = chip.get('design')
+                job_name = chip.get('jobname')
+                chip.status['jobhash'] = job_hash
 
-        # Fetch some common values.
-        design = chip.get('design')
-        job_name = chip.get('jobname')
-        job_id = chip.get('jobname')
-        job_nameid = f'{job_name}'
-        chip.status['jobhash'] = job_hash
+                # Ensure that the job's root directory exists.
+                job_root = f"{self.cfg['nfsmount']['value'][-1]}/{job_hash}"
+                job_dir  = f"{job_root}/{design}/{job_name}"
+                os.makedirs(job_dir, exist_ok=True)
 
-        # Ensure that the job's root directory exists.
-        job_root = f"{self.cfg['nfsmount']['value'][-1]}/{job_hash}"
-        job_dir  = f"{job_root}/{design}/{job_name}"
-        subprocess.run(['mkdir', '-p', job_dir])
+        if job_params is None:
+            return web.Response(text="Error: no job parameters provided.", status=400)
 
         if use_auth:
-            # Create a new AES block cipher key, and an IV for the import step.
-            decrypt_key = serialization.load_ssh_private_key(self.user_keys[username]['priv_key'].encode(), None, backend=default_backend())
-            gen_cipher_key(job_dir, self.user_keys[username]['pub_key'], pubk_type='str')
-            # Decrypt the block cipher key.
-            with open(os.path.join(job_dir, 'import.bin'), 'rb') as f:
-                aes_key = decrypt_key.decrypt(
-                    f.read(),
-                    padding.OAEP(
-                        mgf=padding.MGF1(algorithm=hashes.SHA512()),
-                        algorithm=hashes.SHA512(),
-                        label=None,
-                    ))
-            aes_iv  = os.urandom(16)
-            with open(os.path.join(job_dir, f'import.iv'), 'wb') as f:
-                f.write(aes_iv)
-            # Encrypt the received data.
-            cipher = Cipher(algorithms.AES(aes_key), modes.CTR(aes_iv))
-            encryptor = cipher.encryptor()
-            with open(os.path.join(job_dir, f'import.crypt'), 'wb') as wf:
-                with open(tmp_file, 'rb') as rf:
-                    while True:
-                        chunk = rf.read(1024)
-                        if not chunk:
-                            break
-                        wf.write(encryptor.update(chunk))
-                    wf.write(encryptor.finalize())
-        else:
-            # Move the uploaded archive and un-zip it.
             # (Contents will be encrypted for authenticated jobs)
-            os.replace(tmp_file, '%s/import.tar.gz'%job_root)
-            subprocess.run(['tar', '-xzf', '%s/import.tar.gz'%(job_root)],
-                           cwd=job_dir)
+            await self._run_blocking(self._encrypt_import, job_dir, tmp_file, username)
+        elif os.path.exists(tmp_file):
+            # The archive was received before the parameters; un-zip it.
+            def extract():
+                with open(tmp_file, 'rb') as f:
+                    utils.extract_archive(f, job_dir)
+            await self._run_blocking(extract)
 
         # Delete the temporary file if it still exists.
         if os.path.exists(tmp_file):
@@ -215,10 +279,9 @@ class Server:
         job_nameid = f"{chip.get('jobname')}"
 
         # Create the working directory for the given 'job hash' if necessary.
-        subprocess.run(['mkdir', '-p', jobs_dir])
         chip.set('dir', build_dir, clobber=True)
         # Link to the 'import' directory if necessary.
-        subprocess.run(['mkdir', '-p', '%s/%s'%(jobs_dir, job_nameid)])
+        os.makedirs('%s/%s'%(jobs_dir, job_nameid), exist_ok=True)
         #subprocess.run(['ln', '-s', '%s/import0'%build_dir, '%s/%s/import0'%(jobs_dir, job_nameid)])
 
         # Remove 'remote' JSON config value to run locally on compute node.
@@ -229,20 +292,96 @@ class Server:
         chip.set('source', '%s/import/%s/outputs/%s.v'%(build_dir, '0', chip.get('design')), clobber=True)
 
         # Write JSON config to shared compute storage.
-        subprocess.run(['mkdir', '-p', '%s/configs'%build_dir])
+        os.makedirs('%s/configs'%build_dir, exist_ok=True)
 
-        # Run the job with the configured clustering option. (Non-blocking)
+        # Queue the job to run with the configured clustering option. It is
+        # reported as running from now on.
         if use_auth:
-            asyncio.ensure_future(self.remote_sc_auth(chip,
-                                                      username,
-                                                      self.user_keys[username]['priv_key']))
+            self.sc_jobs[f'{username}{job_hash}_{job_nameid}'] = 'queued'
+            self.job_queue.put_nowait((self.remote_sc_auth,
+                                       (chip, username, self.user_keys[username]['priv_key'])))
         else:
-            asyncio.ensure_future(self.remote_sc(chip))
+            self.sc_jobs[f'{job_hash}_{job_nameid}'] = 'queued'
+            self.job_queue.put_nowait((self.remote_sc, (chip,)))
 
         # Return a response to the client.
         response_text = f"Starting job: {job_hash}"
         return web.Response(text=response_text)
 
+    ####################
+    async def _extract_upload(self, part, job_dir):
+        '''
+        Extracts an uploaded archive into job_dir as it is received, without
+        storing the archive. Returns False if the archive is invalid.
+        '''
+
+        # The archive is piped into a thread, which extracts it.
+        rfd, wfd = os.pipe()
+        def extract():
+            with os.fdopen(rfd, 'rb') as f:
+                utils.extract_archive(f, job_dir)
+        extraction = asyncio.get_running_loop().run_in_executor(None, extract)
+
+        pipe = os.fdopen(wfd, 'wb')
+        extracting = True
+        try:
+            while True:
+                chunk = await part.read_chunk(1 << 18)
+                if not chunk:
+                    break
+                if extracting:
+                    try:
+                        await self._run_blocking(pipe.write, chunk)
+                    except BrokenPipeError:
+                        # Extraction ended early; discard the rest of the upload.
+                        extracting = False
+        finally:
+            try:
+                pipe.close()
+            except BrokenPipeError:
+                pass
+
+        try:
+            await extraction
+        except Exception as e:
+            self.logger.error(f'Could not extract import archive: {e}')
+            return False
+        return True
+
+    ####################
+    def _encrypt_import(self, job_dir, tmp_file, username):
+        '''
+        Encrypts the uploaded import archive of an authenticated job with a
+        new block cipher key for the user.
+        '''
+
+        # Create a new AES block cipher key, and an IV for the import step.
+        decrypt_key = serialization.load_ssh_private_key(self.user_keys[username]['priv_key'].encode(), None, backend=default_backend())
+        gen_cipher_key(job_dir, self.user_keys[username]['pub_key'], pubk_type='str')
+        # Decrypt the block cipher key.
+        with open(os.path.join(job_dir, 'import.bin'), 'rb') as f:
+            aes_key = decrypt_key.decrypt(
+                f.read(),
+                padding.OAEP(
+                    mgf=padding.MGF1(algorithm=hashes.SHA512()),
+                    algorithm=hashes.SHA512(),
+                    label=None,
+                ))
+        aes_iv  = os.urandom(16)
+        with open(os.path.join(job_dir, f'import.iv'), 'wb') as f:
+            f.write(aes_iv)
+        # Encrypt the received data.
+        cipher = Cipher(algorithms.AES(aes_key), modes.CTR(aes_iv))
+        encryptor = cipher.encryptor()
+        with open(os.path.join(job_dir, f'import.crypt'), 'wb') as wf:
+            with open(tmp_file, 'rb') as rf:
+                while True:
+                    chunk = rf.read(1 << 20)
+                    if not chunk:
+                        break
+                    wf.write(encryptor.update(chunk))
+                wf.write(encryptor.finalize())
+
     ####################
     async def handle_get_results(self, request):
         '''
@@ -255,41 +394,100 @@ class Server:
             return web.Response(text="Error: no job hash provided.")
         params = await request.json()
 
-        # Check whether to use authentication.
-        use_auth = False
-        if ('username' in params) or ('key' in params):
-            if self.cfg['auth']['value'][-1]:
-                if ('username' in params) and ('key' in params):
-                    username = params['username']
-                    key = params['key']
-                    if not username in self.user_keys.keys():
-                        return web.Response(text="Error: invalid username provided.", status=404)
-                    # Authenticate the user.
-                    if self.auth_password(username, key):
-                        use_auth = True
-                    else:
-                        return web.Response(text="Authentication error.", status=403)
-                else:
-                    return web.Response(text="Error: some authentication parameters are missing.", status=400)
-            else:
-                return web.Response(text="Error: authentication parameters were passed in, but this server does not support that feature.", status=500)
+        # Check for authentication parameters.
+        error = self._check_auth(params)
+        if error:
+            return error
 
-        resp = web.StreamResponse(
-            status = 200,
-            reason = 'OK',
+        zipfn = os.path.join(self.cfg['nfsmount']['value'][-1], job_hash+'.tar.gz')
+        if not os.path.isfile(zipfn):
+            return web.Response(text="Error: no results found for job.", status=404)
+
+        # Stream the archive from disk (with sendfile where available) instead
+        # of loading it into memory. Range requests are honored, so clients
+        # can resume interrupted downloads.
+        return web.FileResponse(
+            zipfn,
             headers = {
                 'Content-Type': 'application/x-tar',
                 'Content-Disposition': f'attachment; filename="{job_hash}.tar.gz"'
             },
         )
-        await resp.prepare(request)
 
-        zipfn = os.path.join(self.cfg['nfsmount']['value'][-1], job_hash+'.tar.gz')
-        with open(zipfn, 'rb') as zipf:
-            await resp.write(zipf.read())
+    ####################
+    async def handle_get_results_manifest(self, request):
+        '''
+        API handler for 'get_results_manifest' requests. Responds with the
+        size and SHA-256 hash of every file in a job's results, so clients
+        can request only the files that they do not have yet. An optional
+        'prefix' parameter restricts the listing to one directory, such as
+        the directory of a finished step.
+        '''
+
+        job_hash = request.match_info.get('job_hash', None)
+        if not job_hash or '..' in job_hash:
+            return web.Response(text="Error: no valid job hash provided.", status=400)
+        params = await request.json()
+
+        error = self._check_auth(params)
+        if error:
+            return error
+
+        job_root = os.path.join(self.cfg['nfsmount']['value'][-1], job_hash)
+        prefix = params.get('prefix', '')
+        if not self._is_job_path(job_root, prefix) or os.path.islink(os.path.join(job_root, prefix)):
+            return web.Response(text="Error: invalid results path.", status=400)
+        if not os.path.isdir(os.path.join(job_root, prefix)):
+            return web.Response(text="Error: no results found for job.", status=404)
+
+        manifest = await self._run_blocking(self._results_manifest, job_hash, prefix)
+        return web.json_response({'files': manifest})
+
+    ####################
+    async def handle_get_results_files(self, request):
+        '''
+        API handler for 'get_results_files' requests. Streams an archive of
+        the result files listed in the 'files' parameter, as paths relative
+        to the job hash directory.
+        '''
+
+        job_hash = request.match_info.get('job_hash', None)
+        if not job_hash or '..' in job_hash:
+            return web.Response(text="Error: no valid job hash provided.", status=400)
+        params = await request.json()
+
+        error = self._check_auth(params)
+        if error:
+            return error
 
-        await resp.write_eof()
-        return resp
+        job_root = os.path.join(self.cfg['nfsmount']['value'][-1], job_hash)
+        files = params.get('files', [])
+        for name in files:
+            if not name or not self._is_job_path(job_root, name):
+                return web.Response(text="Error: invalid results path.", status=400)
+            if not os.path.lexists(os.path.join(job_root, name)):
+                return web.Response(text=f"Error: result file {name} not found.", status=404)
+
+        response = web.StreamResponse(
+            headers = {
+                'Content-Type': 'application/x-tar',
+                'Content-Disposition': f'attachment; filename="{job_hash}.tar.gz"'
+            },
+        )
+        await response.prepare(request)
+        archive = utils.archive_stream(job_root,
+                                       compression=self.cfg['compress']['value'][-1],
+                                       files=files)
+        try:
+            while True:
+                chunk = await self._run_blocking(next, archive, None)
+                if chunk is None:
+                    break
+                await response.write(chunk)
+        finally:
+            await self._run_blocking(archive.close)
+        await response.write_eof()
+        return response
 
     ####################
     async def handle_delete_job(self, request):
@@ -306,23 +504,9 @@ class Server:
         job_hash = params['job_hash']
 
         # Check for authentication parameters.
-        use_auth = False
-        if ('username' in params) or ('key' in params):
-            if self.cfg['auth']['value'][-1]:
-                if ('username' in params) and ('key' in params):
-                    username = params['username']
-                    key = params['key']
-                    if not username in self.user_keys.keys():
-                        return web.Response(text="Error: invalid username provided.", status=404)
-                    # Authenticate the user.
-                    if self.auth_password(username, key):
-                        use_auth = True
-                    else:
-                        return web.Response(text="Authentication error.", status=403)
-                else:
-                    return web.Response(text="Error: some authentication parameters are missing.", status=400)
-            else:
-                return web.Response(text="Error: authentication parameters were passed in, but this server does not support that feature.", status=500)
+        error = self._check_auth(params)
+        if error:
+            return error
 
         # Determine if the job is running.
         for job in self.sc_jobs:
@@ -338,6 +522,10 @@ class Server:
           if os.path.exists(build_dir):
             #print('Deleting: %s'%build_dir)
             shutil.rmtree(build_dir)
+            with self.cache_lock:
+              for cache in (self.results_hashes, self.progress_cache):
+                for path in [path for path in cache if path.startswith(build_dir + '/')]:
+                  del cache[path]
           if os.path.exists('%s.tar.gz'%build_dir):
             #print('Deleting: %s.tar.gz'%build_dir)
             os.remove('%s.tar.gz'%build_dir)
@@ -347,10 +535,13 @@ class Server:
     ####################
     async def handle_check_progress(self, request):
         '''
-        API handler for the 'check progress' endpoint. Currently,
-        It only returns a response containing a 'still running', 'done', or
-        'not found' message. In the future, it can respond with up-to-date
-        information about the job's progress and intermediary outputs.
+        API handler for the 'check progress' endpoint.
+
+        Without a 'wait' parameter, it returns a 'still running' or 'done'
+        message. With a 'wait' parameter, it is a long polling request: the
+        response is a JSON report of the status of the job and of its
+        finished tasks, which is sent as soon as it differs from the report
+        tagged 'since', or after 'wait' seconds.
         '''
 
         # Retrieve the JSON parameters.
@@ -366,30 +557,50 @@ class Server:
             username = params['username']
 
         # Check for authentication parameters.
-        use_auth = False
-        if ('username' in params) or ('key' in params):
-            if self.cfg['auth']['value'][-1]:
-                if ('username' in params) and ('key' in params):
-                    username = params['username']
-                    key = params['key']
-                    if not username in self.user_keys.keys():
-                        return web.Response(text="Error: invalid username provided.", status=404)
-                    # Authenticate the user.
-                    if self.auth_password(username, key):
-                        use_auth = True
-                    else:
-                        return web.Response(text="Authentication error.", status=403)
-                else:
-                    return web.Response(text="Error: some authentication parameters are missing.", status=400)
-            else:
-                return web.Response(text="Error: authentication parameters were passed in, but this server does not support that feature.", status=500)
+        error = self._check_auth(params)
+        if error:
+            return error
+
+        job_key = "%s%s_%s"%(username, job_hash, jobid)
+        if 'wait' in params:
+            return await self._wait_progress(job_key, job_hash, jobid,
+                                             float(params['wait']), params.get('since', None))
 
         # Determine if the job is running.
-        if "%s%s_%s"%(username, job_hash, jobid) in self.sc_jobs:
+        if job_key in self.sc_jobs:
             return web.Response(text="Job is currently running on the cluster.")
         else:
             return web.Response(text="Job has no running steps.")
 
+    ####################
+    async def _wait_progress(self, job_key, job_hash, jobid, wait, since):
+        '''
+        Waits until the progress of a job differs from the report tagged
+        'since', the job finishes, or 'wait' seconds (at most 60) pass,
+        and responds with the current progress report.
+        '''
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(wait, 60)
+        while True:
+            # Task manifests are scanned once per second; changes of the
+            # job status wake up the request immediately.
+            event = self.progress_event
+            status = self.sc_jobs.get(job_key, 'done')
+            progress = {
+                'status': 'running' if status == 'busy' else status,
+                'tasks': await self._run_blocking(self._job_progress, job_hash, jobid),
+            }
+            tag = hashlib.sha1(json.dumps(progress, sort_keys=True).encode()).hexdigest()
+            remaining = deadline - loop.time()
+            if tag != since or progress['status'] == 'done' or remaining <= 0:
+                progress['tag'] = tag
+                return web.json_response(progress)
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, 1))
+            except asyncio.TimeoutError:
+                pass
+
     ####################
     async def remote_sc_auth(self, chip, username, pk):
         '''
@@ -401,12 +612,28 @@ class Server:
 
         # Assemble core job parameters.
         job_hash = chip.status['jobhash']
-        top_module = chip.get('design')
         job_nameid = f"{chip.get('jobname')}"
-        nfs_mount = self.cfg['nfsmount']['value'][-1]
 
         # Mark the job run as busy.
         self.sc_jobs[f'{username}{job_hash}_{job_nameid}'] = 'busy'
+        self._notify_progress()
+        try:
+            await self._remote_sc_auth(chip, username, pk)
+        finally:
+            # Mark the job hash as being done.
+            self.sc_jobs.pop(f'{username}{job_hash}_{job_nameid}')
+            self._notify_progress()
+
+    ####################
+    async def _remote_sc_auth(self, chip, username, pk):
+        '''
+        Runs an authenticated job for remote_sc_auth().
+        '''
+
+        job_hash = chip.status['jobhash']
+        top_module = chip.get('design')
+        job_nameid = f"{chip.get('jobname')}"
+        nfs_mount = self.cfg['nfsmount']['value'][-1]
 
         # Reset 'build' directory in NFS storage.
         build_dir = '/tmp/%s_%s'%(job_hash, job_nameid)
@@ -426,7 +653,7 @@ class Server:
             chip.set('remote', False)
             chip.set('credentials', '', clobber=True)
             chip.status['decrypt_key'] = base64.urlsafe_b64encode(pk)
-            chip.run()
+            await self._run_blocking(_run_chip, chip, executor=self.job_executor)
         else:
             chip.set('dir', build_dir, clobber=True)
             # Run the build command locally.
@@ -434,8 +661,8 @@ class Server:
             to_dir   = '/tmp/%s_%s'%(job_hash, job_nameid)
             job_dir  = os.path.join(build_dir, top_module, job_nameid)
             # Write plaintext JSON config to the build directory.
-            subprocess.run(['mkdir', '-p', to_dir])
-            subprocess.run(['mkdir', '-p', '%s/configs'%build_dir])
+            os.makedirs(to_dir, exist_ok=True)
+            os.makedirs('%s/configs'%build_dir, exist_ok=True)
             # Write private key to a file.
             # This should be okay, because we are already trusting the local
             # "compute node" disk to store the decrypted data. Further, the
@@ -464,17 +691,10 @@ class Server:
                 os.remove(keypath)
 
         # Zip results after all job stages have finished.
-        subprocess.run(['tar',
-                        '-czf',
-                        '%s.tar.gz'%job_hash,
-                        '%s'%job_hash],
-                       cwd = nfs_mount)
+        await self._run_blocking(self._write_results, job_hash)
 
         # (Email notifications can be sent here using your preferred API)
 
-        # Mark the job hash as being done.
-        self.sc_jobs.pop(f'{username}{job_hash}_{chip.get("jobname")}')
-
     ####################
     async def remote_sc(self, chip):
         '''
@@ -484,13 +704,27 @@ class Server:
 
         # Collect a few bookkeeping values.
         job_hash = chip.status['jobhash']
-        top_module = chip.get('design')
-        sc_sources = chip.get('source')
-        build_dir = chip.get('dir')
         jobid = chip.get('jobname')
 
         # Mark the job hash as being busy.
         self.sc_jobs["%s_%s"%(job_hash, jobid)] = 'busy'
+        self._notify_progress()
+        try:
+            await self._remote_sc(chip)
+        finally:
+            # Mark the job hash as being done.
+            self.sc_jobs.pop("%s_%s"%(job_hash, jobid))
+            self._notify_progress()
+
+    ####################
+    async def _remote_sc(self, chip):
+        '''
+        Runs a job for remote_sc().
+        '''
+
+        job_hash = chip.status['jobhash']
+        build_dir = chip.get('dir')
+        jobid = chip.get('jobname')
 
         run_cmd = ''
         if self.cfg['cluster']['value'][-1] == 'slurm':
@@ -506,31 +740,159 @@ class Server:
             #run_cmd += '-cfg %s/configs/chip%s.json '%(build_dir, jobid)
             # Run the job with slurm clustering.
             chip.set('jobscheduler', 'slurm')
-            chip.run()
+            await self._run_blocking(_run_chip, chip, executor=self.job_executor)
         else:
             # Unrecognized or unset clusering option; run locally on the
-            # server itself. (Note: local runs are mostly synchronous, so
-            # this will probably block the server from responding to other
-            # calls. It should only be used for testing and development.)
+            # server itself. It should only be used for testing and
+            # development.
             cfg_out = f"{build_dir}/configs/chip{jobid}.json"
             chip.write_manifest(cfg_out)
             run_cmd = f'sc -cfg {cfg_out}'
 
-            # Create async subprocess shell, and block this thread until it finishes.
+            # Create async subprocess shell, and wait for it to finish.
             proc = await asyncio.create_subprocess_shell(run_cmd)
             await proc.wait()
 
         # (Email notifications can be sent here using SES)
 
         # Create a single-file archive to return if results are requested.
-        subprocess.run(['tar',
-                        '-czf',
-                        '%s.tar.gz'%job_hash,
-                        '%s'%job_hash],
-                       cwd=self.cfg['nfsmount']['value'][-1])
+        await self._run_blocking(self._write_results, job_hash)
+
+    ####################
+    def _write_results(self, job_hash):
+        '''
+        Writes the results archive of a job, holding the contents of its job
+        hash directory, compressed according to the 'compress' option.
+        '''
+
+        nfs_mount = self.cfg['nfsmount']['value'][-1]
+        zipfn = os.path.join(nfs_mount, f'{job_hash}.tar.gz')
+        # Write to a temporary file, so partial archives are never served.
+        tmpfn = f'{zipfn}.{uuid.uuid4().hex}'
+        with open(tmpfn, 'wb') as f:
+            for chunk in utils.archive_stream(os.path.join(nfs_mount, job_hash),
+                                              compression=self.cfg['compress']['value'][-1]):
+                f.write(chunk)
+        os.replace(tmpfn, zipfn)
+
+    ####################
+    def _results_manifest(self, job_hash, prefix=''):
+        '''
+        Returns {path: [size, hash]} for the files under prefix in a job hash
+        directory, with paths relative to that directory. Symbolic links are
+        listed as [None, target]. Hashes are cached, so repeated requests only
+        hash new or modified files.
+        '''
+
+        job_root = os.path.join(self.cfg['nfsmount']['value'][-1], job_hash)
+        manifest = {}
+        for root, dirs, files in os.walk(os.path.join(job_root, prefix)):
+            for name in dirs + files:
+                path = os.path.join(root, name)
+                relpath = os.path.relpath(path, job_root)
+                stat = os.lstat(path)
+                if os.path.islink(path):
+                    manifest[relpath] = [None, os.readlink(path)]
+                elif name in files:
+                    signature = (stat.st_size, stat.st_mtime_ns)
+                    with self.cache_lock:
+                        entry = self.results_hashes.get(path)
+                    if not entry or entry[0] != signature:
+                        entry = (signature, utils.hash_file(path, 'sha256'))
+                        with self.cache_lock:
+                            self.results_hashes[path] = entry
+                    manifest[relpath] = [stat.st_size, entry[1]]
+        return manifest
+
+    ####################
+    def _job_progress(self, job_hash, jobid):
+        '''
+        Returns {'<step>/<index>': {'status': ..., 'metrics': {...}}} for the
+        tasks of a job which wrote their output manifest. Manifests are only
+        read again when they are modified.
+        '''
+
+        tasks = {}
+        pattern = os.path.join(self.cfg['nfsmount']['value'][-1], job_hash,
+                               '*', jobid, '*', '*', 'outputs', '*.pkg.json')
+        for manifest in glob.glob(pattern):
+            step, index = manifest.split(os.sep)[-4:-2]
+            try:
+                mtime = os.stat(manifest).st_mtime_ns
+                with self.cache_lock:
+                    entry = self.progress_cache.get(manifest)
+                if not entry or entry[0] != mtime:
+                    entry = (mtime, self._read_task_progress(manifest, step, index))
+                    with self.cache_lock:
+                        self.progress_cache[manifest] = entry
+            except (OSError, ValueError, KeyError):
+                # The manifest is still being written.
+                continue
+            tasks[f'{step}/{index}'] = entry[1]
+        return tasks
+
+    ####################
+    def _read_task_progress(self, manifest, step, index):
+        '''
+        Reads the status and the recorded metrics of a task from its output
+        manifest, decoding only the needed sections of compact manifests.
+        '''
+
+        with open(manifest, 'r') as f:
+            cfg = utils.read_json_sections(f, ['flowstatus', 'metric'])
+
+        metrics = {}
+        for metric, groups in cfg.get('metric', {}).get(step, {}).get(index, {}).items():
+            param = groups.get('real')
+            if param and param['value'] is not None:
+                # Manifests store values as strings.
+                if param['type'] == 'float':
+                    metrics[metric] = float(param['value'])
+                elif param['type'] == 'int':
+                    metrics[metric] = int(param['value'])
+                else:
+                    metrics[metric] = param['value']
+        return {
+            'status': cfg['flowstatus'][step][index]['status']['value'],
+            'metrics': metrics,
+        }
+
+    ####################
+    def _is_job_path(self, job_root, path):
+        '''
+        Returns True if a path requested by a client is a relative path which
+        stays within the job hash directory job_root once symbolic links are
+        resolved. A symbolic link itself is allowed, since it is listed and
+        archived as a link rather than followed.
+        '''
+
+        if os.path.isabs(path):
+            return False
+        root = os.path.realpath(job_root)
+        path = os.path.join(root, path)
+        if os.path.islink(path):
+            path = os.path.join(os.path.realpath(os.path.dirname(path)), os.path.basename(path))
+        else:
+            path = os.path.realpath(path)
+        return utils._is_within(root, os.path.normpath(path))
 
-        # Mark the job hash as being done.
-        self.sc_jobs.pop("%s_%s"%(job_hash, jobid))
+    ####################
+    def _check_auth(self, params):
+        '''
+        Checks the authentication parameters of a request. Returns an error
+        response if they are invalid, or None otherwise.
+        '''
+
+        if ('username' in params) or ('key' in params):
+            if not self.cfg['auth']['value'][-1]:
+                return web.Response(text="Error: authentication parameters were passed in, but this server does not support that feature.", status=500)
+            if not (('username' in params) and ('key' in params)):
+                return web.Response(text="Error: some authentication parameters are missing.", status=400)
+            if not params['username'] in self.user_keys.keys():
+                return web.Response(text="Error: invalid username provided.", status=404)
+            if not self.auth_password(params['username'], params['key']):
+                return web.Response(text="Authentication error.", status=403)
+        return None
 
     ####################
     def auth_password(self, username, password):
@@ -557,6 +919,23 @@ class Server:
         # TODO
         pass
 
+###############################################
+# Job execution
+###############################################
+
+def _run_chip(chip):
+    '''Runs a job in a worker process of the job pool. Chip.run() writes the
+    'env' settings of the job to os.environ, so the environment is restored
+    before the worker process runs its next job.
+    '''
+
+    environ = dict(os.environ)
+    try:
+        chip.run()
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+
 ###############################################
 # Configuration schema for `sc-server`
 ###############################################
@@ -595,6 +974,24 @@ def server_schema():
         'help' : ["TBD"]
     }
 
+    cfg['maxjobs'] = {
+        'short_help': 'Maximum number of jobs to run concurrently. Additional jobs are queued.',
+        'switch': '-max_jobs',
+        'switch_args': '<num>',
+        'type': ['int'],
+        'defvalue': ['4'],
+        'help': ["TBD"]
+    }
+
+    cfg['compress'] = {
+        'short_help': 'Compression of results archives: gz, zstd or none, with an optional level (eg. gz:9).',
+        'switch': '-compress',
+        'switch_args': '<str>',
+        'type': ['string'],
+        'defvalue': ['gz'],
+        'help': ["TBD"]
+    }
+
     cfg['auth'] = {
         'short_help': 'Flag determining whether to enable authenticated and encrypted jobs. Intended for testing client-side authentication flags, not for securing sensitive information.',
         'switch': '-auth',
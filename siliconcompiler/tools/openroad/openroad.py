@@ -71,11 +71,13 @@ def setup(chip, mode='batch'):
     chip.set('eda', tool, 'refdir',  step, index, refdir, clobber=clobber)
     chip.set('eda', tool, 'script',  step, index, refdir + script, clobber=clobber)
 
-    # normalizing thread count based on parallelism and local
-    threads = os.cpu_count()
+    # normalizing thread count based on parallelism and local CPU slots
+    # available to run(), so that all indices of a step can run together
+    cpus = chip.get('maxcpus') or os.cpu_count()
+    threads = cpus
     if not chip.get('remote') and step in chip.getkeys('flowgraph', flow):
         np = len(chip.getkeys('flowgraph', flow, step))
-        threads = int(math.ceil(os.cpu_count()/np))
+        threads = int(math.ceil(cpus/np))
 
     chip.set('eda', tool, 'threads', step, index, threads, clobber=clobber)
 
@@ -218,68 +220,65 @@ def post_process(chip):
     warnings = 0
     metric = None
 
-    with open(logfile) as f:
-        for line in f:
-            metricmatch = re.search(r'^SC_METRIC:\s+(\w+)', line)
-            errmatch = re.match(r'^Error:', line)
-            warnmatch = re.match(r'^\[WARNING', line)
-            area = re.search(r'^Design area (\d+)\s+u\^2\s+(.*)\%\s+utilization', line)
-            tns = re.search(r'^tns (.*)', line)
-            wns = re.search(r'^wns (.*)', line)
-            slack = re.search(r'^worst slack (.*)', line)
-            vias = re.search(r'^Total number of vias = (.*).', line)
-            wirelength = re.search(r'^Total wire length = (.*) um', line)
-            power = re.search(r'^Total(.*)', line)
-            if metricmatch:
-                metric = metricmatch.group(1)
-            elif errmatch:
-                errors = errors + 1
-            elif warnmatch:
-                warnings = warnings +1
-            elif area:
-                #TODO: not sure the openroad utilization makes sense?
-                cellarea = round(float(area.group(1)), 2)
-                utilization = round(float(area.group(2)), 2)
-                totalarea = round(cellarea/(utilization/100), 2)
-                chip.set('metric', step, index, 'cellarea', 'real', cellarea, clobber=True)
-                chip.set('metric', step, index, 'totalarea', 'real', totalarea, clobber=True)
-                chip.set('metric', step, index, 'utilization', 'real', utilization, clobber=True)
-            elif tns:
-                chip.set('metric', step, index, 'setuptns', 'real', round(float(tns.group(1)), 2), clobber=True)
-            elif wns:
-                chip.set('metric', step, index, 'setupwns', 'real', round(float(wns.group(1)), 2), clobber=True)
-            elif slack:
-                chip.set('metric', step, index, metric, 'real', round(float(slack.group(1)), 2), clobber=True)
-            elif wirelength:
-                chip.set('metric', step, index, 'wirelength', 'real', round(float(wirelength.group(1)), 2), clobber=True)
-            elif vias:
-                chip.set('metric', step, index, 'vias', 'real', int(vias.group(1)), clobber=True)
-            elif metric == "power":
-                if power:
-                    powerlist = power.group(1).split()
-                    leakage = powerlist[2]
-                    total = powerlist[3]
-                    chip.set('metric', step, index, 'peakpower', 'real', float(total), clobber=True)
-                    chip.set('metric', step, index, 'leakagepower', 'real', float(leakage), clobber=True)
+    # patterns take precedence in order
+    patterns = {
+        'metric': r'^SC_METRIC:\s+(\w+)',
+        'error': r'^Error:',
+        'warning': r'^\[WARNING',
+        'area': r'^Design area (\d+)\s+u\^2\s+(.*)\%\s+utilization',
+        'tns': r'^tns (.*)',
+        'wns': r'^wns (.*)',
+        'slack': r'^worst slack (.*)',
+        'wirelength': r'^Total wire length = (.*) um',
+        'vias': r'^Total number of vias = (.*).',
+        'power': r'^Total(.*)'
+    }
+
+    for name, groups in chip.scan_file(logfile, patterns):
+        if name == 'metric':
+            metric = groups[0]
+        elif name == 'error':
+            errors = errors + 1
+        elif name == 'warning':
+            warnings = warnings +1
+        elif name == 'area':
+            #TODO: not sure the openroad utilization makes sense?
+            cellarea = round(float(groups[0]), 2)
+            utilization = round(float(groups[1]), 2)
+            totalarea = round(cellarea/(utilization/100), 2)
+            chip.set('metric', step, index, 'cellarea', 'real', cellarea, clobber=True)
+            chip.set('metric', step, index, 'totalarea', 'real', totalarea, clobber=True)
+            chip.set('metric', step, index, 'utilization', 'real', utilization, clobber=True)
+        elif name == 'tns':
+            chip.set('metric', step, index, 'setuptns', 'real', round(float(groups[0]), 2), clobber=True)
+        elif name == 'wns':
+            chip.set('metric', step, index, 'setupwns', 'real', round(float(groups[0]), 2), clobber=True)
+        elif name == 'slack':
+            chip.set('metric', step, index, metric, 'real', round(float(groups[0]), 2), clobber=True)
+        elif name == 'wirelength':
+            chip.set('metric', step, index, 'wirelength', 'real', round(float(groups[0]), 2), clobber=True)
+        elif name == 'vias':
+            chip.set('metric', step, index, 'vias', 'real', int(groups[0]), clobber=True)
+        elif name == 'power' and metric == "power":
+            powerlist = groups[0].split()
+            leakage = powerlist[2]
+            total = powerlist[3]
+            chip.set('metric', step, index, 'peakpower', 'real', float(total), clobber=True)
+            chip.set('metric', step, index, 'leakagepower', 'real', float(leakage), clobber=True)
 
     #Setting Warnings and Errors
     chip.set('metric', step, index, 'errors', 'real', errors, clobber=True)
     chip.set('metric', step, index, 'warnings', 'real', warnings, clobber=True)
 
     #Temporary superhack!rm
-    #Getting cell count and net number from DEF
+    #Getting cell count and net number from DEF header, stopping once all
+    #counts are found
     if errors == 0:
-        with open("outputs/" + design + ".def") as f:
-            for line in f:
-                cells = re.search(r'^COMPONENTS (\d+)', line)
-                nets = re.search(r'^NETS (\d+)', line)
-                pins = re.search(r'^PINS (\d+)', line)
-                if cells:
-                    chip.set('metric', step, index, 'cells', 'real', int(cells.group(1)), clobber=True)
-                elif nets:
-                    chip.set('metric', step, index, 'nets', 'real', int(nets.group(1)), clobber=True)
-                elif pins:
-                    chip.set('metric', step, index, 'pins', 'real', int(pins.group(1)), clobber=True)
+        chip.extract_metrics("outputs/" + design + ".def", {
+            'cells': (r'^COMPONENTS (\d+)', int),
+            'nets': (r'^NETS (\d+)', int),
+            'pins': (r'^PINS (\d+)', int)
+        }, once=True)
 
     if step == 'sta':
         # Copy along GDS for verification steps that rely on it
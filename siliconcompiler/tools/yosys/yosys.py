@@ -147,17 +147,11 @@ def post_process(chip):
     if step == 'syn':
         #TODO: looks like Yosys exits on error, so no need to check metric
         chip.set('metric', step, index, 'errors', 'real', 0, clobber=True)
-        with open(step + ".log") as f:
-            for line in f:
-                area = re.search(r'Chip area for module.*\:\s+(.*)', line)
-                cells = re.search(r'Number of cells\:\s+(.*)', line)
-                warnings = re.search(r'Warnings.*\s(\d+)\s+total', line)
-                if area:
-                    chip.set('metric', step, index, 'cellarea', 'real', round(float(area.group(1)),2), clobber=True)
-                elif cells:
-                    chip.set('metric', step, index, 'cells', 'real', int(cells.group(1)), clobber=True)
-                elif warnings:
-                    chip.set('metric', step, index, 'warnings', 'real', int(warnings.group(1)), clobber=True)
+        chip.extract_metrics(step + ".log", {
+            'cellarea': (r'Chip area for module.*\:\s+(.*)', lambda area: round(float(area),2)),
+            'cells': (r'Number of cells\:\s+(.*)', int),
+            'warnings': (r'Warnings.*\s(\d+)\s+total', int)
+        })
     elif step == 'lec':
         with open(step + ".log") as f:
             for line in f:
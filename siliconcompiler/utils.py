@@ -2,28 +2,132 @@ import os
 import shutil
 import sys
 
-def copytree(src, dst, ignore=[], dirs_exist_ok=False, link=False):
+# Linux ioctl that clones the extents of a file (copy-on-write copy)
+FICLONE = 0x40049409
+
+def copytree(src, dst, ignore=[], dirs_exist_ok=False, link=False, stats=None):
     '''Simple implementation of shutil.copytree to give us a dirs_exist_ok
     option in Python < 3.8.
 
-    If link is True, create hard links in dst pointing to files in src
-    instead of copying them.
+    Files are staged with copyfile(), so link selects between copies
+    (False or 'copy'), hard links (True or 'hardlink'), copy-on-write
+    clones ('reflink') and symbolic links ('symlink'). If stats is a
+    dictionary, the number of bytes copied and linked are added to its
+    'copied' and 'linked' entries.
     '''
     os.makedirs(dst, exist_ok=dirs_exist_ok)
 
-    for name in os.listdir(src):
-        if name in ignore:
-            continue
+    with os.scandir(src) as entries:
+        for entry in entries:
+            if entry.name in ignore:
+                continue
+
+            dstfile = os.path.join(dst, entry.name)
+
+            if entry.is_dir():
+                copytree(entry.path, dstfile, ignore=ignore, dirs_exist_ok=dirs_exist_ok,
+                         link=link, stats=stats)
+            else:
+                copyfile(entry.path, dstfile, link=link, stats=stats,
+                         size=entry.stat().st_size)
+
+def copyfile(src, dst, link=False, stats=None, size=None):
+    '''Stages the file src at dst, replacing dst if it exists.
+
+    If link is 'symlink', dst is a symbolic link to src. If link is True or
+    'hardlink', dst is a hard link to src, falling back to a reflink if
+    src is on a different file system. If link is 'reflink', dst is a
+    copy-on-write clone of src where the file system supports it. Otherwise,
+    or if linking fails, src is copied.
+    '''
+    if link is True:
+        link = 'hardlink'
+
+    if size is None:
+        size = os.stat(src).st_size
+
+    if os.path.lexists(dst):
+        # never write through an existing link to another file
+        os.remove(dst)
+
+    linked = False
+    if link == 'symlink':
+        try:
+            os.symlink(os.path.abspath(src), dst)
+            linked = True
+        except OSError:
+            pass
+    if link == 'hardlink' and not linked:
+        try:
+            os.link(src, dst)
+            linked = True
+        except OSError:
+            pass
+    if link in ('hardlink', 'reflink') and not linked:
+        linked = _reflink(src, dst)
+    if not linked:
+        shutil.copy2(src, dst)
+
+    if stats is not None:
+        item = 'linked' if linked else 'copied'
+        stats[item] = stats.get(item, 0) + size
+
+def _reflink(src, dst):
+    '''Creates dst as a copy-on-write clone of src. Returns False if the
+    platform or file system does not support it.'''
+    try:
+        import fcntl
+    except ImportError:
+        return False
 
-        srcfile = os.path.join(src, name)
-        dstfile = os.path.join(dst, name)
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        if os.path.lexists(dst):
+            os.remove(dst)
+        return False
 
-        if os.path.isdir(srcfile):
-            copytree(srcfile, dstfile, ignore=ignore, dirs_exist_ok=dirs_exist_ok)
-        elif link:
-            os.link(srcfile, dstfile)
-        else:
-            shutil.copy2(srcfile, dstfile)
+    shutil.copystat(src, dst)
+    return True
+
+def hash_file(filename, algo='sha256'):
+    '''Returns the hex digest of a file. Files are read in large blocks,
+    during which hashlib releases the GIL.'''
+
+    import hashlib
+
+    hashobj = hashlib.new(algo)
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            hashobj.update(block)
+    return hashobj.hexdigest()
+
+def read_json_sections(fin, sections):
+    '''Reads the given top level sections of a json manifest from the text
+    file fin. In compact manifests, which hold one section per line, only
+    the lines of those sections are decoded. Other json manifests are
+    decoded completely.
+    '''
+
+    import json
+
+    first = fin.readline()
+    second = fin.readline()
+    if first != '{\n' or not second.startswith('"'):
+        fin.seek(0)
+        localcfg = json.load(fin)
+        return {section: localcfg[section] for section in sections if section in localcfg}
+
+    localcfg = {}
+    line = second
+    while line.startswith('"'):
+        section, blob = line.rstrip('\n').rstrip(',').split(':', 1)
+        section = json.loads(section)
+        if section in sections:
+            localcfg[section] = json.loads(blob)
+        line = fin.readline()
+    return localcfg
 
 def trim(docstring):
     '''Helper function for cleaning up indentation of docstring.
@@ -55,3 +159,176 @@ def trim(docstring):
         trimmed.pop(0)
     # Return a single string:
     return '\n'.join(trimmed)
+
+# Magic number at the start of zstandard frames
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+def _compressor(compression):
+    '''Returns a compressobj-like object (with compress() and flush()) for a
+    compression setting of the form '<format>[:<level>]', where format is
+    'gz', 'zstd' or 'none'. Returns None for 'none'.'''
+
+    fmt, _, level = compression.partition(':')
+    if fmt == 'gz':
+        import zlib
+        # wbits=31 produces a gzip stream
+        return zlib.compressobj(int(level) if level else 6, zlib.DEFLATED, 31)
+    if fmt == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=int(level) if level else 3).compressobj()
+    if fmt == 'none':
+        return None
+    raise ValueError(f'Unsupported archive compression {compression}')
+
+def archive_stream(srcdir, compression='gz', exclude=[], files=None, chunk_size=1 << 20):
+    '''Generator yielding a compressed tar archive of the contents of srcdir,
+    in chunks of about chunk_size bytes.
+
+    The archive is written by a background thread, and at most a few chunks
+    are buffered, so archives of any size are produced in bounded memory and
+    without intermediate files. compression is '<format>[:<level>]', where
+    format is 'gz', 'zstd' (requires the zstandard package) or 'none'. Top
+    level entries of srcdir named in exclude are skipped. If files is given,
+    only those paths (relative to srcdir) are archived, without recursing
+    into directories.
+    '''
+
+    import queue
+    import tarfile
+    import threading
+
+    compressor = _compressor(compression)
+    chunks = queue.Queue(maxsize=4)
+    closed = threading.Event()
+
+    class _Writer:
+        def __init__(self):
+            self.buffer = []
+            self.size = 0
+
+        def write(self, data):
+            if closed.is_set():
+                raise OSError('Archive stream was closed')
+            nbytes = len(data)
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                self.buffer.append(bytes(data))
+                self.size += len(data)
+            if self.size >= chunk_size:
+                self.flush()
+            return nbytes
+
+        def flush(self):
+            if self.buffer:
+                chunks.put(b''.join(self.buffer))
+                self.buffer = []
+                self.size = 0
+
+    def produce():
+        writer = _Writer()
+        try:
+            with tarfile.open(fileobj=writer, mode='w|') as tar:
+                if files is not None:
+                    for name in files:
+                        tar.add(os.path.join(srcdir, name), arcname=name, recursive=False)
+                else:
+                    with os.scandir(srcdir) as entries:
+                        for entry in sorted(entries, key=lambda entry: entry.name):
+                            if entry.name not in exclude:
+                                tar.add(entry.path, arcname=entry.name)
+            if compressor:
+                writer.buffer.append(compressor.flush())
+            writer.flush()
+            chunks.put(None)
+        except Exception as e:
+            chunks.put(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        # Unblock the producer if the consumer stopped early.
+        closed.set()
+        while producer.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+def extract_archive(fileobj, dstdir, skip=None):
+    '''Extracts a tar archive read sequentially from the binary stream
+    fileobj into dstdir, without seeking or intermediate files.
+
+    The archive may be uncompressed or compressed with gzip, bzip2, xz or
+    zstd. Members for which skip(member) is True are not extracted.
+    Existing files are replaced rather than written through, so hard links
+    in dstdir are never modified. Members which would be written (or link)
+    outside of dstdir raise an error before any file is touched.
+    '''
+
+    import io
+    import tarfile
+
+    if not hasattr(fileobj, 'peek'):
+        fileobj = io.BufferedReader(fileobj)
+    if fileobj.peek(4)[:4] == ZSTD_MAGIC:
+        import zstandard
+        fileobj = zstandard.ZstdDecompressor().stream_reader(fileobj)
+        mode = 'r|'
+    else:
+        mode = 'r|*'
+
+    # Apply tar's own safety checks (no absolute paths, paths leaving
+    # dstdir or special files) where this Python version supports
+    # extraction filters. The 'tar' filter does not check link targets, so
+    # _check_member() runs either way.
+    tar_filter = getattr(tarfile, 'tar_filter', None)
+    kwargs = {}
+    if tar_filter:
+        kwargs['filter'] = 'tar'
+
+    root = os.path.realpath(dstdir)
+    with tarfile.open(fileobj=fileobj, mode=mode) as tar:
+        for member in tar:
+            if skip and skip(member):
+                continue
+            # Members are checked before anything in dstdir is modified.
+            if tar_filter:
+                tar_filter(member, root)
+            _check_member(member, root)
+            target = os.path.join(root, member.name)
+            if not _is_within(root, os.path.realpath(os.path.dirname(target))):
+                raise tarfile.ExtractError(f'Archive member {member.name} is outside of {dstdir}')
+            if not member.isdir() and os.path.lexists(target) and not os.path.isdir(target):
+                os.remove(target)
+            tar.extract(member, root, **kwargs)
+
+def _is_within(root, path):
+    '''Returns True if path is root or below it.'''
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+def _check_member(member, root):
+    '''Raises tarfile.ExtractError if an archive member, or the target of a
+    link member, would be extracted outside of the directory root.'''
+
+    import tarfile
+
+    name = os.path.normpath(os.path.join(root, member.name))
+    if os.path.isabs(member.name) or not _is_within(root, name):
+        raise tarfile.ExtractError(f'Archive member {member.name} is outside of {root}')
+    if member.issym():
+        link = os.path.normpath(os.path.join(os.path.dirname(name), member.linkname))
+    elif member.islnk():
+        link = os.path.normpath(os.path.join(root, member.linkname))
+    else:
+        return
+    if os.path.isabs(member.linkname) or not _is_within(root, link):
+        raise tarfile.ExtractError(f'Archive member {member.name} links outside of {root}')
@@ -17,8 +17,68 @@ def test_check_logfile(datadir):
     logfile = os.path.join(datadir, 'place.log')
     chip.check_logfile(step='place', logfile=logfile)
 
+    with open('place.warnings') as f:
+        warnings = f.read().splitlines()
+    assert warnings
+    assert all('WARNING' in line and 'DPL' not in line for line in warnings)
+
+def test_search_logfile():
+    '''Grep switches are honored by chained patterns.'''
+
+    chip = siliconcompiler.Chip()
+
+    with open('test.log', 'w') as f:
+        f.write('Error: one\nerror: two\nwarning\nwarnings: 3\nno errors\nlast error')
+
+    patterns = {
+        'errors': ['-i error'],
+        'exact': ['-x warning'],
+        'word': ['-w warning'],
+        'count': ['warnings', '-o [0-9]+'],
+        'inverted': ['-v -i error'],
+    }
+    matches = list(chip.search_logfile('test.log', patterns))
+
+    assert matches == [
+        ('errors', 'Error: one'),
+        ('errors', 'error: two'),
+        ('exact', 'warning'),
+        ('word', 'warning'),
+        ('inverted', 'warning'),
+        ('count', '3'),
+        ('inverted', 'warnings: 3'),
+        ('errors', 'no errors'),
+        ('errors', 'last error'),
+    ]
+
+    assert chip.grep('-o [0-9]+', 'warnings: 3\n') == '3'
+    assert chip.grep('-v warning', 'warnings: 3\n') is None
+
+def test_search_logfile_string_anchors():
+    '''\\A and \\Z anchor each line, not each block of the log file.'''
+
+    chip = siliconcompiler.Chip()
+
+    with open('test.log', 'w') as f:
+        f.write('Error: one\nsome Error\nError: two\nlast\n')
+
+    patterns = {
+        'start': [r'\AError'],
+        'end': [r'\d\Z|last\Z'],
+    }
+    matches = list(chip.search_logfile('test.log', patterns))
+
+    assert matches == [
+        ('start', 'Error: one'),
+        ('start', 'Error: two'),
+        ('end', 'last'),
+    ]
+    assert matches == [(name, line) for line in ('Error: one', 'some Error', 'Error: two', 'last')
+                       for name, args in patterns.items() if chip.grep(args[0], line)]
 
 #########################
 if __name__ == "__main__":
     from tests.fixtures import datadir
     test_check_logfile(datadir(__file__))
+    test_search_logfile()
+    test_search_logfile_string_anchors()
@@ -0,0 +1,60 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import os
+import pytest
+from siliconcompiler import utils
+
+def _make_tree():
+    os.makedirs('src/sub')
+    with open('src/top.v', 'w') as f:
+        f.write('module top(); endmodule\n')
+    with open('src/sub/lib.v', 'w') as f:
+        f.write('module lib(); endmodule\n')
+    return os.path.getsize('src/top.v') + os.path.getsize('src/sub/lib.v')
+
+@pytest.mark.parametrize('link', ['hardlink', 'reflink', 'copy'])
+def test_copytree_modes(link):
+    size = _make_tree()
+
+    stats = {}
+    utils.copytree('src', 'dst', link=link, stats=stats)
+
+    assert stats.get('copied', 0) + stats.get('linked', 0) == size
+    for name in ('top.v', os.path.join('sub', 'lib.v')):
+        dst = os.path.join('dst', name)
+        assert not os.path.islink(dst)
+        with open(dst) as f:
+            assert f.read().startswith('module')
+        shared = os.path.samefile(os.path.join('src', name), dst)
+        assert shared == (link == 'hardlink')
+
+def test_copytree_symlink():
+    size = _make_tree()
+
+    stats = {}
+    utils.copytree('src', 'dst', link='symlink', stats=stats)
+    assert stats == {'linked': size}
+    assert os.path.islink(os.path.join('dst', 'sub', 'lib.v'))
+
+    # restaging replaces links instead of writing through them
+    utils.copytree('src', 'dst', link='copy', dirs_exist_ok=True)
+    assert not os.path.islink(os.path.join('dst', 'sub', 'lib.v'))
+    assert os.path.getsize(os.path.join('src', 'sub', 'lib.v')) > 0
+
+def test_copytree_symlink_fallback(monkeypatch):
+    '''Files are copied if symbolic links are not supported.'''
+    size = _make_tree()
+
+    def no_symlink(src, dst):
+        raise OSError('symbolic links are not supported')
+    monkeypatch.setattr(os, 'symlink', no_symlink)
+
+    stats = {}
+    utils.copytree('src', 'dst', link='symlink', stats=stats)
+    assert stats == {'copied': size}
+    assert not os.path.islink(os.path.join('dst', 'sub', 'lib.v'))
+    with open(os.path.join('dst', 'top.v')) as f:
+        assert f.read().startswith('module')
+
+#########################
+if __name__ == "__main__":
+    test_copytree_symlink()
@@ -0,0 +1,95 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import io
+import os
+import tarfile
+
+import pytest
+
+from siliconcompiler import utils
+
+def _archive(*members):
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w:gz') as tar:
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    data.seek(0)
+    return data
+
+def test_extract_archive():
+    os.makedirs('dst/sub')
+    with open('dst/sub/lib.v', 'w') as f:
+        f.write('old\n')
+    os.link('dst/sub/lib.v', 'copy.v')
+
+    utils.extract_archive(_archive(('top.v', b'top\n'), ('sub/lib.v', b'new\n')), 'dst')
+
+    with open('dst/top.v') as f:
+        assert f.read() == 'top\n'
+    with open('dst/sub/lib.v') as f:
+        assert f.read() == 'new\n'
+    # hard links to replaced files are not written through
+    with open('copy.v') as f:
+        assert f.read() == 'old\n'
+
+@pytest.mark.parametrize('absolute', [False, True])
+def test_extract_archive_outside(absolute):
+    name = os.path.abspath('victim.txt') if absolute else '../victim.txt'
+    os.mkdir('dst')
+    with open('victim.txt', 'w') as f:
+        f.write('keep\n')
+
+    with pytest.raises(tarfile.TarError):
+        utils.extract_archive(_archive((name, b'evil\n')), 'dst')
+
+    with open('victim.txt') as f:
+        assert f.read() == 'keep\n'
+
+@pytest.mark.parametrize('name', ['../victim.txt', '/victim.txt', 'a/../../victim.txt'])
+def test_check_member(name):
+    root = os.path.abspath('dst')
+    with pytest.raises(tarfile.ExtractError):
+        utils._check_member(tarfile.TarInfo(name), root)
+
+    link = tarfile.TarInfo('link')
+    link.type = tarfile.SYMTYPE
+    link.linkname = name
+    with pytest.raises(tarfile.ExtractError):
+        utils._check_member(link, root)
+
+    inside = tarfile.TarInfo('sub/link')
+    inside.type = tarfile.SYMTYPE
+    inside.linkname = '../top.v'
+    utils._check_member(inside, root)
+
+def test_extract_archive_symlink_parent():
+    '''Members are not written through symlinks leading outside of dstdir.'''
+    os.makedirs('dst')
+    os.mkdir('outside')
+    os.symlink(os.path.abspath('outside'), 'dst/out')
+
+    with pytest.raises(tarfile.TarError):
+        utils.extract_archive(_archive(('out/victim.txt', b'evil\n')), 'dst')
+    assert not os.path.exists('outside/victim.txt')
+
+@pytest.mark.parametrize('linkname', ['/etc', '../outside'])
+def test_extract_archive_symlink_outside(linkname):
+    '''Symlink members pointing outside of dstdir are rejected.'''
+    os.mkdir('dst')
+
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w:gz') as tar:
+        info = tarfile.TarInfo('evil')
+        info.type = tarfile.SYMTYPE
+        info.linkname = linkname
+        tar.addfile(info)
+    data.seek(0)
+
+    with pytest.raises(tarfile.TarError):
+        utils.extract_archive(data, 'dst')
+    assert not os.path.lexists('dst/evil')
+
+#########################
+if __name__ == "__main__":
+    test_extract_archive()
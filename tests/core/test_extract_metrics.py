@@ -0,0 +1,83 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import pytest
+import siliconcompiler
+
+def test_scan_file():
+    '''Patterns take precedence in order, and scans can stop early.'''
+
+    chip = siliconcompiler.Chip()
+
+    with open('test.log', 'w') as f:
+        f.write('Total wire length = 10 um\n'
+                'Total 1 2\n'
+                'area: 5 (um)\n'
+                'END HEADER\n'
+                'Total 3 4')
+
+    patterns = {
+        'wirelength': r'^Total wire length = (.*) um',
+        'total': r'^Total (\d+) (\d+)',
+        'area': r'area: (\d+) \((\w+)\)'
+    }
+    assert list(chip.scan_file('test.log', patterns)) == [
+        ('wirelength', ('10',)),
+        ('total', ('1', '2')),
+        ('area', ('5', 'um')),
+        ('total', ('3', '4'))]
+
+    assert list(chip.scan_file('test.log', patterns, stop='^END')) == [
+        ('wirelength', ('10',)),
+        ('total', ('1', '2')),
+        ('area', ('5', 'um'))]
+
+    assert list(chip.scan_file('test.log', {'total': patterns['total']}, once=True)) == [
+        ('total', ('1', '2'))]
+
+def test_scan_file_patterns():
+    '''Anchors only apply to their own branch, and numbered backreferences
+    are rejected.'''
+
+    chip = siliconcompiler.Chip()
+
+    with open('test.log', 'w') as f:
+        f.write('foo 1\n'
+                'the bar 2\n'
+                'the foo 3\n')
+
+    assert list(chip.scan_file('test.log', {'x': r'^foo (\d)|bar (\d)'})) == [
+        ('x', ('1', None)),
+        ('x', (None, '2'))]
+    assert list(chip.scan_file('test.log', {'x': r'[|^]foo (\d)'})) == []
+
+    with pytest.raises(siliconcompiler.SiliconCompilerError):
+        list(chip.scan_file('test.log', {'x': r'(\w+) \1'}))
+
+def test_extract_metrics():
+
+    chip = siliconcompiler.Chip()
+    chip.set('arg', 'step', 'place')
+    chip.set('arg', 'index', '0')
+
+    with open('test.def', 'w') as f:
+        f.write('COMPONENTS 4 ;\n'
+                '- a INV ;\n'
+                'END COMPONENTS\n'
+                'PINS 2 ;\n'
+                'NETS 3 ;\n'
+                'COMPONENTS 5 ;\n')
+
+    chip.extract_metrics('test.def', {
+        'cells': r'^COMPONENTS (\d+)',
+        'pins': r'^PINS (\d+)',
+        'nets': (r'^NETS (\d+)', lambda nets: int(nets) * 2)
+    }, once=True)
+
+    assert chip.get('metric', 'place', '0', 'cells', 'real') == 4
+    assert chip.get('metric', 'place', '0', 'pins', 'real') == 2
+    assert chip.get('metric', 'place', '0', 'nets', 'real') == 6
+
+#########################
+if __name__ == "__main__":
+    test_scan_file()
+    test_scan_file_patterns()
+    test_extract_metrics()
@@ -24,6 +24,34 @@ def test_find_function():
     chip.write_manifest("module.json")
     assert (os.path.isfile('module.json'))
 
+def test_find_function_cache():
+    '''Modules are imported once, and again only if they change on disk.'''
+
+    os.makedirs('flows')
+    with open('flows/myflow.py', 'w') as f:
+        f.write('def setup(chip):\n    return 1\n')
+
+    chip = siliconcompiler.Chip()
+    f1 = chip.find_function('myflow', 'setup', 'flows')
+    f2 = siliconcompiler.Chip().find_function('myflow', 'setup', 'flows')
+    assert f1 is f2
+
+    with open('flows/myflow.py', 'w') as f:
+        f.write('def setup(chip):\n    return 2\n')
+    mtime = os.path.getmtime('flows/myflow.py') + 1
+    os.utime('flows/myflow.py', (mtime, mtime))
+
+    f3 = chip.find_function('myflow', 'setup', 'flows')
+    assert f3 is not f1
+    assert f3(chip) == 2
+
+    # the modified module replaces the cached one
+    path = os.path.abspath('flows/myflow.py')
+    keys = [key for key in siliconcompiler.core._module_cache
+            if os.path.abspath(key[2]) == path]
+    assert len(keys) == 1
+
 #########################
 if __name__ == "__main__":
     test_find_function()
+    test_find_function_cache()
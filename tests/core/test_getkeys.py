@@ -0,0 +1,53 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import os
+import siliconcompiler
+
+def _walk(chip):
+    return sorted(chip._allkeys(chip.cfg))
+
+def test_getkeys_index():
+
+    chip = siliconcompiler.Chip()
+    assert sorted(chip.getkeys()) == _walk(chip)
+
+    # instantiating 'default' branches updates the index
+    chip.load_target("freepdk45_demo")
+    chip.set('pdk', 'grid', '10M', 'metal1', 'name', 'm1')
+    chip.add('source', 'top.v')
+    assert sorted(chip.getkeys()) == _walk(chip)
+
+    # returned keypaths are copies
+    allkeys = chip.getkeys()
+    allkeys[0].pop()
+    assert sorted(chip.getkeys()) == _walk(chip)
+
+    # replacing the dictionary drops the index
+    chip.cfg = siliconcompiler.Chip().cfg
+    assert sorted(chip.getkeys()) == _walk(chip)
+
+def test_keypaths_filter(datadir):
+
+    chip = siliconcompiler.Chip()
+    chip.read_manifest(os.path.join(datadir, 'gcd.pkg.json'))
+
+    for keypath in chip._keypaths(typematch='file'):
+        assert 'file' in chip.get(*keypath, field='type')
+    for keypath in chip._keypaths(typematch=('file', 'dir')):
+        paramtype = chip.get(*keypath, field='type')
+        assert 'file' in paramtype or 'dir' in paramtype
+
+    jobkeys = chip._keypaths(scope='job')
+    assert ('fpga', 'arch') in jobkeys
+    for keypath in jobkeys:
+        assert chip.get(*keypath, field='scope') == 'job'
+
+    # history entries are picked up after record_history()
+    chip.record_history()
+    assert sorted(chip.getkeys()) == _walk(chip)
+    assert any(keypath[0] == 'history' for keypath in chip._keypaths())
+
+#########################
+if __name__ == "__main__":
+    from tests.fixtures import datadir
+    test_getkeys_index()
+    test_keypaths_filter(datadir(__file__))
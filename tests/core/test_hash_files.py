@@ -1,4 +1,5 @@
 # Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import hashlib
 import os
 import siliconcompiler
 
@@ -13,6 +14,32 @@ def test_hash_files():
             chip.hash_files(*keypath)
     chip.write_manifest("hashed.json")
 
+def test_hash_cache():
+    '''Hashes honor the algorithm, and are cached until files change.'''
+
+    with open('a.v', 'w') as f:
+        f.write('module a; endmodule\n')
+    with open('b.v', 'w') as f:
+        f.write('module b; endmodule\n')
+
+    chip = siliconcompiler.Chip(design='a')
+    chip.set('source', ['a.v', 'b.v'])
+    chip.set('source', 'md5', field='hashalgo')
+
+    def digests(algo):
+        return [hashlib.new(algo, open(f, 'rb').read()).hexdigest() for f in ('a.v', 'b.v')]
+
+    assert chip.hash_files('source') == digests('md5')
+    assert chip.get('source', field='filehash') == digests('md5')
+    assert chip.hash_files('source', algo='sha256', update=False) == digests('sha256')
+    assert os.path.isfile(os.path.join('build', 'hashcache.json'))
+
+    # changed files are hashed again
+    with open('a.v', 'w') as f:
+        f.write('module a2; endmodule\n')
+    assert chip.hash_files('source', update=False) == digests('md5')
+
 #########################
 if __name__ == "__main__":
     test_hash_files()
+    test_hash_cache()
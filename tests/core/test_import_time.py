@@ -0,0 +1,53 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import os
+import subprocess
+import sys
+
+# Modules that are only needed by specific Chip methods, and should not be
+# loaded just by importing siliconcompiler or running 'sc -version'.
+HEAVY_MODULES = ('pandas', 'yaml', 'graphviz', 'jinja2', 'psutil',
+                 'webbrowser', 'requests', 'cryptography', 'netifaces')
+
+def _importtime(scroot, *args):
+    '''Runs python with -X importtime and returns the set of top-level
+    modules imported, along with the cumulative import time (us) of
+    siliconcompiler.'''
+
+    env = os.environ.copy()
+    env['PYTHONPATH'] = scroot
+    proc = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE,
+                          universal_newlines=True,
+                          env=env)
+    assert proc.returncode == 0, proc.stderr
+
+    modules = set()
+    sc_time = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line.split('|')
+        name = fields[-1].strip()
+        modules.add(name.split('.')[0])
+        if name == 'siliconcompiler':
+            sc_time = int(fields[1])
+
+    return modules, sc_time
+
+def test_import_siliconcompiler(scroot):
+    modules, sc_time = _importtime(scroot, '-c', 'import siliconcompiler')
+    assert 'siliconcompiler' in modules
+    loaded = [m for m in HEAVY_MODULES if m in modules]
+    assert not loaded, f'import siliconcompiler ({sc_time} us) loaded {loaded}'
+
+def test_sc_version(scroot):
+    modules, sc_time = _importtime(scroot, '-m', 'siliconcompiler', '-version')
+    loaded = [m for m in HEAVY_MODULES if m in modules]
+    assert not loaded, f'sc -version ({sc_time} us) loaded {loaded}'
+
+#########################
+if __name__ == "__main__":
+    from tests.fixtures import scroot
+    test_import_siliconcompiler(scroot())
+    test_sc_version(scroot())
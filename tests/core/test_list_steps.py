@@ -20,3 +20,49 @@ def test_list_steps():
     chip.write_flowgraph('test_list_steps.png')
 
     assert chip.list_steps() == ['A', 'B', 'C', 'D']
+
+def test_list_steps_wide():
+    '''Wide fan-in between steps is ordered without enumerating paths.'''
+    chip = siliconcompiler.Chip()
+    flow = 'wide'
+    chip.node(flow, 'import', 'nop')
+    prev = [('import', '0')]
+    for i in range(20):
+        step = f'step{i}'
+        for index in range(8):
+            chip.node(flow, step, 'nop', index=index)
+            for in_step, in_index in prev:
+                chip.edge(flow, in_step, step, tail_index=in_index, head_index=index)
+        prev = [(step, str(index)) for index in range(8)]
+    chip.set('flow', flow)
+
+    steps = chip.list_steps()
+    assert steps == ['import'] + [f'step{i}' for i in range(20)]
+    assert chip._flowgraph_dag(flow)['depth'][('step19', '7')] == 20
+
+    # graph is cached until the flowgraph changes
+    assert chip._flowgraph_dag(flow) is chip._flowgraph_dag(flow)
+    chip.node(flow, 'export', 'nop')
+    chip.edge(flow, 'step19', 'export')
+    assert chip.list_steps()[-1] == 'export'
+
+def test_list_steps_cycle():
+    chip = siliconcompiler.Chip()
+    flow = 'test'
+    chip.node(flow, 'import', 'nop')
+    chip.node(flow, 'A', 'join')
+    chip.node(flow, 'B', 'join')
+    chip.edge(flow, 'import', 'A')
+    chip.edge(flow, 'A', 'B')
+    chip.edge(flow, 'B', 'A')
+    chip.set('flow', flow)
+
+    assert chip.list_steps() == ['import', 'A', 'B']
+    assert chip._flowgraph_dag(flow)['cycle'] == [('A', '0'), ('B', '0')]
+
+    chip.check_manifest()
+    assert chip.error
+
+#########################
+if __name__ == "__main__":
+    test_list_steps()
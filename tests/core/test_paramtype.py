@@ -0,0 +1,39 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import siliconcompiler
+from siliconcompiler.schema import ParamType
+
+def test_paramtype_parse():
+    ptype = ParamType.parse('[(float,float)]')
+    assert ptype.is_list
+    assert ptype.is_tuple
+    assert ptype.elements == ('float', 'float')
+
+    # type strings are only parsed once
+    assert ParamType.parse('[(float,float)]') is ptype
+
+    assert ParamType.parse('[file]').is_file
+    assert not ParamType.parse('str').is_list
+    assert ParamType.parse('bool').is_bool
+
+def test_paramtype_convert():
+    assert ParamType.parse('int').convert('3.0') == 3
+    assert ParamType.parse('[int]').convert(['1', '2']) == [1, 2]
+    assert ParamType.parse('bool').convert('true') is True
+    assert ParamType.parse('(float,float)').convert('(1.0, 2.0)') == (1.0, 2.0)
+    assert ParamType.parse('[(str,str)]').convert(["('a', '0')"]) == [('a', '0')]
+    assert ParamType.parse('[str]').convert(None) is None
+
+def test_tuple_roundtrip():
+    chip = siliconcompiler.Chip()
+    chip.set('asic', 'diearea', [(0, 0), (100.13, 100.8)])
+    assert chip.get('asic', 'diearea') == [(0.0, 0.0), (100.13, 100.8)]
+
+    chip.set('flowgraph', 'test', 'syn', '0', 'input', ('import', '0'))
+    chip.add('flowgraph', 'test', 'syn', '0', 'input', ('import', '1'))
+    assert chip.get('flowgraph', 'test', 'syn', '0', 'input') == [('import', '0'), ('import', '1')]
+
+#########################
+if __name__ == "__main__":
+    test_paramtype_parse()
+    test_paramtype_convert()
+    test_tuple_roundtrip()
@@ -4,6 +4,7 @@ import siliconcompiler
 import copy
 import json
 from siliconcompiler import _metadata
+from siliconcompiler import utils
 
 def test_read_manifest_fields():
     '''Ensure that changes to fields other than 'value' are reflected by read_manifest()'''
@@ -59,8 +60,80 @@ def test_read_defaults(datadir):
 
     assert actual == expected
 
+def test_read_sectioned():
+    '''Test sectioned manifest read/write, including partial reads'''
+
+    chip = siliconcompiler.Chip()
+    chip.add('source', 'foo.v')
+    chip.set('metric', 'syn', '0', 'cellarea', 'real', 10.0)
+    chip.write_manifest('tmp.pkg.json')
+    chip.write_manifest('tmp.pkg.sjson')
+    chip.write_manifest('tmp.pkg.sjson.gz')
+
+    for manifest in ('tmp.pkg.sjson', 'tmp.pkg.sjson.gz'):
+        chip2 = siliconcompiler.Chip()
+        chip2.read_manifest(manifest)
+        assert chip2.get('source') == ['foo.v']
+        assert chip2.get('metric', 'syn', '0', 'cellarea', 'real') == 10.0
+
+        # partial reads only pick up sections updated by run()
+        chip3 = siliconcompiler.Chip()
+        chip3._read_manifest(manifest, partial=True)
+        assert chip3.get('source') == []
+        assert chip3.get('metric', 'syn', '0', 'cellarea', 'real') == 10.0
+
+    chip4 = siliconcompiler.Chip()
+    chip4.read_manifest('tmp.pkg.json')
+    assert chip4.cfg == chip2.cfg
+
+def test_read_compact_partial():
+    '''Partial reads of compact json only decode the sections they merge'''
+
+    chip = siliconcompiler.Chip()
+    chip.add('source', 'foo.v')
+    chip.set('flowstatus', 'syn', '0', 'status', 'success')
+    chip.set('metric', 'syn', '0', 'cellarea', 'real', 10.0)
+    chip.write_manifest('compact.pkg.json', compact=True)
+    chip.write_manifest('indented.pkg.json')
+
+    with open('compact.pkg.json') as f:
+        lines = f.readlines()
+    assert lines[0] == '{\n' and lines[-1] == '}\n'
+
+    for manifest in ('compact.pkg.json', 'indented.pkg.json'):
+        chip2 = siliconcompiler.Chip()
+        chip2._read_manifest(manifest, partial=True)
+        assert chip2.get('source') == []
+        assert chip2.get('flowstatus', 'syn', '0', 'status') == 'success'
+        assert chip2.get('metric', 'syn', '0', 'cellarea', 'real') == 10.0
+
+        with open(manifest) as f:
+            sections = utils.read_json_sections(f, ['metric', 'missing'])
+        assert list(sections) == ['metric']
+
+    chip3 = siliconcompiler.Chip()
+    chip3.read_manifest('compact.pkg.json')
+    assert chip3.get('source') == ['foo.v']
+
+def test_read_compact_partial_gz(monkeypatch):
+    '''Partial reads of compressed compact json only decode some sections'''
+
+    chip = siliconcompiler.Chip()
+    chip.set('metric', 'syn', '0', 'cellarea', 'real', 10.0)
+    chip.write_manifest('compact.pkg.json.gz', compact=True)
+
+    def full_load(*args, **kwargs):
+        raise AssertionError('manifest was decoded completely')
+    monkeypatch.setattr(json, 'load', full_load)
+
+    chip2 = siliconcompiler.Chip()
+    chip2._read_manifest('compact.pkg.json.gz', partial=True)
+    assert chip2.get('metric', 'syn', '0', 'cellarea', 'real') == 10.0
+
 #########################
 if __name__ == "__main__":
     from tests.fixtures import datadir
     test_read_defaults(datadir(__file__))
     test_read_sup()
+    test_read_sectioned()
+    test_read_compact_partial()
@@ -0,0 +1,46 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import siliconcompiler
+
+def test_remove():
+    '''Removed keys disappear from getkeys() and the flowgraph task graph.'''
+
+    chip = siliconcompiler.Chip()
+    chip.node('test', 'import', 'nop')
+    chip.node('test', 'syn', 'nop')
+    chip.edge('test', 'import', 'syn')
+    chip.set('flow', 'test')
+
+    # build the keypath index and task graph before removing
+    assert ['flowgraph', 'test', 'syn', '0', 'tool'] in chip.getkeys()
+    assert chip.list_steps() == ['import', 'syn']
+
+    chip.remove('flowgraph', 'test', 'syn')
+    assert chip.error == 0
+    assert ['flowgraph', 'test', 'syn', '0', 'tool'] not in chip.getkeys()
+    assert chip.getkeys('flowgraph', 'test') == ['import']
+    assert chip.list_steps() == ['import']
+
+    chip.remove('flowgraph', 'test')
+    assert chip.getkeys('flowgraph') == []
+
+def test_remove_invalid():
+    '''Built-in and non-existent keys can't be removed.'''
+
+    chip = siliconcompiler.Chip()
+    chip.remove('design')
+    assert chip.error == 1
+    assert chip.valid('design')
+
+    chip.error = 0
+    chip.remove('flowgraph', 'missing')
+    assert chip.error == 1
+
+    chip.error = 0
+    chip.remove('flowgraph', 'default')
+    assert chip.error == 1
+    assert chip.valid('flowgraph', 'default', 'default', 'default', 'tool', default_valid=True)
+
+#########################
+if __name__ == "__main__":
+    test_remove()
+    test_remove_invalid()
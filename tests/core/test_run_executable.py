@@ -0,0 +1,62 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import sys
+import time
+
+import psutil
+
+import siliconcompiler
+
+# Parent process that prints and waits on a child holding ~64 MB.
+TOOL = '''
+import subprocess, sys
+print('parent start', flush=True)
+subprocess.run([sys.executable, '-c',
+                "import time; data = bytearray(64 << 20); print('child done'); time.sleep(1)"])
+print('parent done')
+'''
+
+def test_run_executable():
+    '''Output is forwarded to the log, and memory of child processes counts.'''
+
+    chip = siliconcompiler.Chip()
+    chip.set('pollinterval', 0.1)
+
+    retcode, usage = chip._run_executable([sys.executable, '-c', TOOL], 'tool.log',
+                                          'syn', '0', quiet=True)
+
+    assert retcode == 0
+    with open('tool.log') as f:
+        assert f.read().split() == ['parent', 'start', 'child', 'done', 'parent', 'done']
+    assert usage['memory'] > 64 << 20
+    assert usage['cputime'] > 0
+    assert usage['threads'] >= 1
+    if sys.platform != 'win32':
+        assert usage['usertime'] + usage['systime'] == usage['cputime']
+        assert usage['ctxswitch'] > 0
+
+def test_run_executable_retcode():
+    chip = siliconcompiler.Chip()
+    retcode, _ = chip._run_executable([sys.executable, '-c', 'import sys; sys.exit(3)'],
+                                      'tool.log', 'syn', '0', quiet=True)
+    assert retcode == 3
+
+def test_run_executable_no_process(monkeypatch):
+    '''Waiting for a tool does not spin if its process can't be monitored.'''
+
+    def process(pid):
+        raise psutil.NoSuchProcess(pid)
+    monkeypatch.setattr(psutil, 'Process', process)
+
+    chip = siliconcompiler.Chip()
+    chip.set('pollinterval', 0.1)
+    start = time.process_time()
+    retcode, usage = chip._run_executable([sys.executable, '-c', 'import time; time.sleep(1)'],
+                                          'tool.log', 'syn', '0', quiet=True)
+
+    assert retcode == 0
+    assert usage['memory'] == 0
+    assert time.process_time() - start < 0.5
+
+#########################
+if __name__ == "__main__":
+    test_run_executable()
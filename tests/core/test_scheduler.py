@@ -0,0 +1,80 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import siliconcompiler
+
+def _wide_flow(N):
+    chip = siliconcompiler.Chip(design='test_scheduler')
+    flow = 'wide'
+    chip.node(flow, 'import', 'echo')
+    chip.node(flow, 'done', 'echo')
+    for n in range(N):
+        i = str(n)
+        chip.node(flow, 'run', 'echo', index=i)
+        chip.edge(flow, 'import', 'run', head_index=i)
+        chip.edge(flow, 'run', 'done', tail_index=i)
+    chip.set('flow', flow)
+    chip.set('mode', 'sim')
+    chip.set('quiet', True)
+    return chip
+
+def test_maxtasks():
+    '''Wide flows complete when fewer task/CPU slots than tasks are available.'''
+
+    chip = _wide_flow(6)
+    chip.set('maxtasks', 2)
+    chip.set('maxcpus', 1)
+    chip.run()
+
+    for index in range(6):
+        assert chip.get('flowstatus', 'run', str(index), 'status') == siliconcompiler.TaskStatus.SUCCESS
+    assert chip.get('flowstatus', 'done', '0', 'status') == siliconcompiler.TaskStatus.SUCCESS
+
+def test_memory_estimate():
+    '''Tool memory estimates default to the previous run's metrics, and
+    tool threads occupy CPU slots.'''
+
+    chip = _wide_flow(2)
+    chip.set('maxcpus', 2)
+    chip.run()
+
+    chip = _wide_flow(2)
+    chip.set('maxcpus', 2)
+    chip.set('eda', 'echo', 'threads', 'run', '0', 2)
+    assert chip._task_slots('run', '0') == 2
+    assert chip._task_slots('run', '1') == 1
+    chip.run()
+
+    for index in ('0', '1'):
+        # the estimate is refreshed by every run, not stored in the manifest
+        assert chip._previous_memory('run', index) is not None
+        assert chip.get('eda', 'echo', 'memory', 'run', index) is None
+        assert chip.get('flowstatus', 'run', index, 'status') == siliconcompiler.TaskStatus.SUCCESS
+
+    assert chip._task_memory('run', '0', 1e6) == 1e6
+    chip.set('eda', 'echo', 'memory', 'run', '0', 4e9)
+    assert chip._task_memory('run', '0', 1e6) == 4e9
+
+def test_backfill_starvation():
+    '''Small tasks backfill free slots, but can't starve a large task.'''
+
+    chip = siliconcompiler.Chip()
+    slots = {'big': 4, 'small0': 1, 'small1': 1, 'small2': 1, 'small3': 1}
+    memory = {task: 0 for task in slots}
+    free = (2, 1 << 30, None)
+    skipped = {}
+
+    # big doesn't fit while another task runs, so small tasks overtake it
+    for n in range(siliconcompiler.core.BACKFILL_LIMIT):
+        small = f'small{n}'
+        assert chip._pack_tasks(['big', small], slots, memory, free, True, skipped) == [small]
+    assert skipped == {'big': siliconcompiler.core.BACKFILL_LIMIT}
+
+    # after that, free slots are held for big
+    assert chip._pack_tasks(['big', 'small3'], slots, memory, free, True, skipped) == []
+    # and it runs (on its own) as soon as nothing else is running
+    assert chip._pack_tasks(['small3', 'big'], slots, memory, free, False, skipped) == ['big']
+
+#########################
+if __name__ == "__main__":
+    test_maxtasks()
+    test_memory_estimate()
+    test_backfill_starvation()
@@ -0,0 +1,31 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import os
+import siliconcompiler
+from siliconcompiler import schema
+
+def test_schema_default():
+    '''Cached schema copies match a freshly built schema and are independent.'''
+
+    cfg = schema.schema_default()
+    assert cfg == schema.schema_cfg()
+
+    chip = siliconcompiler.Chip()
+    chip.add('source', 'top.v')
+    chip.set('eda', 'yosys', 'exe', 'yosys')
+    assert schema.schema_default() == cfg
+
+def test_schema_disk_cache(monkeypatch):
+
+    monkeypatch.setenv('SC_SCHEMA_CACHE', 'cache')
+    monkeypatch.setattr(schema, '_default_cfg', None)
+
+    cfg = schema.schema_default()
+    assert len(os.listdir('cache')) == 1
+
+    # second load comes from disk
+    monkeypatch.setattr(schema, '_default_cfg', None)
+    assert schema.schema_default() == cfg
+
+#########################
+if __name__ == "__main__":
+    test_schema_default()
@@ -124,6 +124,27 @@ def test_defvalue():
     chip.add('pdk', 'stackup', '10m')
     assert chip.cfg['pdk']['stackup']['defvalue'] == []
 
+def test_instance():
+    '''Instances of 'default' share static fields but not mutable ones.'''
+
+    chip = siliconcompiler.Chip()
+    chip.add('eda', 'yosys', 'option', 'syn', '0', '-flatten')
+
+    template = chip.cfg['eda']['default']['option']['default']['default']
+    instance = chip.cfg['eda']['yosys']['option']['syn']['0']
+    assert instance['help'] is template['help']
+    assert instance['example'] is template['example']
+    assert instance['value'] is not template['value']
+    assert template['value'] == []
+
+    # appending to a shared field must not change the template
+    example = list(template['example'])
+    chip.add('eda', 'yosys', 'option', 'syn', '0', 'new example', field='example')
+    assert template['example'] == example
+    assert instance['example'] == example + ['new example']
+
 #########################
 if __name__ == "__main__":
     test_scparam()
+    test_defvalue()
+    test_instance()
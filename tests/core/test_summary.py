@@ -41,6 +41,23 @@ def test_steplist_repeat(gcd_chip, capfd):
     assert 'syn0' in stdout
     assert 'floorplan0' not in stdout
 
+def test_usage_metrics(datadir, capfd):
+    '''Resource usage metrics are shown whenever they were recorded.'''
+    with capfd.disabled():
+        chip = siliconcompiler.Chip()
+        manifest = os.path.join(datadir, 'gcd.pkg.json')
+
+        chip.read_manifest(manifest)
+        chip.set('steplist', ['syn'])
+        chip.set('metric', 'syn', '0', 'usertime', 'real', 12.5)
+
+    chip.summary()
+    stdout, _ = capfd.readouterr()
+
+    assert 'usertime' in stdout
+    assert '12.5' in stdout
+    assert 'ctxswitch' not in stdout
+
 #########################
 if __name__ == "__main__":
     from tests.fixtures import datadir
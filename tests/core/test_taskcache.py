@@ -0,0 +1,95 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import os
+import siliconcompiler
+
+def _serial_flow():
+    chip = siliconcompiler.Chip(design='test_taskcache')
+    chip.set('flow', 'serial')
+    chip.pipe('serial', [{'import': 'echo'}, {'a': 'echo'}, {'b': 'echo'}])
+    chip.set('mode', 'sim')
+    chip.set('quiet', True)
+    chip.set('taskcache', True)
+    return chip
+
+def test_taskcache():
+    '''Unchanged tasks are restored from the task result cache.'''
+
+    chip = _serial_flow()
+    chip.run()
+    cachedir = os.path.join('build', 'taskcache')
+    entries = os.listdir(cachedir)
+    assert len(entries) == 3
+
+    # mark cached logs to detect restored results
+    for entry in entries:
+        for logfile in ('import.log', 'a.log', 'b.log'):
+            path = os.path.join(cachedir, entry, logfile)
+            if os.path.isfile(path):
+                with open(path, 'w') as f:
+                    f.write('cached\n')
+
+    # changing a's settings only invalidates a
+    chip = _serial_flow()
+    chip.set('eda', 'echo', 'option', 'a', '0', 'changed')
+    chip.run()
+
+    def log(step):
+        with open(os.path.join(chip._getworkdir(step=step), f'{step}.log')) as f:
+            return f.read()
+
+    assert log('import') == 'cached\n'
+    assert log('a') == 'changed\n'
+    assert log('b') == 'cached\n'
+    assert len(os.listdir(cachedir)) == 4
+    assert chip.get('flowstatus', 'b', '0', 'status') == siliconcompiler.TaskStatus.SUCCESS
+
+def test_taskcache_errors(monkeypatch):
+    '''Tasks which continue despite errors are not cached.'''
+
+    def check_logfile(chip, step=None, index='0', **kwargs):
+        # tools record errors found in their logs
+        chip.set('metric', step, index, 'errors', 'real', int(step == 'a'))
+    monkeypatch.setattr(siliconcompiler.Chip, 'check_logfile', check_logfile)
+
+    chip = _serial_flow()
+    chip.set('eda', 'echo', 'continue', True)
+    chip.run()
+
+    assert chip.get('metric', 'a', '0', 'errors', 'real') > 0
+    assert len(os.listdir(os.path.join('build', 'taskcache'))) == 2
+
+def test_taskcache_failed(monkeypatch):
+    '''Tasks which continue despite a failed command are not cached.'''
+
+    run_executable = siliconcompiler.Chip._run_executable
+    def failing_run(chip, cmdlist, logfile, step, index, **kwargs):
+        retcode, usage = run_executable(chip, cmdlist, logfile, step, index, **kwargs)
+        return int(step == 'a'), usage
+    monkeypatch.setattr(siliconcompiler.Chip, '_run_executable', failing_run)
+
+    chip = _serial_flow()
+    chip.set('eda', 'echo', 'continue', True)
+    chip.run()
+
+    assert len(os.listdir(os.path.join('build', 'taskcache'))) == 2
+
+def test_taskcache_nested_inputs(monkeypatch):
+    '''Only the top level inputs directory is left out of the cache.'''
+
+    def check_logfile(chip, step=None, index='0', **kwargs):
+        os.makedirs(os.path.join('outputs', 'inputs'))
+        with open(os.path.join('outputs', 'inputs', 'keep.txt'), 'w') as f:
+            f.write('keep\n')
+    monkeypatch.setattr(siliconcompiler.Chip, 'check_logfile', check_logfile)
+
+    chip = _serial_flow()
+    chip.run()
+
+    cachedir = os.path.join('build', 'taskcache')
+    for entry in os.listdir(cachedir):
+        assert not os.path.exists(os.path.join(cachedir, entry, 'inputs'))
+        assert os.path.isfile(os.path.join(cachedir, entry, 'outputs', 'inputs', 'keep.txt'))
+
+#########################
+if __name__ == "__main__":
+    test_taskcache()
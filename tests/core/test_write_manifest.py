@@ -1,4 +1,6 @@
 # Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import gzip
+import json
 import siliconcompiler
 
 def test_write_manifest():
@@ -16,6 +18,48 @@ def test_write_manifest():
     chip.write_manifest('top.tcl', prune=False)
     chip.write_manifest('top.yaml')
 
+def test_prune():
+
+    chip = siliconcompiler.Chip()
+    chip.add('source', 'top.v')
+    chip.set('eda', 'yosys', 'exe', 'yosys')
+
+    pruned = chip._prune(chip.cfg)
+    assert pruned['source']['value'] == ['top.v']
+    assert 'help' not in pruned['source']
+    assert 'example' not in pruned['source']
+    assert 'default' not in pruned['eda']
+    assert list(pruned['eda'].keys()) == ['yosys']
+    # empty leaves and branches are dropped
+    assert 'target' not in pruned
+    assert 'history' not in pruned
+
+    # pruned copy is independent of the chip
+    pruned['source']['value'].append('extra.v')
+    assert chip.get('source') == ['top.v']
+
+    # keeplists retains empty lists
+    assert 'target' not in chip._prune(chip.cfg, keeplists=True)
+    assert chip._prune(chip.cfg, keeplists=True)['cfg']['value'] == []
+
+def test_write_json():
+    '''Streamed json matches a one-shot dump, compact json reads back the same'''
+
+    chip = siliconcompiler.Chip()
+    chip.add('source', 'top.v')
+    chip.set('design', 'top')
+    chip.set('metric', 'syn', '0', 'cellarea', 'real', 10.0)
+
+    chip.write_manifest('top.pkg.json')
+    with open('top.pkg.json') as f:
+        assert f.read() == json.dumps(chip._prune(chip.cfg), indent=4, sort_keys=True)
+
+    chip.write_manifest('compact.pkg.json.gz', compact=True)
+    with gzip.open('compact.pkg.json.gz', 'rt') as f:
+        assert json.load(f) == chip._prune(chip.cfg)
+
 #########################
 if __name__ == "__main__":
     test_write_manifest()
+    test_prune()
+    test_write_json()
@@ -0,0 +1,245 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import asyncio
+import io
+import json
+import os
+import tarfile
+import time
+import uuid
+
+from aiohttp import FormData
+from aiohttp.test_utils import TestClient, TestServer
+
+import siliconcompiler
+from siliconcompiler import server
+
+def _server(**options):
+    '''Returns a Server using the 'nfs' directory, with schema defaults
+    overridden by options.'''
+
+    cfg = server.server_schema()
+    for key in cfg:
+        cfg[key]['value'] = cfg[key]['defvalue']
+    cfg['nfsmount']['value'] = [os.path.abspath('nfs')]
+    for key, value in options.items():
+        cfg[key]['value'] = [value]
+    os.makedirs('nfs', exist_ok=True)
+    return server.Server(cfg)
+
+def _import_archive():
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w:gz') as tar:
+        info = tarfile.TarInfo('import/0/outputs/test.v')
+        info.size = 0
+        tar.addfile(info, io.BytesIO())
+    return data.getvalue()
+
+async def _submit(client, job_hash):
+    chip = siliconcompiler.Chip(design='test')
+    form = FormData()
+    form.add_field('import', _import_archive(), filename='import.tar.gz')
+    form.add_field('params', json.dumps({'chip_cfg': chip.cfg,
+                                         'params': {'job_hash': job_hash}}),
+                   content_type='application/json')
+    resp = await client.post('/remote_run/', data=form)
+    assert resp.status == 200
+
+async def _is_running(client, job_hash):
+    resp = await client.post('/check_progress/', json={'job_hash': job_hash,
+                                                       'job_id': 'job0'})
+    return (await resp.text()) != "Job has no running steps."
+
+def test_job_queue(monkeypatch):
+    '''Jobs are limited to 'maxjobs' at a time, and don't block requests.'''
+
+    # jobs run in worker processes, so they are tracked with files
+    os.mkdir('running')
+    def slow_run(chip):
+        marker = os.path.join('running', chip.status['jobhash'])
+        open(marker, 'w').close()
+        with open('peak.txt', 'a') as f:
+            f.write(f"{len(os.listdir('running'))}\n")
+        # Chip.run() blocks its caller until the job completes.
+        time.sleep(1)
+        os.remove(marker)
+    monkeypatch.setattr(siliconcompiler.Chip, 'run', slow_run)
+
+    srv = _server(maxjobs='1')
+    jobs = [uuid.uuid4().hex for i in range(2)]
+
+    async def check():
+        async with TestClient(TestServer(srv.app)) as client:
+            for job_hash in jobs:
+                await _submit(client, job_hash)
+
+            # Both jobs are reported as running (the second one is queued),
+            # and the server responds while a job is executing.
+            await asyncio.sleep(0.2)
+            for job_hash in jobs:
+                start = time.time()
+                assert await _is_running(client, job_hash)
+                assert time.time() - start < 0.5
+
+            while any([await _is_running(client, job_hash) for job_hash in jobs]):
+                await asyncio.sleep(0.1)
+
+    asyncio.run(check())
+
+    with open('peak.txt') as f:
+        peak = [int(line) for line in f]
+    assert len(peak) == 2
+    assert max(peak) == 1
+    for job_hash in jobs:
+        assert os.path.isfile(os.path.join('nfs', f'{job_hash}.tar.gz'))
+
+def test_job_environment(monkeypatch):
+    '''The environment Chip.run() sets up for a job is not seen by other jobs.'''
+
+    def run(chip):
+        # Chip.run() sets 'env' parameters in os.environ
+        job_hash = chip.status['jobhash']
+        previous = os.environ.get('SC_TEST_JOB')
+        os.environ['SC_TEST_JOB'] = job_hash
+        time.sleep(0.5)
+        with open(f'{job_hash}.env', 'w') as f:
+            f.write(f"{previous} {os.environ['SC_TEST_JOB']}\n")
+    monkeypatch.setattr(siliconcompiler.Chip, 'run', run)
+
+    srv = _server(maxjobs='2')
+    jobs = [uuid.uuid4().hex for i in range(4)]
+
+    async def check():
+        async with TestClient(TestServer(srv.app)) as client:
+            for job_hash in jobs:
+                await _submit(client, job_hash)
+            await asyncio.sleep(0.2)
+            while any([await _is_running(client, job_hash) for job_hash in jobs]):
+                await asyncio.sleep(0.1)
+
+    asyncio.run(check())
+
+    for job_hash in jobs:
+        with open(f'{job_hash}.env') as f:
+            assert f.read() == f'None {job_hash}\n'
+
+def test_job_progress(monkeypatch):
+    '''Progress requests are answered as soon as a task finishes, with the
+    status and metrics of the finished tasks.'''
+
+    def run(chip):
+        time.sleep(0.5)
+        chip.set('flowstatus', 'syn', '0', 'status', 'success')
+        chip.set('metric', 'syn', '0', 'cellarea', 'real', 10.0)
+        outputs = os.path.join(chip.get('dir'), 'test', 'job0', 'syn', '0', 'outputs')
+        os.makedirs(outputs)
+        chip.write_manifest(os.path.join(outputs, 'test.pkg.json'), compact=True)
+        time.sleep(1.5)
+    monkeypatch.setattr(siliconcompiler.Chip, 'run', run)
+
+    srv = _server()
+    job_hash = uuid.uuid4().hex
+
+    async def wait_progress(client, since):
+        resp = await client.post('/check_progress/', json={'job_hash': job_hash,
+                                                           'job_id': 'job0',
+                                                           'wait': 10,
+                                                           'since': since})
+        assert resp.status == 200
+        return await resp.json()
+
+    async def check():
+        async with TestClient(TestServer(srv.app)) as client:
+            await _submit(client, job_hash)
+
+            progress = await wait_progress(client, None)
+            assert progress['status'] in ('queued', 'running')
+
+            # Wait for the task manifest to be written.
+            while not progress['tasks']:
+                start = time.time()
+                progress = await wait_progress(client, progress['tag'])
+                assert time.time() - start < 2
+            assert progress['tasks'] == {
+                'syn/0': {'status': 'success', 'metrics': {'cellarea': 10.0}}
+            }
+
+            # The job completion is reported without waiting for the timeout.
+            start = time.time()
+            progress = await wait_progress(client, progress['tag'])
+            assert progress['status'] == 'done'
+            assert time.time() - start < 5
+
+    asyncio.run(check())
+
+def test_auth_checks():
+    '''All handlers apply the same authentication checks.'''
+
+    srv = _server()
+    job_hash = uuid.uuid4().hex
+    params = {'job_hash': job_hash, 'job_id': 'job0'}
+    requests = [
+        ('/check_progress/', params),
+        ('/delete_job/', params),
+        (f'/get_results/{job_hash}.tar.gz', {}),
+        (f'/get_results_manifest/{job_hash}', {}),
+        (f'/get_results_files/{job_hash}.tar.gz', {'files': []}),
+    ]
+
+    async def check():
+        async with TestClient(TestServer(srv.app)) as client:
+            for url, data in requests:
+                # this server does not support authentication
+                resp = await client.post(url, json={**data, 'username': 'user', 'key': 'key'})
+                assert resp.status == 500
+                resp = await client.post(url, json={**data, 'username': 'user'})
+                assert resp.status == 500
+
+            srv.cfg['auth']['value'] = [True]
+            srv.user_keys = {'user': {'password': 'key'}}
+            for url, data in requests:
+                resp = await client.post(url, json={**data, 'username': 'user'})
+                assert resp.status == 400
+                resp = await client.post(url, json={**data, 'username': 'other', 'key': 'key'})
+                assert resp.status == 404
+                resp = await client.post(url, json={**data, 'username': 'user', 'key': 'wrong'})
+                assert resp.status == 403
+
+    asyncio.run(check())
+
+def test_results_symlink_parent():
+    '''Result paths can't reach outside of the job through symlinked directories.'''
+
+    srv = _server()
+    job_hash = uuid.uuid4().hex
+    job_root = os.path.join('nfs', job_hash)
+    os.makedirs(os.path.join(job_root, 'test', 'job0'))
+    os.mkdir('secret')
+    with open(os.path.join('secret', 'key.txt'), 'w') as f:
+        f.write('secret\n')
+    os.symlink(os.path.abspath('secret'), os.path.join(job_root, 'test', 'job0', 'evil'))
+    with open(os.path.join(job_root, 'test', 'job0', 'test.v'), 'w') as f:
+        f.write('module test;\nendmodule\n')
+
+    async def check():
+        async with TestClient(TestServer(srv.app)) as client:
+            resp = await client.post(f'/get_results_files/{job_hash}.tar.gz',
+                                     json={'files': ['test/job0/evil/key.txt']})
+            assert resp.status == 400
+            resp = await client.post(f'/get_results_manifest/{job_hash}',
+                                     json={'prefix': 'test/job0/evil'})
+            assert resp.status == 400
+
+            # the link itself is archived as a link
+            resp = await client.post(f'/get_results_files/{job_hash}.tar.gz',
+                                     json={'files': ['test/job0/evil', 'test/job0/test.v']})
+            assert resp.status == 200
+            with tarfile.open(fileobj=io.BytesIO(await resp.read()), mode='r:*') as tar:
+                assert tar.getmember('test/job0/evil').issym()
+                assert tar.getmember('test/job0/test.v').isfile()
+
+    asyncio.run(check())
+
+#########################
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,177 @@
+# Copyright 2020 Silicon Compiler Authors. All Rights Reserved.
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import psutil
+
+import siliconcompiler
+from siliconcompiler import client
+
+ARCHIVE_SIZE = 256 << 20
+
+def _start_server(scroot):
+    '''Starts sc-server on a free port, and returns (process, port).'''
+
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        port = s.getsockname()[1]
+
+    os.mkdir('nfs')
+    env = os.environ.copy()
+    env['PYTHONPATH'] = scroot
+    proc = subprocess.Popen([sys.executable, '-m', 'siliconcompiler.server',
+                             '-nfs_mount', 'nfs',
+                             '-cluster', 'local',
+                             '-port', str(port)],
+                            env=env,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+
+    for i in range(100):
+        try:
+            socket.create_connection(('localhost', port)).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return proc, port
+
+def _write_archive(path):
+    with open(path, 'wb') as f:
+        block = os.urandom(1 << 20)
+        for i in range(ARCHIVE_SIZE >> 20):
+            f.write(block)
+
+def test_get_results(scroot):
+    '''Results are streamed without loading the archive into server memory,
+    and partial downloads are resumed.'''
+
+    srv, port = _start_server(scroot)
+    try:
+        job_hash = uuid.uuid4().hex
+        _write_archive(os.path.join('nfs', f'{job_hash}.tar.gz'))
+
+        chip = siliconcompiler.Chip()
+        chip.status['jobhash'] = job_hash
+        chip.status['remote_cfg'] = {'address': 'localhost', 'port': port}
+
+        server = psutil.Process(srv.pid)
+        start_rss = server.memory_info().rss
+        peak_rss = [start_rss]
+        done = threading.Event()
+        def sample():
+            while not done.is_set():
+                peak_rss[0] = max(peak_rss[0], server.memory_info().rss)
+                time.sleep(0.01)
+        monitor = threading.Thread(target=sample)
+        monitor.start()
+        try:
+            client.fetch_results_request(chip)
+        finally:
+            done.set()
+            monitor.join()
+
+        with open(os.path.join('nfs', f'{job_hash}.tar.gz'), 'rb') as f:
+            expected = f.read()
+        with open(f'{job_hash}.tar.gz', 'rb') as f:
+            assert f.read() == expected
+        assert peak_rss[0] - start_rss < ARCHIVE_SIZE // 4
+
+        # Resume from a truncated download.
+        with open(f'{job_hash}.tar.gz', 'r+b') as f:
+            f.truncate(ARCHIVE_SIZE // 3)
+        client.fetch_results_request(chip)
+        with open(f'{job_hash}.tar.gz', 'rb') as f:
+            assert f.read() == expected
+    finally:
+        srv.kill()
+        srv.wait()
+
+def test_remote_transfer(scroot):
+    '''The build directory is uploaded as a stream and extracted by the
+    server, and results are extracted into the local build directory.'''
+
+    srv, port = _start_server(scroot)
+    try:
+        chip = siliconcompiler.Chip(design='test')
+        chip.status['jobhash'] = uuid.uuid4().hex
+        chip.status['remote_cfg'] = {'address': 'localhost', 'port': port}
+        chip.set('remotecompress', 'gz:1')
+
+        local_dir = os.path.join('build', 'test', 'job0')
+        os.makedirs(os.path.join(local_dir, 'import', '0', 'outputs'))
+        verilog = os.path.join('import', '0', 'outputs', 'test.v')
+        with open(os.path.join(local_dir, verilog), 'w') as f:
+            f.write('module test(); endmodule\n')
+
+        client.request_remote_run(chip)
+        remote_dir = os.path.join('nfs', chip.status['jobhash'], 'test', 'job0')
+        assert os.path.isfile(os.path.join(remote_dir, verilog))
+
+        # The job can't run here, but still produces a results archive.
+        for i in range(100):
+            if not client.is_job_busy(chip):
+                break
+            time.sleep(0.1)
+
+        shutil.rmtree('build')
+        client.fetch_results(chip)
+        with open(os.path.join(local_dir, verilog)) as f:
+            assert f.read() == 'module test(); endmodule\n'
+        assert not os.path.exists(f"{chip.status['jobhash']}.tar.gz")
+    finally:
+        srv.kill()
+        srv.wait()
+
+def test_fetch_results_delta(scroot):
+    '''Only result files which are missing or changed locally are fetched.'''
+
+    srv, port = _start_server(scroot)
+    try:
+        chip = siliconcompiler.Chip(design='test')
+        chip.status['jobhash'] = uuid.uuid4().hex
+        chip.status['remote_cfg'] = {'address': 'localhost', 'port': port}
+
+        local_dir = os.path.join('build', 'test', 'job0')
+        remote_dir = os.path.join('nfs', chip.status['jobhash'], 'test', 'job0')
+        verilog = os.path.join('import', '0', 'outputs', 'test.v')
+        netlist = os.path.join('syn', '0', 'outputs', 'test.vg')
+        report = os.path.join('syn', '0', 'reports', 'area.rpt')
+        placed = os.path.join('place', '0', 'outputs', 'test.def')
+        for path in (verilog, report):
+            for root in (local_dir, remote_dir):
+                os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+                with open(os.path.join(root, path), 'w') as f:
+                    f.write('local\n')
+        for path in (netlist, report, placed):
+            os.makedirs(os.path.dirname(os.path.join(remote_dir, path)), exist_ok=True)
+            with open(os.path.join(remote_dir, path), 'w') as f:
+                f.write('remote\n')
+
+        # Results can be fetched one step at a time.
+        fetched = client.sync_results(chip, os.path.join('test', 'job0', 'syn'))
+        assert fetched == [os.path.join('test', 'job0', path) for path in (netlist, report)]
+        assert not os.path.exists(os.path.join(local_dir, placed))
+
+        fetched = client.sync_results(chip)
+        assert fetched == [os.path.join('test', 'job0', placed)]
+        for path in (netlist, report, placed):
+            with open(os.path.join(local_dir, path)) as f:
+                assert f.read() == 'remote\n'
+
+        assert client.sync_results(chip) == []
+    finally:
+        srv.kill()
+        srv.wait()
+
+#########################
+if __name__ == "__main__":
+    from tests.fixtures import scroot
+    test_get_results(scroot())
+    test_remote_transfer(scroot())
+    test_fetch_results_delta(scroot())